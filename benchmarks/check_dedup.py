@@ -0,0 +1,106 @@
+"""去重检查：确认只改动了截止日期或奖项类型的通知不会被当作重复跳过，并统计近似重复的误判率与查询耗时
+
+1. 回归检查：在本地模拟接口上先写入一条通知，再提交只改了截止日期、只改了奖项类型的两条通知，
+   默认配置下两条都必须写入飞书；
+2. 误判率：在历史记录中预置 --history 条合成通知，再用另一组互不相关的合成通知逐条查询，
+   按 DEDUP_SIMHASH_DISTANCE 的默认值统计被判为近似重复的条数和每次查询的耗时。
+所有数据文件都写入临时目录，不会读取 feishu_config.json，也不会访问任何在线服务。
+
+用法：
+    python benchmarks/check_dedup.py --history 50000 --probes 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wechat_feishu_gui as app
+from mock_services import MockServices
+from pipeline_benchmark import reset_app_state, synthetic_corpus
+
+BASE_NOTICE = """【关于2025年国家奖学金评审工作的通知】
+各位同学：2025年国家奖学金评审工作现已开始，符合条件的同学请于2025年6月5日前将申请表和成绩单提交至学院办公室。
+逾期不予受理，如有疑问请联系辅导员。"""
+# 只改动截止日期、只改动奖项类型的两条通知，都是需要单独写入的不同通知
+CHANGED_NOTICES = {
+    "截止日期": BASE_NOTICE.replace("6月5日", "6月15日"),
+    "奖项类型": BASE_NOTICE.replace("奖学金", "助学金"),
+}
+
+def run_batch(texts):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = app.process_notification_batch(texts)
+        app.save_batch_results(results)
+    return [app.batch_result_status(result) for result in results]
+
+def check_distinct_notices():
+    """默认配置下改动过的通知必须写入，返回是否通过"""
+    statuses = run_batch([BASE_NOTICE])
+    passed = statuses == ["written"]
+    base_simhash = app.notice_simhash(BASE_NOTICE)
+    statuses = run_batch(list(CHANGED_NOTICES.values()))
+    for (name, text), status in zip(CHANGED_NOTICES.items(), statuses):
+        distance = app.hamming_distance(base_simhash, app.notice_simhash(text))
+        ok = status == "written"
+        passed = passed and ok
+        print(f"只改动{name}（汉明距离 {distance}）：{status}{'' if ok else '  <- 应写入飞书'}")
+    # 完全相同的通知仍按 DEDUP_EXACT_MODE 跳过
+    statuses = run_batch([BASE_NOTICE])
+    ok = statuses == ["duplicate"]
+    print(f"完全相同的通知：{statuses[0]}{'' if ok else '  <- 应跳过'}")
+    return passed and ok
+
+def measure_false_positives(history_size, probes):
+    """预置 history_size 条历史记录，统计 probes 条不相关通知被判为近似重复的比例和查询耗时"""
+    store = app.get_history_store()
+    seeded = app.split_notifications(synthetic_corpus(history_size, seed=1))
+    for start in range(0, len(seeded), 5000):
+        store.add_many([{"院校通知": text.split("\n")[0][:60], "状态": "成功",
+                         "fingerprint": app.notice_fingerprint(text), "simhash": app.notice_simhash(text)}
+                        for text in seeded[start:start + 5000]])
+    app.config["DEDUP_NEAR_MODE"] = "skip"
+    checker = app.DuplicateChecker()
+    queries = app.split_notifications(synthetic_corpus(probes, seed=2))
+    flagged = 0
+    elapsed = 0.0
+    for i, text in enumerate(queries):
+        fingerprint, simhash = app.notice_fingerprint(text), app.notice_simhash(text)
+        started = time.perf_counter()
+        match = checker.check(i, text, fingerprint, simhash)
+        elapsed += time.perf_counter() - started
+        flagged += match is not None and match["kind"] == "near"
+    print(f"历史记录 {len(seeded)} 条，查询 {len(queries)} 条不相关通知（最大汉明距离 {checker.max_distance}）："
+          f"判为近似重复 {flagged} 条，平均每次查询 {elapsed / max(1, len(queries)) * 1000:.2f}ms")
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="去重回归检查与近似重复误判率统计")
+    parser.add_argument("--history", type=int, default=20000, help="预置的历史记录条数（默认 20000）")
+    parser.add_argument("--probes", type=int, default=200, help="查询的不相关通知条数（默认 200）")
+    options = parser.parse_args(argv)
+
+    services = MockServices().start()
+    data_dir = tempfile.mkdtemp(prefix="feishu_dedup_")
+    try:
+        bench_options = types.SimpleNamespace(cache=False, dedup=True, streaming=False, micro_batch=False,
+                                              volc_workers=2, feishu_workers=1, volc_rate_limit=1000.0,
+                                              feishu_rate_limit=1000.0)
+        reset_app_state(data_dir, services.base_url, bench_options)
+        passed = check_distinct_notices()
+        reset_app_state(data_dir, services.base_url, bench_options)
+        app.HISTORY_DB_FILE = os.path.join(data_dir, "probe_history.db")
+        measure_false_positives(options.history, options.probes)
+    finally:
+        services.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    print("回归检查通过" if passed else "回归检查失败")
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,100 @@
+"""飞书 token 失效回归检查
+
+在本地模拟接口上预置一个已被服务端吊销、但在 feishu_token_cache.json 中尚未过期的 token，
+多维表格接口对它返回 HTTP 400 和错误码 99991663。确认：
+1. 单条写入（write_to_feishu）与批量写入（process_notification_batch）都只刷新一次 token、重试一次后成功，
+   缓存文件中的旧 token 被替换；
+2. 刷新后的 token 仍被拒绝时批量写入整批失败，不会改为逐条写入。
+所有数据文件都写入临时目录，不会读取 feishu_config.json，也不会访问任何在线服务。
+
+用法：python benchmarks/check_feishu_token.py
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wechat_feishu_gui as app
+from mock_services import MockServices
+from pipeline_benchmark import reset_app_state, synthetic_corpus
+
+STALE_TOKEN = "t-stale"
+BENCH_OPTIONS = types.SimpleNamespace(cache=False, dedup=False, streaming=False, micro_batch=False,
+                                      volc_workers=2, feishu_workers=1, volc_rate_limit=1000.0,
+                                      feishu_rate_limit=1000.0)
+
+def prepare(services, data_dir):
+    """重置主程序状态，并在 token 缓存文件中写入已被吊销的 token"""
+    reset_app_state(data_dir, services.base_url, BENCH_OPTIONS)
+    app.config["HTTP_MAX_RETRIES"] = 0
+    with open(app.TOKEN_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"cli_mock": {"tenant_access_token": STALE_TOKEN, "expire_at": time.time() + 3600}}, f)
+    services.stats.clear()
+    services.revoked_tokens = {STALE_TOKEN}
+
+def cached_token():
+    with open(app.TOKEN_CACHE_FILE, encoding="utf-8") as f:
+        return (json.load(f).get("cli_mock") or {}).get("tenant_access_token")
+
+def report(name, ok, detail):
+    print(f"{name}：{detail}{'' if ok else '  <- 不符合预期'}")
+    return ok
+
+def check_single_write(services, data_dir):
+    prepare(services, data_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = app.write_to_feishu({"院校通知": "选课通知", "截止日期": "2025-06-05"})
+    refreshes = services.stats.get("feishu_auth_requests", 0)
+    rejected = services.stats.get("feishu_invalid_token", 0)
+    ok = success and refreshes == 1 and rejected == 1 and cached_token() == "t-mock"
+    return report("单条写入", ok, f"{'成功' if success else '失败: ' + message}，刷新 token {refreshes} 次，"
+                                  f"被拒绝 {rejected} 次，缓存中的 token 为 {cached_token()}")
+
+def run_batch(count):
+    notices = app.split_notifications(synthetic_corpus(count, seed=3))
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = app.process_notification_batch(notices)
+        app.save_batch_results(results)
+    return [app.batch_result_status(result) for result in results]
+
+def check_batch_write(services, data_dir):
+    prepare(services, data_dir)
+    statuses = run_batch(5)
+    refreshes = services.stats.get("feishu_auth_requests", 0)
+    requests_sent = services.stats.get("feishu_bitable_requests", 0)
+    ok = statuses == ["written"] * 5 and refreshes == 1 and requests_sent == 2
+    return report("批量写入", ok, f"写入 {statuses.count('written')}/5 条，刷新 token {refreshes} 次，"
+                                  f"多维表格请求 {requests_sent} 次")
+
+def check_still_rejected(services, data_dir):
+    prepare(services, data_dir)
+    services.revoked_tokens.add("t-mock")
+    statuses = run_batch(5)
+    refreshes = services.stats.get("feishu_auth_requests", 0)
+    requests_sent = services.stats.get("feishu_bitable_requests", 0)
+    ok = "written" not in statuses and refreshes == 1 and requests_sent == 2
+    return report("刷新后仍被拒绝", ok, f"写入 {statuses.count('written')}/5 条，刷新 token {refreshes} 次，"
+                                        f"多维表格请求 {requests_sent} 次（不应逐条重写）")
+
+def main(argv):
+    services = MockServices().start()
+    data_dir = tempfile.mkdtemp(prefix="feishu_token_")
+    try:
+        passed = check_single_write(services, data_dir)
+        passed = check_batch_write(services, data_dir) and passed
+        passed = check_still_rejected(services, data_dir) and passed
+    finally:
+        services.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    print("回归检查通过" if passed else "回归检查失败")
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
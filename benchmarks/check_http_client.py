@@ -0,0 +1,160 @@
+"""HttpClient 重试与限流回归检查
+
+在本机启动一个按脚本依次返回响应的 HTTP 服务，记录每次请求到达的时间，确认：
+1. 429/5xx 和飞书可重试错误码（如 200 + 1254290）会重试，等待时间不短于 Retry-After / x-ogw-ratelimit-reset；
+2. 400（含 token 失效错误码）、404 等不可重试的响应只请求一次；
+3. 重试用尽后返回最后一次响应，连接失败重试用尽后抛出异常；
+4. 按接口的令牌桶限流生效，未配置限流的接口不受影响。
+不会读取 feishu_config.json，也不会访问任何在线服务。
+
+用法：python benchmarks/check_http_client.py
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import wechat_feishu_gui as app
+
+class ScriptedServer:
+    """每个路径按顺序返回预先设定的 (状态码, 响应体, 响应头)，用完后返回 200；记录每次请求的到达时间"""
+    def __init__(self):
+        self.scripts = {}
+        self.arrivals = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler_class(self):
+        scripted = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with scripted.lock:
+                    scripted.arrivals.setdefault(self.path, []).append(time.monotonic())
+                    script = scripted.scripts.get(self.path) or []
+                    status, body, headers = script.pop(0) if script else (200, {"code": 0, "msg": "ok"}, {})
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+def make_client(**kwargs):
+    # 退避时间很短，等待时间明显更长时只能来自响应头
+    options = {"max_retries": 3, "backoff_base": 0.01, "backoff_max": 5.0}
+    options.update(kwargs)
+    return app.HttpClient(**options)
+
+def check_retry_cases(server):
+    """返回失败信息列表"""
+    failures = []
+    # (名称, 依次返回的响应, 期望请求次数, 期望最终状态码, 两次请求之间的最短间隔秒数)
+    cases = [
+        ("429 + Retry-After", [(429, {"code": 99991400}, {"Retry-After": "0.4"})], 2, 200, 0.4),
+        ("429 + x-ogw-ratelimit-reset", [(429, {"code": 99991400}, {"x-ogw-ratelimit-reset": "0.3"})], 2, 200, 0.3),
+        ("503 + Retry-After", [(503, {"code": -1}, {"Retry-After": "0.3"}), (503, {"code": -1}, {"Retry-After": "0.3"})],
+         3, 200, 0.3),
+        ("503（指数退避）", [(503, {"code": -1}, {})], 2, 200, 0.0),
+        ("200 + 飞书可重试错误码", [(200, {"code": 1254290, "msg": "TooManyRequest"}, {"Retry-After": "0.2"})],
+         2, 200, 0.2),
+        ("400 token 失效", [(400, {"code": 99991663, "msg": "Invalid access token"}, {})], 1, 400, None),
+        ("400 参数错误（带 Retry-After）", [(400, {"code": 1254001, "msg": "WrongRequestBody"}, {"Retry-After": "0"})],
+         1, 400, None),
+        ("403 无权限", [(403, {"code": 91403, "msg": "Forbidden"}, {})], 1, 403, None),
+        ("404", [(404, {"code": 404, "msg": "not found"}, {})], 1, 404, None),
+        ("重试用尽", [(503, {"code": -1}, {})] * 4, 4, 503, 0.0),
+    ]
+    client = make_client()
+    for i, (name, script, expected_attempts, expected_status, min_gap) in enumerate(cases):
+        path = f"/case{i}"
+        server.scripts[path] = list(script)
+        response = client.post(server.url(path), endpoint="check", data="{}", timeout=5)
+        arrivals = server.arrivals.get(path, [])
+        gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+        problems = []
+        if len(arrivals) != expected_attempts:
+            problems.append(f"请求 {len(arrivals)} 次，应为 {expected_attempts} 次")
+        if response.status_code != expected_status:
+            problems.append(f"最终状态码 {response.status_code}，应为 {expected_status}")
+        if min_gap and gaps and min(gaps) < min_gap:
+            problems.append(f"重试间隔 {min(gaps):.3f}s，短于响应头要求的 {min_gap}s")
+        print(f"{name}：请求 {len(arrivals)} 次，状态码 {response.status_code}"
+              + (f"，重试间隔 {', '.join(f'{gap:.2f}s' for gap in gaps)}" if gaps else "")
+              + ("" if not problems else "  <- " + "；".join(problems)))
+        if problems:
+            failures.append(name)
+    return failures
+
+def check_connection_error():
+    """连接失败时重试 max_retries 次后抛出异常"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = make_client(max_retries=2)
+    try:
+        client.post(f"http://127.0.0.1:{port}/", endpoint="down", data="{}", timeout=1)
+        raised = False
+    except requests.exceptions.ConnectionError:
+        raised = True
+    attempts = client.stats().get("down", {}).get("attempts", 0)
+    ok = raised and attempts == 3
+    print(f"连接失败：尝试 {attempts} 次，{'抛出' if raised else '未抛出'} ConnectionError{'' if ok else '  <- 应尝试 3 次后抛出'}")
+    return [] if ok else ["连接失败"]
+
+def check_rate_limit(server):
+    """限流 20 次/秒（桶容量 20）：40 次请求至少需要约 1 秒；未配置限流的接口不受影响"""
+    client = make_client(rate_limits={"limited": 20})
+    started = time.monotonic()
+    for _ in range(40):
+        client.post(server.url("/limited"), endpoint="limited", data="{}", timeout=5)
+    limited_elapsed = time.monotonic() - started
+    started = time.monotonic()
+    for _ in range(40):
+        client.post(server.url("/free"), endpoint="free", data="{}", timeout=5)
+    free_elapsed = time.monotonic() - started
+    ok = limited_elapsed >= 0.9 and free_elapsed < limited_elapsed / 2
+    print(f"限流：限流接口 40 次请求耗时 {limited_elapsed:.2f}s（应不少于 0.9s），"
+          f"未限流接口 {free_elapsed:.2f}s{'' if ok else '  <- 不符合预期'}")
+    return [] if ok else ["限流"]
+
+def main(argv):
+    server = ScriptedServer()
+    try:
+        failures = check_retry_cases(server)
+        failures += check_connection_error()
+        failures += check_rate_limit(server)
+    finally:
+        server.stop()
+    print("回归检查通过" if not failures else f"回归检查失败：{'、'.join(failures)}")
+    return 0 if not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
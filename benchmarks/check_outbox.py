@@ -0,0 +1,102 @@
+"""飞书写入队列回归检查：写入中断后重放或重新提交，飞书中不会出现重复记录
+
+1. 响应丢失：batch_create 已在飞书创建记录但客户端收到 503，之后以不同的 FEISHU_BATCH_SIZE 重放
+   （包括模拟重放前程序异常退出），飞书中的记录数仍等于通知数；
+2. 保存历史记录前退出：写入飞书成功后、save_batch_results 之前退出，重新提交同一批通知时
+   先补记历史记录，去重跳过这些通知，飞书中的记录数不变。
+所有数据文件都写入临时目录，不会读取 feishu_config.json，也不会访问任何在线服务。
+
+用法：python benchmarks/check_outbox.py
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wechat_feishu_gui as app
+from mock_services import MockServices
+from pipeline_benchmark import reset_app_state, synthetic_corpus
+
+NOTICE_COUNT = 10
+
+def bench_options(dedup):
+    return types.SimpleNamespace(cache=False, dedup=dedup, streaming=False, micro_batch=False, volc_workers=2,
+                                 feishu_workers=1, volc_rate_limit=1000.0, feishu_rate_limit=1000.0)
+
+def report(name, ok, detail):
+    print(f"{name}：{detail}{'' if ok else '  <- 不符合预期'}")
+    return ok
+
+def successful_history(count):
+    """历史记录中写入成功且带 record_id 的条数是否等于 count"""
+    records = app.get_history_store().all()
+    return sum(1 for record in records if record["状态"] == "成功" and record.get("record_id")) == count
+
+def check_lost_response(crash):
+    services = MockServices().start()
+    data_dir = tempfile.mkdtemp(prefix="feishu_outbox_")
+    try:
+        reset_app_state(data_dir, services.base_url, bench_options(dedup=False))
+        app.config.update(HTTP_MAX_RETRIES=0, FEISHU_BATCH_SIZE=NOTICE_COUNT, FEISHU_FLUSH_INTERVAL=0.2)
+        services.lost_create_responses = 1
+        notices = app.split_notifications(synthetic_corpus(NOTICE_COUNT, seed=3))
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = app.process_notification_batch(notices)
+            app.save_batch_results(results)
+        store = app.get_outbox()
+        if crash:
+            # 模拟重放发送途中退出：条目停留在发送中，下次启动时恢复为待发送
+            store.claim(("failed",))
+            store.reset_inflight()
+        app.config["FEISHU_BATCH_SIZE"] = 3
+        job = app.OutboxReplayJob(("pending", "failed"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            job._run()
+        left = sum(store.count(status) for status in ("pending", "failed", "sending", "written"))
+        ok = len(services.records) == NOTICE_COUNT and left == 0 and successful_history(NOTICE_COUNT)
+        return report("响应丢失后重放" + ("（重放前异常退出）" if crash else ""), ok,
+                      f"首次写入成功 {sum(result['success'] for result in results)} 条，重放后飞书记录 "
+                      f"{len(services.records)} 条，队列剩余 {left} 条")
+    finally:
+        services.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def check_exit_before_history():
+    services = MockServices().start()
+    data_dir = tempfile.mkdtemp(prefix="feishu_outbox_")
+    try:
+        reset_app_state(data_dir, services.base_url, bench_options(dedup=True))
+        notices = app.split_notifications(synthetic_corpus(NOTICE_COUNT, seed=7))
+        with contextlib.redirect_stdout(io.StringIO()):
+            # 写入飞书后、save_batch_results 之前退出
+            app.process_notification_batch(notices)
+        reset_app_state(data_dir, services.base_url, bench_options(dedup=True))
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = app.process_notification_batch(notices)
+            app.save_batch_results(results)
+        statuses = [app.batch_result_status(result) for result in results]
+        store = app.get_outbox()
+        left = sum(store.count(status) for status in ("pending", "failed", "sending", "written"))
+        ok = (statuses == ["duplicate"] * NOTICE_COUNT and len(services.records) == NOTICE_COUNT and left == 0
+              and successful_history(NOTICE_COUNT))
+        return report("保存历史记录前退出后重新提交", ok,
+                      f"跳过重复 {statuses.count('duplicate')} 条，飞书记录 {len(services.records)} 条，"
+                      f"队列剩余 {left} 条")
+    finally:
+        services.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main(argv):
+    passed = check_lost_response(crash=False)
+    passed = check_lost_response(crash=True) and passed
+    passed = check_exit_before_history() and passed
+    print("回归检查通过" if passed else "回归检查失败")
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
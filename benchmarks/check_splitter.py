@@ -0,0 +1,96 @@
+"""通知分割器回归检查
+
+用旧版（逐行多次 re.match、一次性 split）的分割实现作为基准，
+在样例语料和随机生成的语料上比较新分割器的输出是否完全一致，并对比耗时。
+
+用法：python benchmarks/check_splitter.py [语料文件 ...]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wechat_feishu_gui import split_notifications, iter_split_notifications
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def legacy_is_new_notification_start(line_text):
+    """旧版实现（原样保留，作为回归基准）"""
+    stripped_line = line_text.strip()
+    if re.match(r"^[一二三四五六七八九十百千万]+：", stripped_line):
+        return True
+    if stripped_line.startswith("【"):
+        if not re.match(r"^[一二三四五六七八九十百千万]+：\s*【", stripped_line):
+            return True
+    if re.match(r"^(重要)?通知：", stripped_line):
+        return True
+    return False
+
+def legacy_split_notifications(text_block):
+    """旧版实现（原样保留，作为回归基准）"""
+    lines = text_block.strip().split("\n")
+    if not lines:
+        return []
+    notifications = []
+    current_notification_lines = []
+    first_content_line_found = False
+    for line_content in lines:
+        if not line_content.strip():
+            if not first_content_line_found:
+                continue
+            current_notification_lines.append(line_content)
+            continue
+        if not first_content_line_found:
+            first_content_line_found = True
+        if current_notification_lines and legacy_is_new_notification_start(line_content):
+            notifications.append("\n".join(current_notification_lines).strip())
+            current_notification_lines = [line_content]
+        else:
+            current_notification_lines.append(line_content)
+    if current_notification_lines:
+        notifications.append("\n".join(current_notification_lines).strip())
+    return [n for n in notifications if n.strip()]
+
+def random_corpus(seed, count=2000):
+    """生成包含各种边界行、空行、缩进和 \r 的随机语料"""
+    rng = random.Random(seed)
+    fragments = ["一：", "十二：", "三： 【", "【", " 【", "通知：", "重要通知：", "重要通知:", "通知",
+                 "内容", "  缩进内容", "\t", "", " ", "　", "\r", "截止6月20日", "【教务】"]
+    texts = []
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randint(0, 30)):
+            lines.append("".join(rng.choice(fragments) for _ in range(rng.randint(0, 3))))
+        texts.append("\n".join(lines))
+    return texts
+
+def main(paths):
+    corpus = []
+    for path in paths or [os.path.join(CORPUS_DIR, name) for name in sorted(os.listdir(CORPUS_DIR))]:
+        with open(path, "r", encoding="utf-8") as f:
+            corpus.append(f.read())
+    corpus += random_corpus(seed=20250601)
+
+    mismatches = 0
+    for text in corpus:
+        expected = legacy_split_notifications(text)
+        if split_notifications(text) != expected or list(iter_split_notifications(text.split("\n"))) != expected:
+            mismatches += 1
+    print(f"回归检查：共 {len(corpus)} 份语料，不一致 {mismatches} 份")
+
+    # 耗时对比：把样例语料重复拼接成大文本
+    big_text = "\n".join(corpus[:max(1, len(paths) if paths else 1)] * 2000)
+    started = time.perf_counter()
+    legacy_count = len(legacy_split_notifications(big_text))
+    legacy_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    new_count = len(split_notifications(big_text))
+    new_elapsed = time.perf_counter() - started
+    print(f"耗时对比（{len(big_text)} 字符，{new_count} 条通知）：旧版 {legacy_elapsed:.3f}s，新版 {new_elapsed:.3f}s")
+    return 1 if mismatches or legacy_count != new_count else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
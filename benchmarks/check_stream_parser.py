@@ -0,0 +1,170 @@
+"""流式 JSON 解析回归检查
+
+把模型可能返回的内容（带或不带 ```json 代码块、含转义字符和 \\u 转义的字符串）按每一个切分位置
+拆成两块、以及随机拆成多块逐块交给 IncrementalJsonObjectParser，确认结果与一次性 json.loads 一致、
+字段按顺序产出，且非 JSON 内容在第一个分块就被拒绝。最后在本地模拟接口上调用 stream_doubao_json，
+确认对象接收完整后仍记录了最后一个分块中的 token 用量，并确认分块结构异常（如 choices 为 null）时
+extract_info_with_doubao_api 按首行生成标题，不会抛出异常。不会访问任何在线服务。
+
+用法：python benchmarks/check_stream_parser.py [--random-runs 300]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wechat_feishu_gui as app
+from mock_services import MockServices
+
+OBJECTS = [
+    {"title": "关于期末考试安排的通知", "summary": "请于6月5日前确认考场", "deadline": "2025-06-05"},
+    {"title": "含\"引号\"和\\反斜杠的标题", "summary": "第一行\n第二行\t制表符 中文 \U0001F600",
+     "deadline": None},
+    {"title": "嵌套", "summary": {"items": [1, 2, {"a": "}]"}]}, "deadline": "2025-12-31"},
+    {},
+]
+WRAPPERS = [
+    lambda text: text,
+    lambda text: f"```json\n{text}\n```",
+    lambda text: f"```\n{text}\n```",
+    lambda text: f"  \n```JSON\n{text}```",
+]
+# 一次性 json.dumps 使用 \\u 转义，覆盖转义序列被拆开的情况
+ENCODINGS = [
+    lambda obj: json.dumps(obj, ensure_ascii=False),
+    lambda obj: json.dumps(obj, ensure_ascii=True),
+    lambda obj: json.dumps(obj, ensure_ascii=False, indent=2),
+]
+INVALID = ["好的，以下是提取结果", "[1, 2]", "`x", "``{"]
+# 合法 JSON 但结构不符合预期的 SSE 分块
+MALFORMED_CHUNKS = [
+    [1, 2],
+    "text",
+    {},
+    {"choices": None},
+    {"choices": {"delta": {"content": "{"}}},
+    {"choices": [None]},
+    {"choices": [{"delta": "{"}]},
+    {"choices": [{"delta": {"content": 5}}]},
+    {"choices": [], "usage": 3},
+]
+NOTICE = "【选课通知】\n请于2025年6月5日前完成选课"
+
+def parse_chunks(chunks):
+    parser = app.IncrementalJsonObjectParser()
+    fields = []
+    for chunk in chunks:
+        fields.extend(parser.feed(chunk))
+    return parser.finish(), fields
+
+def check_case(text, expected, chunks):
+    """返回错误信息，正确时返回 None"""
+    try:
+        result, fields = parse_chunks(chunks)
+    except ValueError as e:
+        return f"抛出 {e}"
+    if result != expected:
+        return f"结果不一致: {result!r}"
+    if fields != list(expected.items()):
+        return f"字段顺序不一致: {fields!r}"
+    return None
+
+def random_chunks(text, rng):
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 1, 2, 3, 5, 8, 16])
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+def check_parser(random_runs, rng):
+    failures = []
+    cases = 0
+    for obj in OBJECTS:
+        for encode in ENCODINGS:
+            for wrap in WRAPPERS:
+                text = wrap(encode(obj))
+                splits = [[text[:i], text[i:]] for i in range(1, len(text))]
+                splits += [list(text)]
+                splits += [random_chunks(text, rng) for _ in range(random_runs)]
+                for chunks in splits:
+                    cases += 1
+                    error = check_case(text, obj, chunks)
+                    if error:
+                        failures.append(f"{chunks[:3]!r}...: {error}")
+    for text in INVALID:
+        cases += 1
+        parser = app.IncrementalJsonObjectParser()
+        try:
+            parser.feed(text)
+        except ValueError:
+            continue
+        failures.append(f"{text!r}: 应在第一个分块就被拒绝")
+    print(f"解析检查：共 {cases} 种切分，失败 {len(failures)} 种")
+    for failure in failures[:10]:
+        print(f"    {failure}")
+    return not failures
+
+def use_mock(services):
+    app.VOLC_API_BASE_URL = f"{services.base_url}/ark/chat/completions"
+    app.config = {"VOLC_API_KEY": "mock-key", "VOLC_ENDPOINT_ID": "mock-endpoint", "HTTP_BACKOFF_BASE": 0.05,
+                  "HTTP_MAX_RETRIES": 0, "VOLC_STREAMING": True}
+    app.http_client = None
+
+def check_usage_recorded(services):
+    """流式提取结束后，最后一个分块中的 usage 应计入性能报告"""
+    use_mock(services)
+    app.perf_recorder.start_run()
+    messages = app.build_chat_messages(app.EXTRACTION_SYSTEM_PROMPT, f"---开始---\n{NOTICE}\n---结束---")
+    result = app.stream_doubao_json({"Authorization": "Bearer mock-key"},
+                                    {"model": "mock-endpoint", "messages": messages})
+    app.perf_recorder.finish_run()
+    counters = app.perf_recorder.report()["counters"]
+    ok = result.get("deadline") == "2025-06-05" and counters.get("prompt_tokens", 0) > 0
+    print(f"流式 token 用量：prompt {counters.get('prompt_tokens', 0)}，completion {counters.get('completion_tokens', 0)}"
+          f"{'' if ok else '  <- 未记录'}")
+    return ok
+
+def check_malformed_chunks(services):
+    """分块结构异常时按首行生成标题（与内容不是 JSON 时相同），不抛出异常"""
+    use_mock(services)
+    failures = []
+    for chunk in MALFORMED_CHUNKS:
+        services.stream_prefix_chunks = [chunk]
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = app.extract_info_with_doubao_api(NOTICE, use_cache=False)
+        except Exception as e:
+            failures.append(f"{chunk!r}: 抛出 {type(e).__name__}: {e}")
+            continue
+        if result.get("title") != NOTICE.split("\n")[0]:
+            failures.append(f"{chunk!r}: 标题为 {result.get('title')!r}")
+    services.stream_prefix_chunks = []
+    print(f"结构异常的分块：共 {len(MALFORMED_CHUNKS)} 种，失败 {len(failures)} 种")
+    for failure in failures:
+        print(f"    {failure}")
+    return not failures
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="流式 JSON 解析回归检查")
+    parser.add_argument("--random-runs", type=int, default=300, help="每种内容随机切分的次数（默认 300）")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(argv)
+    passed = check_parser(options.random_runs, random.Random(options.seed))
+    services = MockServices().start()
+    try:
+        passed = check_usage_recorded(services) and passed
+        passed = check_malformed_chunks(services) and passed
+    finally:
+        services.stop()
+    print("回归检查通过" if passed else "回归检查失败")
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
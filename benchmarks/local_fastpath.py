@@ -0,0 +1,79 @@
+"""本地规则提取快速通道评估
+
+在样例语料上运行本地标题/截止日期提取，按置信度阈值统计可以跳过豆包调用的通知数量
+及节省的提示词 token（只估算通知正文部分），并列出每条通知的本地提取结果供人工核对。
+运行前先检查 CASES 中的截止日期解析（“本月底”、跨年的日期范围等），结果不符时以退出码 1 结束。
+
+用法：python benchmarks/local_fastpath.py [--threshold 0.85] [语料文件 ...]
+"""
+import argparse
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wechat_feishu_gui import estimate_tokens, extract_deadline_locally, extract_info_locally, split_notifications
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+# (通知文本, 运行日期, 期望的截止日期, 是否应达到默认阈值 0.85)
+CASES = [
+    # “本月底”以文中的日期确定月份，与运行日期无关
+    ("请获评同学于本月底前提交个人材料，截止2025-08-31，逾期视为自动放弃。", datetime.date(2026, 10, 17), "2025-08-31", True),
+    ("请获评同学于本月底前提交个人材料，截止2025-08-31，逾期视为自动放弃。", datetime.date(2025, 8, 1), "2025-08-31", True),
+    ("2025年3月10日起受理，请于本月底前提交申请材料。", datetime.date(2026, 10, 17), "2025-03-31", True),
+    # 文中没有可参照的日期时不猜测
+    ("请于本月底前提交申请材料。", datetime.date(2026, 10, 17), None, False),
+    # 跨年的日期范围
+    ("【关于2025年寒假值班安排的通知】\n请于12月28日至1月5日期间完成值班登记。", datetime.date(2025, 12, 1), "2026-01-05", True),
+    ("报名时间：2025年12月28日至1月5日。", datetime.date(2026, 10, 17), "2026-01-05", True),
+    ("报名时间：12月28日-1月5日。", datetime.date(2025, 12, 1), "2026-01-05", True),
+    # 不是范围时不跨年
+    ("请于7月3日前上报总结材料（6月30日前完成班会）。", datetime.date(2025, 6, 1), "2025-07-03", True),
+]
+
+def check_cases():
+    """检查 CASES 中的截止日期解析，返回是否全部符合"""
+    failures = 0
+    for text, today, expected, confident in CASES:
+        deadline, confidence = extract_deadline_locally(text, today)
+        if deadline != expected or (confidence >= 0.85) != confident:
+            failures += 1
+            print(f"截止日期检查失败：{text!r}（运行日期 {today}）得到 {deadline}（置信度 {confidence}），"
+                  f"期望 {expected}（{'不低于' if confident else '低于'} 0.85）")
+    print(f"截止日期检查：共 {len(CASES)} 条，失败 {failures} 条")
+    return failures == 0
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="评估本地规则提取快速通道")
+    parser.add_argument("paths", nargs="*", help="语料文件，默认使用 benchmarks/corpus 下的全部文件")
+    parser.add_argument("--threshold", type=float, default=0.85, help="置信度阈值（对应 LOCAL_FASTPATH_THRESHOLD）")
+    args = parser.parse_args(argv)
+    passed = check_cases()
+
+    notices = []
+    for path in args.paths or [os.path.join(CORPUS_DIR, name) for name in sorted(os.listdir(CORPUS_DIR))]:
+        with open(path, "r", encoding="utf-8") as f:
+            notices.extend(split_notifications(f.read()))
+
+    fast = 0
+    tokens_total = 0
+    tokens_saved = 0
+    for text in notices:
+        info = extract_info_locally(text)
+        tokens = estimate_tokens(text)
+        tokens_total += tokens
+        hit = info["confidence"] >= args.threshold
+        if hit:
+            fast += 1
+            tokens_saved += tokens
+        mark = "本地" if hit else "API "
+        print(f"[{mark}] {info['confidence']:.2f} {info['deadline'] or '-':<10} {info['title']}")
+
+    total = len(notices) or 1
+    print(f"共 {len(notices)} 条通知，阈值 {args.threshold}：本地处理 {fast} 条（{fast / total:.0%}），"
+          f"skip 模式可减少豆包调用 {fast} 次、通知正文 token 约 {tokens_saved}/{tokens_total}")
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,302 @@
+"""本地模拟的豆包（Ark）与飞书接口，供离线基准测试使用
+
+只实现主程序用到的接口：
+- POST /ark/chat/completions：单条与批量提取（含 SSE 流式）
+- POST /feishu/auth/v3/tenant_access_token/internal/：获取 tenant_access_token
+- POST /feishu/bitable/v1/apps/<app>/tables/<table>/records（及 /batch_create）：新增记录，
+  相同 client_token 的 batch_create 返回首次创建的记录而不重复创建；lost_create_responses > 0 时
+  创建记录后仍返回 503（模拟响应丢失），每次减一
+- POST /feishu/bitable/v1/apps/<app>/tables/<table>/records/batch_update：批量更新记录
+- POST /feishu/bitable/v1/apps/<app>/tables/<table>/records/search：分页查询记录
+- PUT  /feishu/bitable/v1/apps/<app>/tables/<table>/records/<record_id>：更新记录
+- POST /feishu/bot/v2/hook/<token>：自定义机器人消息（记录在 bot_messages 中，设置 bot_secret 时校验签名）
+
+stream_prefix_chunks 中的内容（可以是任意 JSON，用于模拟结构异常的分块）会作为流式响应的前几个分块原样发送。
+多维表格接口收到 revoked_tokens 中的 token 时与飞书一致，返回 HTTP 400 和错误码 99991663。
+
+每组接口可分别配置延迟、5xx 错误率和 429 限流比例，返回内容由请求中的通知文本确定性生成。
+"""
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SINGLE_NOTICE_PATTERN = re.compile(r"---开始---\n(.*?)\n---结束---", re.S)
+BATCH_NOTICE_PATTERN = re.compile(r"---通知 (\d+) 开始---\n(.*?)\n---通知 \1 结束---", re.S)
+DATE_PATTERN = re.compile(r"(\d{4})年(\d{1,2})月(\d{1,2})日")
+
+class MockBehavior:
+    """一组接口的模拟行为：延迟（毫秒，均值与抖动）、5xx 错误率、429 比例与 Retry-After 秒数"""
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_429=0.0, retry_after=0.05):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+
+def mock_extraction(text):
+    """按通知文本确定性地生成提取结果：首行为标题，文中最后一个完整日期为截止日期"""
+    lines = [line.strip() for line in text.strip().split("\n") if line.strip()]
+    title = re.sub(r"^[一二三四五六七八九十百千万]+：|^【|】$", "", lines[0] if lines else "").strip("【】")
+    dates = DATE_PATTERN.findall(text)
+    deadline = "%04d-%02d-%02d" % tuple(map(int, dates[-1])) if dates else None
+    return {"title": title[:60], "summary": "；".join(lines[1:])[:200] or title, "deadline": deadline}
+
+class MockServices:
+    """在本机随机端口上启动的模拟服务"""
+    def __init__(self, ark=None, feishu=None, seed=0):
+        self.ark = ark or MockBehavior()
+        self.feishu = feishu or MockBehavior()
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stats = {}
+        self.records = {}
+        self.modified = {}
+        self.record_ids = itertools.count(1)
+        self.bot_messages = []
+        self.batch_tokens = {}
+        self.lost_create_responses = 0
+        self.revoked_tokens = set()
+        self.stream_prefix_chunks = []
+        self.bot_secret = None
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, name, amount=1):
+        with self.stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def decide(self, behavior):
+        """返回 (延迟秒数, 结果)，结果为 "ok"、"error" 或 "429" """
+        with self.random_lock:
+            delay = max(0.0, self.random.gauss(behavior.latency_ms, behavior.jitter_ms)) / 1000
+            roll = self.random.random()
+        if roll < behavior.rate_429:
+            return delay, "429"
+        if roll < behavior.rate_429 + behavior.error_rate:
+            return delay, "error"
+        return delay, "ok"
+
+    def new_record_id(self):
+        return f"recMock{next(self.record_ids):08d}"
+
+    def save_record(self, record_id, fields, replace=True):
+        """保存记录并更新修改时间（毫秒）"""
+        if replace or record_id not in self.records:
+            self.records[record_id] = dict(fields)
+        else:
+            self.records[record_id].update(fields)
+        self.modified[record_id] = int(time.time() * 1000)
+
+    def _handler_class(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头与响应体分两次写出，关闭 Nagle 以免与客户端的延迟确认叠加出 40ms 延迟
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, data, headers=None):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                return json.loads(raw.decode("utf-8")) if raw else {}
+
+            def _apply_behavior(self, behavior, route):
+                """模拟延迟与故障，已返回错误响应时返回 False"""
+                delay, outcome = services.decide(behavior)
+                if delay:
+                    time.sleep(delay)
+                services.count(f"{route}_requests")
+                if outcome == "429":
+                    services.count(f"{route}_429")
+                    self._send_json(429, {"code": 99991400, "msg": "request trigger frequency limit"},
+                                    {"Retry-After": str(behavior.retry_after)})
+                    return False
+                if outcome == "error":
+                    services.count(f"{route}_5xx")
+                    self._send_json(503, {"code": -1, "msg": "mock service unavailable"})
+                    return False
+                return True
+
+            def _token_rejected(self):
+                """token 已失效时返回 400 与飞书错误码，已返回错误响应时返回 True"""
+                token = (self.headers.get("Authorization") or "").replace("Bearer ", "", 1)
+                if token not in services.revoked_tokens:
+                    return False
+                services.count("feishu_invalid_token")
+                self._send_json(400, {"code": 99991663, "msg": "Invalid access token for authorization. "
+                                                               "Please make a request with token attached."})
+                return True
+
+            def do_POST(self):
+                payload = self._read_json()
+                if self.path.startswith("/ark/"):
+                    self._ark(payload)
+                elif self.path.startswith("/feishu/auth/"):
+                    if self._apply_behavior(services.feishu, "feishu_auth"):
+                        self._send_json(200, {"code": 0, "msg": "ok", "tenant_access_token": "t-mock", "expire": 7200})
+                elif self.path.startswith("/feishu/bitable/"):
+                    self._bitable_create(payload)
+                elif self.path.startswith("/feishu/bot/"):
+                    self._bot(payload)
+                else:
+                    self._send_json(404, {"code": 404, "msg": "not found"})
+
+            def do_PUT(self):
+                payload = self._read_json()
+                if not self._apply_behavior(services.feishu, "feishu_bitable") or self._token_rejected():
+                    return
+                record_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if record_id not in services.records:
+                    self._send_json(200, {"code": 1254043, "msg": "RecordIdNotFound"})
+                    return
+                services.save_record(record_id, payload.get("fields", {}), replace=False)
+                self._send_json(200, {"code": 0, "msg": "success",
+                                      "data": {"record": {"record_id": record_id, "fields": payload.get("fields", {})}}})
+
+            def _bitable_create(self, payload):
+                if not self._apply_behavior(services.feishu, "feishu_bitable") or self._token_rejected():
+                    return
+                path = self.path.split("?")[0]
+                if path.endswith("/search"):
+                    self._bitable_search(payload)
+                    return
+                if path.endswith("/batch_update"):
+                    records = payload.get("records", [])
+                    if any(record.get("record_id") not in services.records for record in records):
+                        self._send_json(200, {"code": 1254043, "msg": "RecordIdNotFound"})
+                        return
+                    for record in records:
+                        services.save_record(record["record_id"], record.get("fields", {}), replace=False)
+                    services.count("feishu_updates", len(records))
+                    self._send_json(200, {"code": 0, "msg": "success", "data": {"records": records}})
+                    return
+                if path.endswith("/batch_create"):
+                    query = dict(part.split("=", 1) for part in self.path.partition("?")[2].split("&") if "=" in part)
+                    client_token = query.get("client_token")
+                    with services.stats_lock:
+                        records = services.batch_tokens.get(client_token) if client_token else None
+                        if records is None:
+                            records = []
+                            for record in payload.get("records", []):
+                                record_id = services.new_record_id()
+                                services.save_record(record_id, record.get("fields", {}))
+                                records.append({"record_id": record_id, "fields": record.get("fields", {})})
+                            if client_token:
+                                services.batch_tokens[client_token] = records
+                            services.stats["feishu_records"] = services.stats.get("feishu_records", 0) + len(records)
+                        lose_response = services.lost_create_responses > 0
+                        if lose_response:
+                            services.lost_create_responses -= 1
+                    if lose_response:
+                        self._send_json(503, {"code": -1, "msg": "mock response lost"})
+                        return
+                    self._send_json(200, {"code": 0, "msg": "success", "data": {"records": records}})
+                    return
+                record_id = services.new_record_id()
+                services.save_record(record_id, payload.get("fields", {}))
+                services.count("feishu_records")
+                self._send_json(200, {"code": 0, "msg": "success",
+                                      "data": {"record": {"record_id": record_id, "fields": payload.get("fields", {})}}})
+
+            def _bot(self, payload):
+                if not self._apply_behavior(services.feishu, "feishu_bot"):
+                    return
+                if services.bot_secret:
+                    key = f"{payload.get('timestamp')}\n{services.bot_secret}".encode("utf-8")
+                    sign = base64.b64encode(hmac.new(key, digestmod=hashlib.sha256).digest()).decode()
+                    if payload.get("sign") != sign:
+                        self._send_json(200, {"code": 19021, "msg": "sign match fail or timestamp is not within one hour from current time"})
+                        return
+                with services.stats_lock:
+                    services.bot_messages.append(payload)
+                self._send_json(200, {"StatusCode": 0, "StatusMessage": "success", "code": 0, "data": {}, "msg": "success"})
+
+            def _bitable_search(self, payload):
+                """按 record_id 顺序分页返回记录，支持按修改时间 isGreater 过滤"""
+                query = dict(part.split("=", 1) for part in self.path.partition("?")[2].split("&") if "=" in part)
+                page_size = int(query.get("page_size", 20))
+                start = int(query.get("page_token") or 0)
+                modified_after = 0
+                for condition in (payload.get("filter") or {}).get("conditions", []):
+                    if condition.get("operator") == "isGreater":
+                        modified_after = int(condition["value"][-1])
+                record_ids = sorted(record_id for record_id in services.records
+                                    if services.modified.get(record_id, 0) > modified_after)
+                page = record_ids[start:start + page_size]
+                items = [{"record_id": record_id, "fields": services.records[record_id],
+                          "last_modified_time": services.modified.get(record_id)} for record_id in page]
+                has_more = start + page_size < len(record_ids)
+                self._send_json(200, {"code": 0, "msg": "success", "data": {
+                    "items": items, "has_more": has_more, "page_token": str(start + page_size) if has_more else None,
+                    "total": len(record_ids)}})
+
+            def _ark(self, payload):
+                if not self._apply_behavior(services.ark, "ark"):
+                    return
+                prompt = payload["messages"][-1]["content"]
+                batch = BATCH_NOTICE_PATTERN.findall(prompt)
+                if batch:
+                    content = json.dumps([dict(mock_extraction(text), index=int(index)) for index, text in batch],
+                                         ensure_ascii=False)
+                else:
+                    match = SINGLE_NOTICE_PATTERN.search(prompt)
+                    content = json.dumps(mock_extraction(match.group(1) if match else prompt), ensure_ascii=False)
+                usage = {"prompt_tokens": len(prompt), "completion_tokens": len(content),
+                         "total_tokens": len(prompt) + len(content)}
+                if payload.get("stream"):
+                    self._ark_stream(content, usage)
+                    return
+                self._send_json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                                   "finish_reason": "stop"}], "usage": usage})
+
+            def _ark_stream(self, content, usage):
+                """以 SSE 分块返回，每块 8 个字符"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in services.stream_prefix_chunks:
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                for start in range(0, len(content), 8):
+                    chunk = {"choices": [{"index": 0, "delta": {"content": content[start:start + 8]}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
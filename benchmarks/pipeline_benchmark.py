@@ -0,0 +1,205 @@
+"""离线吞吐量基准测试
+
+启动本地模拟的豆包与飞书接口（见 mock_services.py），在合成的通知语料上运行真实的
+提取、写入飞书和历史记录代码，报告每秒处理的通知数和延迟分布。所有数据文件都写入
+临时目录，不会读取 feishu_config.json，也不会访问任何在线服务。
+
+模式：
+- serial：逐条调用 extract_info_with_doubao_api、write_to_feishu、save_to_history（单条延迟为三步合计）
+- pipeline：调用 process_notification_batch 与 save_batch_results（单条延迟为从开始运行到该条写入完成）
+
+用法：
+    python benchmarks/pipeline_benchmark.py --sizes 10,100,1000 --ark-latency 300 --rate-429 0.02
+    python benchmarks/pipeline_benchmark.py --save baseline.json
+    python benchmarks/pipeline_benchmark.py --baseline baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wechat_feishu_gui as app
+from mock_services import MockBehavior, MockServices
+
+TITLES = ["关于{year}年{topic}的通知", "【{topic}安排】", "{topic}工作提醒", "关于做好{topic}相关工作的通知"]
+TOPICS = ["期末考试", "选课", "奖学金评定", "学费缴纳", "暑期安全教育", "毕业论文答辩", "宿舍检查",
+          "体测", "四六级报名", "实习材料提交", "党员发展", "图书馆闭馆", "校园招聘会", "学生信息核对"]
+BODIES = ["请各位同学于{date}前完成{topic}相关工作，逾期不予受理。",
+          "{topic}将于{date}开始，具体安排见附件。",
+          "请班长统计本班{topic}情况，并于{date}前上报学院办公室。",
+          "如有疑问请联系辅导员，联系电话 0571-{phone}。"]
+NUMERALS = "一二三四五六七八九十"
+
+def synthetic_corpus(count, seed=0):
+    """生成 count 条互不相同的合成通知，拼接成一段聊天记录文本"""
+    rng = random.Random(seed)
+    notices = []
+    for i in range(count):
+        topic = rng.choice(TOPICS)
+        year = rng.choice([2025, 2026])
+        title = rng.choice(TITLES).format(year=year, topic=topic)
+        prefix = f"{NUMERALS[i % 10]}：" if i % 3 == 0 else ("通知：" if i % 3 == 1 else "")
+        if not prefix and not title.startswith("【"):
+            title = f"【{title}】"
+        lines = [f"{prefix}{title}（第{i + 1}号）"]
+        for _ in range(rng.randint(1, 4)):
+            date = f"{year}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日"
+            lines.append(rng.choice(BODIES).format(date=date, topic=topic, phone=rng.randint(10000000, 99999999)))
+        notices.append("\n".join(lines))
+    return "\n\n".join(notices)
+
+def percentile(sorted_values, percent):
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def reset_app_state(data_dir, base_url, options):
+    """把主程序的文件路径、接口地址和共享单例指向本次运行的临时环境"""
+    app.HEADLESS = True
+    app.HISTORY_FILE = os.path.join(data_dir, "notification_history.json")
+    app.HISTORY_DB_FILE = os.path.join(data_dir, "notification_history.db")
+    app.OUTBOX_DB_FILE = os.path.join(data_dir, "feishu_outbox.db")
+    app.TOKEN_CACHE_FILE = os.path.join(data_dir, "feishu_token_cache.json")
+    app.EXTRACTION_CACHE_FILE = os.path.join(data_dir, "extraction_cache.db")
+    app.VOLC_API_BASE_URL = f"{base_url}/ark/chat/completions"
+    app.FEISHU_TOKEN_URL = f"{base_url}/feishu/auth/v3/tenant_access_token/internal/"
+    app.FEISHU_BITABLE_BASE_URL = f"{base_url}/feishu/bitable/v1/apps"
+    app.config = {
+        "VOLC_API_KEY": "mock-key", "VOLC_ENDPOINT_ID": "mock-endpoint",
+        "FEISHU_APP_ID": "cli_mock", "FEISHU_APP_SECRET": "mock-secret",
+        "FEISHU_BITABLE_APP_TOKEN": "bascnMock", "FEISHU_TABLE_ID": "tblMock",
+        "EXTRACTION_CACHE_ENABLED": options.cache,
+        "DEDUP_ENABLED": options.dedup,
+        "VOLC_STREAMING": options.streaming,
+        "VOLC_MICRO_BATCH": options.micro_batch,
+        "VOLC_MAX_WORKERS": options.volc_workers,
+        "FEISHU_MAX_WORKERS": options.feishu_workers,
+        "VOLC_RATE_LIMIT": options.volc_rate_limit,
+        "FEISHU_RATE_LIMIT": options.feishu_rate_limit,
+        "HTTP_BACKOFF_BASE": 0.05,
+    }
+    for name in ("history_store", "outbox", "extraction_cache", "http_client", "feishu_tenants"):
+        setattr(app, name, None)
+    app.token_managers.clear()
+
+def run_serial(notices):
+    """逐条提取、写入、保存，返回每条的耗时与成功数"""
+    latencies = []
+    succeeded = 0
+    for text in notices:
+        started = time.perf_counter()
+        parsed = app.parse_single_notification(text)
+        success, message = app.write_to_feishu(parsed)
+        parsed["状态"] = "成功" if success else f"失败: {message}"
+        app.save_to_history(parsed)
+        latencies.append(time.perf_counter() - started)
+        succeeded += success
+    return latencies, succeeded
+
+def run_pipeline(notices):
+    """通过 process_notification_batch 并发处理，返回每条从开始到写入完成的耗时与成功数"""
+    started = time.perf_counter()
+    written_at = {}
+    results = app.process_notification_batch(
+        notices, on_written=lambda i, success, message, record_id: written_at.__setitem__(i, time.perf_counter()))
+    app.save_batch_results(results)
+    latencies = [written_at.get(i, time.perf_counter()) - started for i in range(len(notices))]
+    return latencies, sum(1 for result in results if result["success"])
+
+def run_size(size, options):
+    """在全新的临时环境中处理 size 条通知，返回结果字典"""
+    services = MockServices(
+        ark=MockBehavior(options.ark_latency, options.ark_latency * 0.3, options.error_rate, options.rate_429),
+        feishu=MockBehavior(options.feishu_latency, options.feishu_latency * 0.3, options.error_rate, options.rate_429),
+        seed=options.seed).start()
+    data_dir = tempfile.mkdtemp(prefix="feishu_bench_")
+    try:
+        reset_app_state(data_dir, services.base_url, options)
+        app.perf_recorder.start_run()
+        notices = app.split_notifications(synthetic_corpus(size, seed=options.seed + size))
+        started = time.perf_counter()
+        runner = run_serial if options.mode == "serial" else run_pipeline
+        # 主程序逐条打印的提示信息会拖慢测试，默认丢弃
+        with contextlib.redirect_stdout(sys.stdout if options.verbose else io.StringIO()):
+            latencies, succeeded = runner(notices)
+        elapsed = time.perf_counter() - started
+        app.perf_recorder.finish_run()
+        latencies.sort()
+        report = app.perf_recorder.report()
+        return {
+            "size": len(notices), "mode": options.mode, "elapsed": elapsed, "succeeded": succeeded,
+            "notices_per_second": len(notices) / elapsed if elapsed else 0.0,
+            "latency": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99)},
+            "stages": {stage: {key: data[key] for key in ("count", "p50", "p95", "p99")}
+                       for stage, data in report["stages"].items()},
+            "counters": report["counters"], "mock": dict(services.stats),
+        }
+    finally:
+        services.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def print_result(result, baseline=None):
+    latency = result["latency"]
+    line = (f"{result['mode']:<8} {result['size']:>6} 条  {result['elapsed']:8.2f}s  "
+            f"{result['notices_per_second']:8.1f} 条/秒  成功 {result['succeeded']:>6}  "
+            f"延迟 p50 {latency['p50'] * 1000:8.1f}ms  p95 {latency['p95'] * 1000:8.1f}ms  "
+            f"p99 {latency['p99'] * 1000:8.1f}ms")
+    if baseline:
+        change = (result["notices_per_second"] / baseline["notices_per_second"] - 1) * 100
+        line += f"  吞吐量较基线 {change:+.1f}%"
+    print(line)
+    retries = result["counters"].get("http_retries", 0)
+    stages = "，".join(f"{stage} p95 {data['p95'] * 1000:.1f}ms" for stage, data in sorted(result["stages"].items()))
+    print(f"    重试 {retries} 次；{stages}")
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="使用本地模拟接口的离线吞吐量基准测试")
+    parser.add_argument("--sizes", default="10,100,1000", help="逗号分隔的通知条数（默认 10,100,1000，最多 10000）")
+    parser.add_argument("--mode", choices=("serial", "pipeline"), default="pipeline")
+    parser.add_argument("--ark-latency", type=float, default=200.0, help="模拟豆包接口的平均延迟（毫秒）")
+    parser.add_argument("--feishu-latency", type=float, default=50.0, help="模拟飞书接口的平均延迟（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--volc-workers", type=int, default=4)
+    parser.add_argument("--feishu-workers", type=int, default=2)
+    parser.add_argument("--volc-rate-limit", type=float, default=1000.0, help="豆包请求速率上限（默认不限制）")
+    parser.add_argument("--feishu-rate-limit", type=float, default=1000.0, help="飞书请求速率上限（默认不限制）")
+    parser.add_argument("--streaming", action="store_true", help="启用流式提取（VOLC_STREAMING）")
+    parser.add_argument("--micro-batch", action="store_true", help="启用合并提取（VOLC_MICRO_BATCH）")
+    parser.add_argument("--cache", action="store_true", help="启用提取缓存")
+    parser.add_argument("--dedup", action="store_true", help="启用去重检查")
+    parser.add_argument("--seed", type=int, default=20250601)
+    parser.add_argument("--verbose", action="store_true", help="保留主程序运行时打印的提示信息")
+    parser.add_argument("--save", metavar="FILE", help="把结果保存为 JSON，作为之后比较的基线")
+    parser.add_argument("--baseline", metavar="FILE", help="与之前保存的基线比较吞吐量")
+    options = parser.parse_args(argv)
+
+    sizes = [max(1, min(10000, int(size))) for size in options.sizes.split(",") if size.strip()]
+    baseline = {}
+    if options.baseline:
+        with open(options.baseline, "r", encoding="utf-8") as f:
+            baseline = {(item["mode"], item["size"]): item for item in json.load(f)}
+
+    results = []
+    for size in sizes:
+        result = run_size(size, options)
+        results.append(result)
+        print_result(result, baseline.get((result["mode"], result["size"])))
+
+    if options.save:
+        with open(options.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,142 @@
+"""启动耗时测试：从启动进程到主窗口显示（time-to-window）的时间
+
+脚本模式把当前的 wechat_feishu_gui.py（以及 --baseline-rev 指定的 git 版本）复制到各自的
+临时目录，配上不含真实密钥的配置文件，多次启动并取中位数，分别报告导入模块耗时和窗口显示耗时。
+--exe 模式直接启动打包好的程序（onefile 或 onedir），通过 FEISHU_HELPER_STARTUP_PROBE
+环境变量让程序在窗口显示时记录时间后退出，可比较不同打包方式的启动耗时。
+需要图形界面环境；没有显示器时只报告导入耗时。
+
+用法：
+    python benchmarks/startup_time.py --baseline-rev HEAD~1 --runs 5
+    python benchmarks/startup_time.py --exe dist/微信通知飞书助手.exe --exe dist/微信通知飞书助手/微信通知飞书助手.exe
+"""
+import argparse
+import compileall
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_NAME = "wechat_feishu_gui.py"
+PROBE_ENV = "FEISHU_HELPER_STARTUP_PROBE"
+DUMMY_CONFIG = {
+    "VOLC_API_KEY": "startup-test", "VOLC_ENDPOINT_ID": "startup-test",
+    "FEISHU_APP_ID": "cli_startup_test", "FEISHU_APP_SECRET": "startup-test",
+    "FEISHU_BITABLE_APP_TOKEN": "bascnStartupTest", "FEISHU_TABLE_ID": "tblStartupTest",
+    "OUTBOX_AUTO_RESUME": False,
+}
+
+# 在子进程中导入模块并创建主窗口，窗口显示时输出距进程启动的秒数
+RUNNER = r"""
+import sys, time
+started = float(sys.argv[2])
+sys.path.insert(0, sys.argv[1])
+import_started = time.perf_counter()
+import wechat_feishu_gui as module
+print("import", time.perf_counter() - import_started, flush=True)
+try:
+    window = module.App()
+except Exception as e:
+    print("error", e, flush=True)
+    sys.exit(0)
+def on_map(event):
+    if event.widget is window:
+        print("window", time.time() - started, flush=True)
+        window.after(200, window.destroy)
+window.bind("<Map>", on_map, add="+")
+window.mainloop()
+"""
+
+def prepare_copy(source_text, label):
+    """把某个版本的模块和测试配置写入临时目录，并预先编译字节码"""
+    directory = tempfile.mkdtemp(prefix=f"feishu_startup_{label}_")
+    with open(os.path.join(directory, MODULE_NAME), "w", encoding="utf-8") as f:
+        f.write(source_text)
+    with open(os.path.join(directory, "feishu_config.json"), "w", encoding="utf-8") as f:
+        json.dump(DUMMY_CONFIG, f)
+    compileall.compile_file(os.path.join(directory, MODULE_NAME), quiet=1)
+    return directory
+
+def run_script(directory):
+    """启动一次，返回 (导入秒数, 窗口显示秒数或 None, 错误信息)"""
+    started = time.time()
+    completed = subprocess.run([sys.executable, "-c", RUNNER, directory, repr(started)],
+                               capture_output=True, text=True, timeout=60, cwd=directory)
+    values = {}
+    for line in completed.stdout.splitlines():
+        key, _, value = line.partition(" ")
+        values[key] = value
+    error = values.get("error") or (completed.stderr.strip().splitlines() or [None])[-1]
+    import_seconds = float(values["import"]) if "import" in values else None
+    window_seconds = float(values["window"]) if "window" in values else None
+    return import_seconds, window_seconds, None if window_seconds is not None else error
+
+def run_exe(path):
+    """启动一次打包好的程序，返回窗口显示秒数"""
+    probe_file = os.path.join(tempfile.mkdtemp(prefix="feishu_startup_probe_"), "probe.txt")
+    env = dict(os.environ, **{PROBE_ENV: probe_file})
+    started = time.time()
+    subprocess.run([path], env=env, timeout=120)
+    try:
+        with open(probe_file, "r", encoding="utf-8") as f:
+            return float(f.read()) - started
+    finally:
+        shutil.rmtree(os.path.dirname(probe_file), ignore_errors=True)
+
+def median_or_none(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+def format_seconds(value):
+    return f"{value * 1000:8.1f}ms" if value is not None else "       -  "
+
+def measure_script(label, source_text, runs):
+    directory = prepare_copy(source_text, label)
+    try:
+        samples = [run_script(directory) for _ in range(runs)]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    result = {"label": label, "import": median_or_none([sample[0] for sample in samples]),
+              "window": median_or_none([sample[1] for sample in samples])}
+    errors = [sample[2] for sample in samples if sample[2]]
+    print(f"{label:<16} 导入 {format_seconds(result['import'])}  窗口显示 {format_seconds(result['window'])}"
+          + (f"  （未能显示窗口：{errors[0]}）" if errors else ""))
+    return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="测量启动到主窗口显示的耗时")
+    parser.add_argument("--runs", type=int, default=5, help="每个版本启动的次数（取中位数，默认 5）")
+    parser.add_argument("--baseline-rev", metavar="REV", help="同时测量该 git 版本的模块，作为对比基线")
+    parser.add_argument("--exe", action="append", default=[], metavar="PATH",
+                        help="测量打包好的程序（可多次指定，比较 onefile 与 onedir）")
+    options = parser.parse_args(argv)
+    runs = max(1, options.runs)
+
+    if options.exe:
+        for path in options.exe:
+            seconds = median_or_none([run_exe(path) for _ in range(runs)])
+            print(f"{os.path.basename(os.path.dirname(path)) or path:<16} 窗口显示 {format_seconds(seconds)}  {path}")
+        return 0
+
+    results = []
+    if options.baseline_rev:
+        source = subprocess.run(["git", "show", f"{options.baseline_rev}:{MODULE_NAME}"], cwd=ROOT_DIR,
+                                capture_output=True, check=True).stdout.decode("utf-8")
+        results.append(measure_script(f"基线 {options.baseline_rev}", source, runs))
+    with open(os.path.join(ROOT_DIR, MODULE_NAME), "r", encoding="utf-8") as f:
+        results.append(measure_script("当前版本", f.read(), runs))
+
+    if len(results) == 2:
+        for key, name in (("import", "导入"), ("window", "窗口显示")):
+            before, after = results[0][key], results[1][key]
+            if before and after:
+                print(f"{name}耗时变化：{(after / before - 1) * 100:+.1f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
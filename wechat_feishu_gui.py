@@ -1,13 +1,78 @@
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, ttk
+from tkinter import scrolledtext, messagebox, ttk, filedialog
+import argparse
+import base64
+import calendar
+import contextlib
 import json
 import os
 import datetime
-import requests
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import random
+import sqlite3
+import uuid
+import unicodedata
 import re
 import sys
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+class LazyRequests:
+    """requests 的延迟导入代理：首次访问属性（发起第一个请求）时才导入 requests、urllib3 等，
+    之后把全局名 requests 替换为真正的模块，缩短程序启动时间"""
+    def __getattr__(self, name):
+        global requests
+        import requests
+        return getattr(requests, name)
+
+requests = LazyRequests()
+
+class LazyPattern:
+    """延迟编译的正则表达式：首次使用时才调用 re.compile，之后直接使用编译结果的方法
+
+    模块中的正则表达式都用 lazy_pattern 定义，导入时不编译，界面显示后再由
+    precompile_patterns 在后台线程中统一编译，不占用启动时间。
+    """
+    METHODS = ("match", "fullmatch", "search", "sub", "subn", "split", "findall", "finditer")
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+
+    def compile(self):
+        compiled = re.compile(self.pattern, self.flags)
+        # 把编译结果的方法放入实例字典，之后的调用不再经过 __getattr__
+        for name in self.METHODS:
+            self.__dict__[name] = getattr(compiled, name)
+        self.__dict__["compiled"] = compiled
+        return compiled
+
+    def __getattr__(self, name):
+        return getattr(self.compile(), name)
+
+LAZY_PATTERNS = []
+
+def lazy_pattern(pattern, flags=0):
+    """定义一个延迟编译的正则表达式（用法同 re.compile）"""
+    lazy = LazyPattern(pattern, flags)
+    LAZY_PATTERNS.append(lazy)
+    return lazy
+
+def precompile_patterns():
+    """编译所有尚未编译的正则表达式"""
+    for lazy in LAZY_PATTERNS:
+        if "compiled" not in lazy.__dict__:
+            lazy.compile()
+
 # 确定配置文件路径
 if getattr(sys, 'frozen', False):
     # 如果是打包后的EXE运行
@@ -18,10 +83,29 @@ else:
 
 CONFIG_FILE = os.path.join(application_path, "feishu_config.json")
 HISTORY_FILE = os.path.join(application_path, "notification_history.json")
+HISTORY_DB_FILE = os.path.join(application_path, "notification_history.db")
+OUTBOX_DB_FILE = os.path.join(application_path, "feishu_outbox.db")
+TOKEN_CACHE_FILE = os.path.join(application_path, "feishu_token_cache.json")
+EXTRACTION_CACHE_FILE = os.path.join(application_path, "extraction_cache.db")
 
 # 全局变量
 config = {}
+# 命令行模式下不弹出任何窗口
+HEADLESS = False
 VOLC_API_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
+# 提示词版本：修改提取提示词后需递增，使旧的提取缓存失效
+PROMPT_VERSION = "2"
+FEISHU_TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal/"
+FEISHU_BITABLE_BASE_URL = "https://open.feishu.cn/open-apis/bitable/v1/apps"
+ISO_DATE_PATTERN = lazy_pattern(r"^\d{4}-\d{2}-\d{2}$")
+
+# token 提前刷新的秒数（飞书 token 有效期一般为 7200 秒）
+TOKEN_REFRESH_AHEAD_SECONDS = 300
+# 飞书返回的 token 无效/过期错误码
+FEISHU_TOKEN_INVALID_CODES = (99991661, 99991663, 99991668)
+# 可重试的 HTTP 状态码，以及飞书的限流/写冲突/超时错误码
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+FEISHU_RETRY_CODES = (99991400, 1254290, 1254291, 1255040)
 
 # 字段映射
 FIELD_MAPPING = {
@@ -31,6 +115,13 @@ FIELD_MAPPING = {
     "截止日期": "截止日期"
 }
 
+def show_error(title, message):
+    """显示错误信息（仅在图形界面的主线程弹窗，其余情况改为打印）"""
+    if not HEADLESS and threading.current_thread() is threading.main_thread():
+        messagebox.showerror(title, message)
+    else:
+        print(f"{title}：{message}", file=sys.stderr)
+
 def load_config():
     """加载配置文件"""
     try:
@@ -38,72 +129,864 @@ def load_config():
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                 return json.load(f)
         else:
-            messagebox.showerror("错误", f"配置文件 {CONFIG_FILE} 不存在！请确保配置文件在程序同目录下。")
+            show_error("错误", f"配置文件 {CONFIG_FILE} 不存在！请确保配置文件在程序同目录下。")
             return {}
     except json.JSONDecodeError:
-        messagebox.showerror("错误", f"配置文件 {CONFIG_FILE} 格式无效！")
+        show_error("错误", f"配置文件 {CONFIG_FILE} 格式无效！")
         return {}
     except Exception as e:
-        messagebox.showerror("错误", f"读取配置文件时发生错误: {e}")
+        show_error("错误", f"读取配置文件时发生错误: {e}")
         return {}
 
-def save_to_history(notification_data):
-    """保存处理记录到历史文件"""
-    history = []
-    try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+# 历史记录字段与数据库列的对应关系（其余字段保存在 extra 列中）
+HISTORY_COLUMNS = {
+    "处理时间": "processed_at",
+    "院校通知": "title",
+    "院校通知详情 AI": "summary",
+    "创建时间": "created_date",
+    "截止日期": "deadline",
+    "状态": "status",
+    "record_id": "record_id",
+    "fingerprint": "fingerprint",
+    "simhash": "simhash"
+}
+
+# SimHash 分段数：汉明距离不超过 (分段数-1) 的两条记录至少有一段完全相同。
+# 每段 16 位，单段只命中约 1/65536 的记录，候选记录数不随历史记录线性增长
+SIMHASH_BANDS = 4
+# 近似重复默认的最大汉明距离（不超过 SIMHASH_BANDS - 1）
+DEFAULT_SIMHASH_DISTANCE = 2
+HISTORY_BAND_COLUMNS = [f"sh_band{i}" for i in range(SIMHASH_BANDS)]
+HISTORY_INSERT_SQL = (
+    "INSERT INTO history (processed_at, title, summary, created_date, deadline, status, "
+    "record_id, fingerprint, simhash, " + ", ".join(HISTORY_BAND_COLUMNS) + ", extra) "
+    "VALUES (:processed_at, :title, :summary, :created_date, :deadline, :status, "
+    ":record_id, :fingerprint, :simhash, " + ", ".join(":" + c for c in HISTORY_BAND_COLUMNS) + ", :extra)")
+
+def notice_fingerprint(text):
+    """通知内容指纹（规范化文本的 SHA-256）"""
+    return hashlib.sha256(normalize_notice_text(text).encode("utf-8")).hexdigest()
+
+def notice_simhash(text, ngram=2):
+    """通知内容的 64 位 SimHash（按字符 n-gram 计算，返回有符号整数以便存入 SQLite）"""
+    normalized = normalize_notice_text(text).replace("\n", "")
+    grams = [normalized[i:i + ngram] for i in range(max(1, len(normalized) - ngram + 1))]
+    weights = [0] * 64
+    for gram in grams:
+        h = int.from_bytes(hashlib.md5(gram.encode("utf-8")).digest()[:8], "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def simhash_bands(simhash):
+    """将 SimHash 拆成 SIMHASH_BANDS 段，用于索引候选记录"""
+    value = simhash & ((1 << 64) - 1)
+    width = 64 // SIMHASH_BANDS
+    return [(value >> (i * width)) & ((1 << width) - 1) for i in range(SIMHASH_BANDS)]
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+# 计算飞书记录内容指纹时使用的字段（不含每次运行都会变化的创建时间）
+BITABLE_CONTENT_KEYS = ("院校通知", "院校通知详情 AI", "截止日期")
+
+def normalize_bitable_value(value):
+    """把飞书返回的字段值规范化为写入时的形式（多行文本的分段数组合并为字符串）"""
+    if isinstance(value, list) and all(isinstance(item, dict) and "text" in item for item in value):
+        return "".join(item["text"] for item in value)
+    return value
+
+def bitable_fields_fingerprint(fields):
+    """飞书记录内容指纹：只取 BITABLE_CONTENT_KEYS 对应的字段"""
+    content = {}
+    for key in BITABLE_CONTENT_KEYS:
+        value = normalize_bitable_value(fields.get(FIELD_MAPPING[key]))
+        if value is not None:
+            content[FIELD_MAPPING[key]] = value
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+class HistoryStore:
+    """处理记录存储（SQLite WAL 模式，单条追加，批量写入使用单个事务）"""
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, processed_at TEXT, title TEXT, summary TEXT, "
+            "created_date TEXT, deadline TEXT, status TEXT, extra TEXT)")
+        # 旧版数据库补充去重相关的列
+        existing_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(history)")}
+        new_columns = [("record_id", "TEXT"), ("fingerprint", "TEXT"), ("simhash", "INTEGER")]
+        new_columns += [(column, "INTEGER") for column in HISTORY_BAND_COLUMNS]
+        for column, column_type in new_columns:
+            if column not in existing_columns:
+                self._conn.execute(f"ALTER TABLE history ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_processed_at ON history (processed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_deadline ON history (deadline)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_status ON history (status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_record_id ON history (record_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_fingerprint ON history (fingerprint)")
+        for i in range(SIMHASH_BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_history_sh_band{i} ON history (sh_band{i})")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._migrate_simhash_bands(existing_columns)
+        # 飞书多维表格的本地镜像，table_key 为 "app_token/table_id"
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bitable_mirror ("
+            "table_key TEXT NOT NULL, record_id TEXT NOT NULL, fingerprint TEXT, fields TEXT, "
+            "modified_at INTEGER, synced_at REAL, PRIMARY KEY (table_key, record_id))")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bitable_mirror_fingerprint ON bitable_mirror (table_key, fingerprint)")
+        # 监视导入模式下每个来源（文件路径或剪贴板）已处理到的字节偏移及开头内容的哈希
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_offsets ("
+            "source TEXT PRIMARY KEY, byte_offset INTEGER NOT NULL, head_hash TEXT, updated_at REAL)")
+        # 已发送的截止日期提醒，reminder_key 见 DeadlineReminderScheduler.reminder_key
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deadline_reminders (reminder_key TEXT PRIMARY KEY, history_id INTEGER, fired_at REAL)")
+        self._conn.commit()
+
+    def _migrate_simhash_bands(self, existing_columns):
+        """分段方式变化时（旧版为 8 段 8 位）按 simhash 列重新计算分段，并删除多余分段的索引"""
+        layout = f"{SIMHASH_BANDS}x{64 // SIMHASH_BANDS}"
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'simhash_band_layout'").fetchone()
+        if row is not None and row["value"] == layout:
+            return
+        stale_columns = sorted(column for column in existing_columns
+                               if column.startswith("sh_band") and column not in HISTORY_BAND_COLUMNS)
+        for column in stale_columns:
+            self._conn.execute(f"DROP INDEX IF EXISTS idx_history_{column}")
+        assignments = ", ".join([f"{column} = ?" for column in HISTORY_BAND_COLUMNS] +
+                                [f"{column} = NULL" for column in stale_columns])
+        rows = self._conn.execute("SELECT id, simhash FROM history WHERE simhash IS NOT NULL").fetchall()
+        self._conn.executemany(f"UPDATE history SET {assignments} WHERE id = ?",
+                               [simhash_bands(row["simhash"]) + [row["id"]] for row in rows])
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('simhash_band_layout', ?)", (layout,))
+
+    @staticmethod
+    def _to_row(record):
+        """将历史记录字典转换为数据库行"""
+        row = {column: record.get(key) for key, column in HISTORY_COLUMNS.items()}
+        extra = {key: value for key, value in record.items() if key not in HISTORY_COLUMNS}
+        row["extra"] = json.dumps(extra, ensure_ascii=False) if extra else None
+        bands = simhash_bands(row["simhash"]) if row["simhash"] is not None else [None] * SIMHASH_BANDS
+        for i, band in enumerate(bands):
+            row[f"sh_band{i}"] = band
+        return row
+
+    @staticmethod
+    def _to_record(row):
+        """将数据库行转换为历史记录字典"""
+        record = {"id": row["id"]}
+        for key, column in HISTORY_COLUMNS.items():
+            record[key] = row[column]
+        if row["extra"]:
+            record.update(json.loads(row["extra"]))
+        return record
+
+    def add_many(self, records):
+        """在一个事务中批量追加记录，返回新记录的 id 列表"""
+        ids = []
+        with self._lock, self._conn:
+            for record in records:
+                cursor = self._conn.execute(HISTORY_INSERT_SQL, self._to_row(record))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def add(self, record):
+        """追加一条记录，返回新记录的 id"""
+        return self.add_many([record])[0]
+
+    def all(self):
+        """按写入顺序返回全部记录"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM history ORDER BY id").fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def update_write_result(self, history_id, status, record_id=None):
+        """更新记录的写入状态（失败记录重放后使用）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE history SET status = ?, record_id = COALESCE(?, record_id) WHERE id = ?",
+                (status, record_id, history_id))
+
+    def get(self, record_id):
+        """按 id 读取完整记录，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM history WHERE id = ?", (record_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def has_record_id(self, record_id):
+        """是否已有关联到该飞书 record_id 的记录"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM history WHERE record_id = ? LIMIT 1", (record_id,)).fetchone()
+        return row is not None
+
+    def find_duplicate(self, fingerprint, simhash=None, max_distance=DEFAULT_SIMHASH_DISTANCE):
+        """查找已成功写入飞书的重复记录，返回 (记录, 汉明距离) 或 (None, None)
+
+        先按内容指纹精确匹配；未命中时按 SimHash 分段索引取候选记录（只读取 id 和 simhash），
+        再筛选汉明距离不超过 max_distance 的最相近记录（近似重复）。
+        """
+        written = "(status = '成功' OR record_id IS NOT NULL)"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM history WHERE fingerprint = ? AND {written} ORDER BY id DESC LIMIT 1",
+                (fingerprint,)).fetchone()
+            if row is not None:
+                return self._to_record(row), 0
+            if simhash is None or max_distance <= 0:
+                return None, None
+            bands = simhash_bands(simhash)
+            band_clause = " OR ".join(f"sh_band{i} = ?" for i in range(SIMHASH_BANDS))
+            rows = self._conn.execute(
+                f"SELECT id, simhash FROM history WHERE ({band_clause}) AND {written} ORDER BY id DESC",
+                bands).fetchall()
+            best_id, best_distance = None, None
+            for row in rows:
+                distance = hamming_distance(row["simhash"], simhash)
+                if distance <= max_distance and (best_distance is None or distance < best_distance):
+                    best_id, best_distance = row["id"], distance
+            if best_id is None:
+                return None, None
+            best_row = self._conn.execute("SELECT * FROM history WHERE id = ?", (best_id,)).fetchone()
+        return self._to_record(best_row), best_distance
+
+    @staticmethod
+    def _build_filter(keyword=None, deadline_from=None, deadline_to=None):
+        """构造查询条件，返回 (WHERE 子句, 参数)"""
+        clauses = []
+        params = []
+        if keyword:
+            clauses.append("(title LIKE ? ESCAPE '\\' OR summary LIKE ? ESCAPE '\\')")
+            pattern = "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            params += [pattern, pattern]
+        if deadline_from:
+            clauses.append("deadline >= ?")
+            params.append(deadline_from)
+        if deadline_to:
+            clauses.append("deadline <= ?")
+            params.append(deadline_to)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, params
+
+    def query(self, keyword=None, deadline_from=None, deadline_to=None, offset=0, limit=200, order_by_deadline=False):
+        """按条件分页查询记录（默认最新的在前，order_by_deadline 为 True 时按截止日期先后）"""
+        where, params = self._build_filter(keyword, deadline_from, deadline_to)
+        order = "deadline, id" if order_by_deadline else "id DESC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM history{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def due_between(self, start, end):
+        """返回截止日期在 [start, end]（YYYY-MM-DD）之间的记录，按截止日期先后排序
+
+        通过 idx_history_deadline 做范围查找，耗时只与 O(log n) 的索引定位和命中条数有关，不扫描全表。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM history WHERE deadline >= ? AND deadline <= ? ORDER BY deadline, id",
+                (start, end)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def count_matching(self, keyword=None, deadline_from=None, deadline_to=None):
+        """统计符合条件的记录数"""
+        where, params = self._build_filter(keyword, deadline_from, deadline_to)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+
+    def migrate_from_json(self, json_file):
+        """一次性导入旧版 JSON 历史文件，导入后将其重命名为 .migrated"""
+        if not os.path.exists(json_file):
+            return 0
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done:
+            return 0
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
                 history = json.load(f)
-    except:
-        history = []
-    
-    # 添加时间戳
-    notification_data["处理时间"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 添加到历史记录
-    history.append(notification_data)
-    
-    # 保存历史记录
+        except Exception as e:
+            print(f"警告：读取旧版历史记录文件失败，跳过迁移: {e}")
+            return 0
+        records = [item for item in history if isinstance(item, dict)]
+        with self._lock, self._conn:
+            for record in records:
+                self._conn.execute(HISTORY_INSERT_SQL, self._to_row(record))
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (json_file,))
+        try:
+            os.replace(json_file, json_file + ".migrated")
+        except OSError as e:
+            print(f"警告：重命名旧版历史记录文件失败: {e}")
+        print(f"提示：已从 {json_file} 迁移 {len(records)} 条历史记录。")
+        return len(records)
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def mirror_upsert(self, table_key, rows):
+        """写入镜像记录，rows 为 (record_id, fields, 修改时间毫秒) 列表"""
+        now = time.time()
+        params = [(table_key, record_id, bitable_fields_fingerprint(fields),
+                   json.dumps(fields, ensure_ascii=False), modified_at, now)
+                  for record_id, fields, modified_at in rows]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bitable_mirror (table_key, record_id, fingerprint, fields, modified_at, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", params)
+
+    def mirror_get(self, table_key, record_id):
+        """返回镜像中的记录 {"record_id", "fingerprint", "fields", "modified_at"}，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM bitable_mirror WHERE table_key = ? AND record_id = ?", (table_key, record_id)).fetchone()
+        if row is None:
+            return None
+        return {"record_id": row["record_id"], "fingerprint": row["fingerprint"],
+                "fields": json.loads(row["fields"]) if row["fields"] else {}, "modified_at": row["modified_at"]}
+
+    def mirror_find(self, table_key, fingerprint):
+        """按内容指纹查找镜像中的 record_id，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record_id FROM bitable_mirror WHERE table_key = ? AND fingerprint = ? LIMIT 1",
+                (table_key, fingerprint)).fetchone()
+        return row["record_id"] if row else None
+
+    def mirror_remove_missing(self, table_key, seen_record_ids):
+        """全量同步后删除表格中已不存在的镜像记录，返回删除条数"""
+        with self._lock, self._conn:
+            existing = {row["record_id"] for row in self._conn.execute(
+                "SELECT record_id FROM bitable_mirror WHERE table_key = ?", (table_key,))}
+            missing = existing - set(seen_record_ids)
+            self._conn.executemany("DELETE FROM bitable_mirror WHERE table_key = ? AND record_id = ?",
+                                   [(table_key, record_id) for record_id in missing])
+        return len(missing)
+
+    def mirror_count(self, table_key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM bitable_mirror WHERE table_key = ?", (table_key,)).fetchone()[0]
+
+    def get_ingest_offset(self, source):
+        """返回 (字节偏移, 开头内容哈希)，未记录时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT byte_offset, head_hash FROM ingest_offsets WHERE source = ?", (source,)).fetchone()
+        return (row["byte_offset"], row["head_hash"]) if row else None
+
+    def set_ingest_offsets(self, rows):
+        """在一个事务中保存多个来源的偏移，rows 为 (来源, 字节偏移, 开头内容哈希) 列表"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ingest_offsets (source, byte_offset, head_hash, updated_at) VALUES (?, ?, ?, ?)",
+                [(source, offset, head_hash, now) for source, offset, head_hash in rows])
+
+    def fired_reminders(self, keys):
+        """返回 keys 中已发送过的提醒"""
+        keys = list(keys)
+        fired = set()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                fired.update(row["reminder_key"] for row in self._conn.execute(
+                    f"SELECT reminder_key FROM deadline_reminders WHERE reminder_key IN ({', '.join('?' * len(chunk))})",
+                    chunk))
+        return fired
+
+    def mark_reminders_fired(self, rows):
+        """在一个事务中记录已发送的提醒，rows 为 (提醒键, 历史记录 id) 列表"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deadline_reminders (reminder_key, history_id, fired_at) VALUES (?, ?, ?)",
+                [(key, history_id, now) for key, history_id in rows])
+
+history_store = None
+history_store_lock = threading.Lock()
+
+def get_history_store():
+    """获取共享的历史记录存储（首次使用时自动迁移旧版 JSON 文件）"""
+    global history_store
+    with history_store_lock:
+        if history_store is None:
+            history_store = HistoryStore(HISTORY_DB_FILE)
+            history_store.migrate_from_json(HISTORY_FILE)
+        return history_store
+
+def save_many_to_history(records):
+    """批量保存处理记录到历史数据库（单个事务）"""
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for notification_data in records:
+        # 添加时间戳
+        notification_data["处理时间"] = now
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        with perf_recorder.span("history_save"):
+            ids = get_history_store().add_many(records)
     except Exception as e:
-        messagebox.showerror("错误", f"保存历史记录时发生错误: {e}")
+        show_error("错误", f"保存历史记录时发生错误: {e}")
+        return []
+    scheduler = deadline_scheduler
+    if scheduler is not None:
+        # 新保存的记录直接加入提醒队列，无需重新扫描历史记录
+        scheduler.add_records(records, ids)
+    return ids
+
+def save_to_history(notification_data):
+    """保存处理记录到历史数据库"""
+    ids = save_many_to_history([notification_data])
+    return ids[0] if ids else None
 
 def load_history():
     """加载历史记录"""
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
-    except:
+        return get_history_store().all()
+    except Exception as e:
+        print(f"错误：读取历史记录时发生错误: {e}")
         return []
 
 def get_current_date_iso():
     """获取当前日期（ISO格式）"""
     return datetime.date.today().isoformat()
 
-def extract_info_with_doubao_api(text):
-    """使用豆包API提取通知信息"""
-    global config
-    
-    VOLC_API_KEY = config.get("VOLC_API_KEY")
-    VOLC_ENDPOINT_ID = config.get("VOLC_ENDPOINT_ID")
-    
-    if not VOLC_API_KEY or not VOLC_ENDPOINT_ID:
-        messagebox.showerror("错误", "豆包API的 VOLC_API_KEY 或 VOLC_ENDPOINT_ID 未在配置中设置。")
-        title = text.split("\n")[0][:60].strip()
-        return {"title": title, "summary": text, "deadline": None}
+# HTTP 接口对应的性能统计阶段
+PERF_ENDPOINT_STAGES = {"volc": "llm_call", "feishu_auth": "token_fetch", "feishu_bitable": "bitable_write",
+                        "feishu_bot": "reminder_send"}
+PERF_PERCENTILES = (50, 95, 99)
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {VOLC_API_KEY}"
-    }
-    
-    prompt = f"""请从以下通知文本中提取三个关键信息：通知标题、通知详情摘要和最晚截止日期。请严格按照以下JSON格式返回结果，确保所有字符串值都用双引号括起来。
+class PerfRecorder:
+    """记录一次运行中各阶段的耗时与计数，生成 p50/p95/p99 报告
+
+    阶段：split（分割）、llm_call（豆包请求）、llm_stream（流式接收完整响应）、json_parse（解析返回内容）、
+    token_fetch（获取飞书 token）、bitable_write（写入多维表格）、history_save（保存历史记录）、
+    reminder_send（发送截止日期提醒）。
+    计数：HTTP 请求/重试/失败次数、发送字节数、提取缓存命中/未命中等。
+    开始运行时可指定 cProfile 输出文件，各线程分别剖析，结束时合并写入。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start_run()
+
+    def start_run(self, profile_file=None):
+        """清空统计，开始新一次运行"""
+        with self._lock:
+            self.spans = {}
+            self.counters = {}
+            self.started_at = time.time()
+            self.started = time.monotonic()
+            self.elapsed = None
+            self.profile_file = profile_file
+            self._profiles = []
+
+    def finish_run(self):
+        """结束本次运行，启用剖析时写入合并后的 cProfile 结果"""
+        with self._lock:
+            self.elapsed = time.monotonic() - self.started
+            profiles, self._profiles = self._profiles, []
+            profile_file = self.profile_file
+        if profile_file and profiles:
+            import pstats
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(profile_file)
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        """计时上下文：with perf_recorder.span("split"): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.spans.setdefault(stage, []).append(seconds)
+
+    def timed_iter(self, iterable, stage):
+        """包装迭代器，记录每次取出下一项的耗时（用于生成器形式的分割）"""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - started)
+            yield item
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def profiled(self, func, *args, **kwargs):
+        """在当前线程中调用 func，本次运行启用剖析时记录 cProfile 数据"""
+        if not self.profile_file:
+            return func(*args, **kwargs)
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._profiles.append(profile)
+
+    @staticmethod
+    def _percentile(sorted_values, percent):
+        """最近秩法计算百分位数"""
+        index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+        return sorted_values[min(index, len(sorted_values) - 1)]
+
+    def report(self):
+        """返回本次运行的统计报告（dict，耗时单位为秒）"""
+        with self._lock:
+            spans = {stage: sorted(values) for stage, values in self.spans.items()}
+            counters = dict(self.counters)
+            elapsed = self.elapsed if self.elapsed is not None else time.monotonic() - self.started
+            started_at = self.started_at
+        stages = {}
+        for stage, values in spans.items():
+            stages[stage] = {"count": len(values), "total": sum(values), "max": values[-1]}
+            for percent in PERF_PERCENTILES:
+                stages[stage][f"p{percent}"] = self._percentile(values, percent)
+        return {"started_at": datetime.datetime.fromtimestamp(started_at).isoformat(timespec="seconds"),
+                "elapsed": elapsed, "stages": stages, "counters": counters}
+
+    def to_json(self):
+        return json.dumps(self.report(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """以 Prometheus 文本格式导出（summary + counter）"""
+        report = self.report()
+        lines = ["# HELP feishu_helper_stage_seconds Time spent per pipeline stage.",
+                 "# TYPE feishu_helper_stage_seconds summary"]
+        for stage, data in sorted(report["stages"].items()):
+            for percent in PERF_PERCENTILES:
+                lines.append(f'feishu_helper_stage_seconds{{stage="{stage}",quantile="{percent / 100}"}} '
+                             f'{data[f"p{percent}"]:.6f}')
+            lines.append(f'feishu_helper_stage_seconds_sum{{stage="{stage}"}} {data["total"]:.6f}')
+            lines.append(f'feishu_helper_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+        lines += ["# HELP feishu_helper_events_total Pipeline event counters.",
+                  "# TYPE feishu_helper_events_total counter"]
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f'feishu_helper_events_total{{name="{name}"}} {value}')
+        lines += ["# HELP feishu_helper_run_seconds Wall time of the run.",
+                  "# TYPE feishu_helper_run_seconds gauge",
+                  f"feishu_helper_run_seconds {report['elapsed']:.6f}"]
+        return "\n".join(lines) + "\n"
+
+    def format_report(self):
+        """生成显示在结果区域的文字报告"""
+        report = self.report()
+        lines = [f"=== 性能报告（总耗时 {report['elapsed']:.2f}s）==="]
+        for stage, data in sorted(report["stages"].items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"  {stage:<14} 次数 {data['count']:>5}  合计 {data['total']:.3f}s  "
+                         f"p50 {data['p50'] * 1000:.1f}ms  p95 {data['p95'] * 1000:.1f}ms  "
+                         f"p99 {data['p99'] * 1000:.1f}ms")
+        if report["counters"]:
+            lines.append("  计数：" + "，".join(f"{name}={value}" for name, value in sorted(report["counters"].items())))
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """按扩展名导出报告：.prom/.txt 为 Prometheus 文本格式，其余为 JSON"""
+        content = self.to_prometheus() if path.lower().endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+perf_recorder = PerfRecorder()
+
+class TokenBucket:
+    """令牌桶限流器（线程安全）"""
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，必要时等待，返回等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class HttpClient:
+    """共享的 HTTP 客户端：连接池复用、按接口限流、失败后指数退避重试
+
+    endpoint 为限流与统计使用的接口名（如 "volc"、"feishu_auth"、"feishu_bitable"）。
+    重试用尽后与 requests 行为一致：返回最后一次响应或抛出最后一次的异常。
+    """
+    def __init__(self, rate_limits=None, max_retries=3, backoff_base=0.5, backoff_max=30.0, pool_size=16):
+        self.rate_limits = rate_limits or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.attempts = deque(maxlen=2000)
+        self.counters = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, endpoint):
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_limits.get(endpoint, 0))
+                self._buckets[endpoint] = bucket
+            return bucket
+
+    def _record(self, endpoint, method, attempt, started, status=None, error=None, retry=False):
+        """记录单次请求的耗时与结果"""
+        elapsed = time.monotonic() - started
+        perf_recorder.count("http_requests")
+        if retry:
+            perf_recorder.count("http_retries")
+        elif error or (status is not None and status >= 400):
+            perf_recorder.count("http_failures")
+        with self._lock:
+            self.attempts.append({"endpoint": endpoint, "method": method, "attempt": attempt,
+                                  "status": status, "error": error, "elapsed": elapsed, "time": time.time()})
+            counter = self.counters.setdefault(endpoint, {"attempts": 0, "retries": 0, "failures": 0})
+            counter["attempts"] += 1
+            if retry:
+                counter["retries"] += 1
+            elif error or (status is not None and status >= 400):
+                counter["failures"] += 1
+
+    @staticmethod
+    def _retry_after(response):
+        """解析 Retry-After / x-ogw-ratelimit-reset 响应头，返回等待秒数或 None"""
+        for header in ("Retry-After", "x-ogw-ratelimit-reset"):
+            value = response.headers.get(header)
+            if not value:
+                continue
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+            try:
+                from email.utils import parsedate_to_datetime
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+        return None
+
+    @staticmethod
+    def _feishu_code(response):
+        """读取飞书响应体中的错误码（非 JSON 时返回 None）"""
+        if "json" not in response.headers.get("Content-Type", ""):
+            return None
+        try:
+            return response.json().get("code")
+        except (ValueError, AttributeError):
+            return None
+
+    def _backoff(self, attempt):
+        """带随机抖动的指数退避时间"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, method, url, endpoint="default", **kwargs):
+        """发送请求，遇到限流、5xx、网络错误或飞书可重试错误码时自动重试"""
+        with perf_recorder.span(PERF_ENDPOINT_STAGES.get(endpoint, "http_other")):
+            return self._request(bucket=self._bucket(endpoint), method=method, url=url, endpoint=endpoint, **kwargs)
+
+    def _request(self, bucket, method, url, endpoint, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            started = time.monotonic()
+            last_attempt = attempt >= self.max_retries
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(endpoint, method, attempt, started, error=str(e), retry=not last_attempt)
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            body = getattr(response.request, "body", None)
+            if body:
+                perf_recorder.count("http_bytes_sent", len(body))
+            retryable = response.status_code in RETRY_STATUS_CODES
+            if not retryable and not kwargs.get("stream"):
+                retryable = self._feishu_code(response) in FEISHU_RETRY_CODES
+            self._record(endpoint, method, attempt, started, status=response.status_code,
+                         retry=retryable and not last_attempt)
+            if not retryable or last_attempt:
+                return response
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff(attempt)
+            response.close()
+            time.sleep(min(delay, self.backoff_max * 2))
+        return response
+
+    def post(self, url, endpoint="default", **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def put(self, url, endpoint="default", **kwargs):
+        return self.request("PUT", url, endpoint=endpoint, **kwargs)
+
+    def get(self, url, endpoint="default", **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def stats(self):
+        """返回各接口的请求/重试/失败计数"""
+        with self._lock:
+            return {endpoint: dict(counter) for endpoint, counter in self.counters.items()}
+
+http_client = None
+http_client_lock = threading.Lock()
+
+def get_http_client():
+    """获取所有豆包/飞书调用共享的 HTTP 客户端"""
+    global http_client
+    with http_client_lock:
+        if http_client is None:
+            feishu_rate = float(config.get("FEISHU_RATE_LIMIT", 10))
+            http_client = HttpClient(
+                rate_limits={
+                    "volc": float(config.get("VOLC_RATE_LIMIT", 10)),
+                    "feishu_auth": feishu_rate,
+                    "feishu_bitable": feishu_rate,
+                    # 飞书自定义机器人限频 5 次/秒
+                    "feishu_bot": min(feishu_rate, 5)
+                },
+                max_retries=int(config.get("HTTP_MAX_RETRIES", 3)),
+                backoff_base=float(config.get("HTTP_BACKOFF_BASE", 0.5)))
+        return http_client
+
+WHITESPACE_RUN_PATTERN = lazy_pattern(r"\s+")
+
+def normalize_notice_text(text):
+    """规范化通知文本（全半角、空白、换行），用于计算缓存键"""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = (WHITESPACE_RUN_PATTERN.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+class ExtractionCache:
+    """豆包提取结果的持久化缓存（SQLite，按最近使用淘汰，超过有效期失效）"""
+    def __init__(self, db_file, max_entries=5000, ttl_days=30):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache ("
+            "cache_key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used ON extraction_cache (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text, model, task="extract"):
+        """由规范化文本、提示词版本、模型（及非默认的任务类型）生成缓存键"""
+        raw = f"{PROMPT_VERSION}\n{model}\n{normalize_notice_text(text)}"
+        if task != "extract":
+            raw = f"{task}\n{raw}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """读取缓存，未命中或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM extraction_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM extraction_cache WHERE cache_key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                perf_recorder.count("cache_misses")
+                return None
+            self._conn.execute("UPDATE extraction_cache SET last_used = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            perf_recorder.count("cache_hits")
+            return json.loads(row[0])
 
-关于"deadline"字段：
+    def put(self, key, result):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (cache_key, result, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False), now, now))
+            count = self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM extraction_cache WHERE cache_key IN ("
+                    "SELECT cache_key FROM extraction_cache ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,))
+            self._conn.commit()
+
+    def stats(self):
+        """返回 (命中次数, 未命中次数)"""
+        with self._lock:
+            return self.hits, self.misses
+
+extraction_cache = None
+extraction_cache_lock = threading.Lock()
+
+def get_extraction_cache():
+    """获取共享的提取缓存，未启用或打开失败时返回 None"""
+    global extraction_cache
+    if not config.get("EXTRACTION_CACHE_ENABLED", True):
+        return None
+    with extraction_cache_lock:
+        if extraction_cache is None:
+            try:
+                extraction_cache = ExtractionCache(
+                    EXTRACTION_CACHE_FILE,
+                    max_entries=int(config.get("EXTRACTION_CACHE_MAX_ENTRIES", 5000)),
+                    ttl_days=float(config.get("EXTRACTION_CACHE_TTL_DAYS", 30)))
+            except sqlite3.Error as e:
+                print(f"警告：打开提取缓存失败，将不使用缓存: {e}")
+                config["EXTRACTION_CACHE_ENABLED"] = False
+                return None
+        return extraction_cache
+
+# 提取规则（单条与批量提取共用）
+EXTRACTION_RULES = """关于"deadline"字段：
 - 请识别文本中所有与截止相关的日期和时间表述。
 - 如果有多个截止日期，请选择最晚的那一个。
 - 如果截止日期只提到月份（例如"8月截止"），请将其转换为当年该月的最后一天（例如，如果当前是2025年，8月截止应为2025-08-31）。
@@ -113,7 +996,30 @@ def extract_info_with_doubao_api(text):
 
 关于"summary"字段：
 - 请生成一个精简的通知详情摘要，确保不丢失原文的主要信息。
-- **重要：摘要内容不应重复或包含已提取的"通知标题"中的文字。**
+- **重要：摘要内容不应重复或包含已提取的"通知标题"中的文字。**"""
+
+CJK_CHAR_PATTERN = lazy_pattern(r"[\u3000-\u9fff\uff00-\uffef]")
+
+def estimate_tokens(text):
+    """粗略估算文本的 token 数（中文约每字 1 个，其余约每 4 个字符 1 个）"""
+    cjk_count = len(CJK_CHAR_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+def strip_code_fence(message_content):
+    """去掉模型返回内容外层的 ```json 代码块标记"""
+    message_content = message_content.strip()
+    if message_content.startswith("```json"):
+        message_content = message_content[7:]
+    elif message_content.startswith("```"):
+        message_content = message_content[3:]
+    if message_content.endswith("```"):
+        message_content = message_content[:-3]
+    return message_content.strip()
+
+# 固定的系统提示词（放在消息开头，每次请求完全相同，便于服务端复用前缀缓存）
+EXTRACTION_SYSTEM_PROMPT = f"""你负责从院校通知文本中提取三个关键信息：通知标题、通知详情摘要和最晚截止日期。请严格按照以下JSON格式返回结果，确保所有字符串值都用双引号括起来。
+
+{EXTRACTION_RULES}
 
 输出JSON格式：
 {{
@@ -122,53 +1028,422 @@ def extract_info_with_doubao_api(text):
   "deadline": "YYYY-MM-DD格式的最晚截止日期或null"
 }}
 
-通知文本如下：
----开始---
-{text}
----结束---
+通知文本位于用户消息的 ---开始--- 与 ---结束--- 之间，其中的 [链接] 表示已省略的网址。请只输出上述JSON。"""
+
+BATCH_EXTRACTION_SYSTEM_PROMPT = f"""你负责从多条院校通知文本中，分别提取每条通知的三个关键信息：通知标题、通知详情摘要和最晚截止日期。每条通知单独处理，互不影响。请严格按照以下JSON格式返回结果，确保所有字符串值都用双引号括起来。
+
+{EXTRACTION_RULES}
+
+输出JSON数组，每条通知对应一个对象，index 为通知编号：
+[
+  {{
+    "index": 0,
+    "title": "提取的通知标题",
+    "summary": "生成的通知详情摘要",
+    "deadline": "YYYY-MM-DD格式的最晚截止日期或null"
+  }}
+]
+
+每条通知位于用户消息的 ---通知 N 开始--- 与 ---通知 N 结束--- 之间，其中的 [链接] 表示已省略的网址。请输出包含全部通知结果的JSON数组。"""
+
+SUMMARY_SYSTEM_PROMPT = """你负责为院校通知生成一个精简的通知详情摘要，确保不丢失原文的主要信息。摘要内容不应重复或包含用户给出的通知标题中的文字。请严格按照JSON格式 {"summary": "生成的通知详情摘要"} 输出。"""
+
+# 输入压缩：表情符号、网址、转发/签名套话、分隔线
+EMOJI_PATTERN = lazy_pattern("[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D\u20E3]+")
+WECHAT_EMOJI_PATTERN = lazy_pattern(r"\[(?:微笑|呲牙|偷笑|玫瑰|强|握手|抱拳|OK|胜利|爱心|鼓掌|愉快|调皮|憨笑|咖啡|庆祝|烟花|红包|加油|合十)\]")
+URL_PATTERN = lazy_pattern(r"https?://[^\s，。；）)】\]]+")
+REPEATED_LINK_PATTERN = lazy_pattern(r"\[链接\](?:\s*\[链接\])+")
+BOILERPLATE_LINE_PATTERN = lazy_pattern(
+    r"^(?:发自我的(?:iPhone|iPad|手机|华为手机|小米手机)|Sent from my \w+|以下为转发的?(?:聊天记录|内容|消息)[：:]?|"
+    r"[-—=_*~·.]{3,}|[-—]+\s*转发\s*[-—]+|\[?聊天记录\]?|收到请回复[。！!，,]*(?:谢谢[。！!]*)?|谢谢配合[。！!]*)$",
+    re.IGNORECASE)
+INLINE_SPACES_PATTERN = lazy_pattern(r"[ \t\u3000]{2,}")
+
+def compact_notice_text(text):
+    """去掉通知中与提取无关的内容：表情、网址（替换为 [链接]）、转发/签名套话、分隔线和重复行
+
+    日期、标题等内容不变，压缩结果只用于构造提示词，缓存键和历史记录仍使用原文。
+    """
+    text = EMOJI_PATTERN.sub("", text)
+    text = WECHAT_EMOJI_PATTERN.sub("", text)
+    text = URL_PATTERN.sub("[链接]", text)
+    text = REPEATED_LINK_PATTERN.sub("[链接]", text)
+    lines = []
+    seen = set()
+    for line in text.split("\n"):
+        line = INLINE_SPACES_PATTERN.sub(" ", line).strip()
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if BOILERPLATE_LINE_PATTERN.match(line):
+            continue
+        # 重复的签名、联系方式等只保留第一次出现
+        if line in seen and len(line) > 4:
+            continue
+        seen.add(line)
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+def prepare_notice_for_prompt(text):
+    """按 PROMPT_COMPACTION 配置压缩通知文本，并记录节省的 token 估算值"""
+    if not config.get("PROMPT_COMPACTION", True):
+        return text
+    compacted = compact_notice_text(text)
+    saved = estimate_tokens(text) - estimate_tokens(compacted)
+    if saved > 0:
+        perf_recorder.count("compaction_tokens_saved", saved)
+    return compacted or text
+
+def split_long_notice(text, max_tokens):
+    """把超长通知按段落/行切成不超过 max_tokens 的片段（单行过长时按字符截断）"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in text.split("\n"):
+        pieces = [line]
+        if estimate_tokens(line) > max_tokens:
+            step = max(1, max_tokens)
+            pieces = [line[start:start + step] for start in range(0, len(line), step)]
+        for piece in pieces:
+            tokens = estimate_tokens(piece) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n".join(current).strip())
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+def build_chat_messages(system_prompt, user_content):
+    """组装 system + user 消息，并记录提示词 token 估算值"""
+    perf_recorder.count("prompt_tokens_estimated", estimate_tokens(system_prompt) + estimate_tokens(user_content))
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_content}]
+
+def record_token_usage(response_data):
+    """记录接口返回的 usage（prompt/completion token 数）"""
+    usage = response_data.get("usage") if isinstance(response_data, dict) else None
+    if not usage:
+        return
+    perf_recorder.count("prompt_tokens", int(usage.get("prompt_tokens") or 0))
+    perf_recorder.count("completion_tokens", int(usage.get("completion_tokens") or 0))
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached:
+        perf_recorder.count("prompt_cached_tokens", int(cached))
+
+def normalize_extraction_result(api_result, text):
+    """把模型返回的 JSON 对象整理为 {title, summary, deadline}，截止日期格式无效时置为 None"""
+    extracted_data = {"title": api_result.get("title"), "summary": api_result.get("summary", text), "deadline": None}
+    deadline_from_api = api_result.get("deadline")
+    if deadline_from_api and isinstance(deadline_from_api, str) and ISO_DATE_PATTERN.match(deadline_from_api):
+        extracted_data["deadline"] = deadline_from_api
+    elif deadline_from_api is not None: 
+        print(f"警告：API返回的截止日期 \'{deadline_from_api}\' 不符合YYYY-MM-DD格式或为非null的无效值。将设置为None。")
+    return extracted_data
+
+class IncrementalJsonObjectParser:
+    """增量解析流式返回的 JSON 对象，每个顶层字段的值完整后立即产出
+
+    允许外层包裹 ```json 代码块（代码块标记可以被拆到多个分块中）；内容一旦不可能是
+    合法的 JSON 对象就抛出 ValueError，以便尽早断开流式响应。
+    """
+    FENCE = "```"
+    FENCE_PATTERN = lazy_pattern(r"```[A-Za-z]*")
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.state = "start"  # start -> first_key/key -> colon -> value -> comma -> ... -> end
+        self.key = None
+        self.result = {}
+
+    @property
+    def done(self):
+        return self.state == "end"
 
-请严格按照上述JSON格式输出提取结果："""
+    def _string_end(self, start):
+        """返回从 start 处引号开始的字符串的结束引号位置，尚未接收完整时返回 None"""
+        i = start + 1
+        while i < len(self.buffer):
+            ch = self.buffer[i]
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == '"':
+                return i
+            i += 1
+        return None
+
+    def _value_end(self, start):
+        """返回从 start 开始的值之后的逗号或右括号位置，尚未接收完整时返回 None"""
+        depth = 0
+        i = start
+        while i < len(self.buffer):
+            ch = self.buffer[i]
+            if ch == '"':
+                end = self._string_end(i)
+                if end is None:
+                    return None
+                i = end + 1
+                continue
+            if ch in "{[":
+                depth += 1
+            elif ch in "}]":
+                if depth == 0:
+                    return i
+                depth -= 1
+            elif ch == "," and depth == 0:
+                return i
+            i += 1
+        return None
+
+    def feed(self, chunk):
+        """追加一段文本，返回新完成的 [(键, 值), ...]"""
+        self.buffer += chunk
+        fields = []
+        while self.state != "end":
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos >= len(self.buffer):
+                break
+            ch = self.buffer[self.pos]
+            if self.state == "start":
+                fence = self.FENCE_PATTERN.match(self.buffer, self.pos)
+                if not fence and self.FENCE.startswith(self.buffer[self.pos:]):
+                    # 只收到代码块标记的前一两个反引号，等待后续内容
+                    break
+                if fence:
+                    if fence.end() == len(self.buffer):
+                        break
+                    self.pos = fence.end()
+                elif ch == "{":
+                    self.pos += 1
+                    self.state = "first_key"
+                else:
+                    raise ValueError(f"返回内容不是 JSON 对象（以 {ch!r} 开头）")
+            elif self.state in ("first_key", "key"):
+                if ch == "}" and self.state == "first_key":
+                    self.pos += 1
+                    self.state = "end"
+                    continue
+                if ch != '"':
+                    raise ValueError(f"位置 {self.pos} 处应为字段名，实际为 {ch!r}")
+                end = self._string_end(self.pos)
+                if end is None:
+                    break
+                self.key = json.loads(self.buffer[self.pos:end + 1])
+                self.pos = end + 1
+                self.state = "colon"
+            elif self.state == "colon":
+                if ch != ":":
+                    raise ValueError(f"位置 {self.pos} 处应为冒号，实际为 {ch!r}")
+                self.pos += 1
+                self.state = "value"
+            elif self.state == "value":
+                end = self._value_end(self.pos)
+                if end is None:
+                    break
+                value = json.loads(self.buffer[self.pos:end])
+                self.result[self.key] = value
+                fields.append((self.key, value))
+                self.pos = end
+                self.state = "comma"
+            elif self.state == "comma":
+                if ch == ",":
+                    self.state = "key"
+                elif ch == "}":
+                    self.state = "end"
+                else:
+                    raise ValueError(f"位置 {self.pos} 处应为逗号或右括号，实际为 {ch!r}")
+                self.pos += 1
+        return fields
+
+    def finish(self):
+        """流结束时返回完整的对象，对象未闭合时抛出 ValueError"""
+        if self.state != "end":
+            raise ValueError("流式响应在 JSON 对象结束前中断")
+        return self.result
+
+class StreamingMetrics:
+    """流式提取的耗时统计：首个字段到达耗时（time-to-first-field）与完整耗时"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.first_field_seconds = deque(maxlen=1000)
+        self.total_seconds = deque(maxlen=1000)
+        self.aborted = 0
+
+    def record(self, first_field_seconds, total_seconds, aborted=False):
+        with self._lock:
+            if first_field_seconds is not None:
+                self.first_field_seconds.append(first_field_seconds)
+            self.total_seconds.append(total_seconds)
+            if aborted:
+                self.aborted += 1
+
+    def stats(self):
+        """返回 {"count", "first_field_avg", "first_field_max", "total_avg", "aborted"}（秒）"""
+        with self._lock:
+            first = list(self.first_field_seconds)
+            total = list(self.total_seconds)
+            return {
+                "count": len(total),
+                "first_field_avg": sum(first) / len(first) if first else None,
+                "first_field_max": max(first) if first else None,
+                "total_avg": sum(total) / len(total) if total else None,
+                "aborted": self.aborted
+            }
+
+streaming_metrics = StreamingMetrics()
+
+def stream_chunk_content(chunk):
+    """取出 SSE 分块中的增量文本（没有时返回 None），分块结构不符合预期时抛出 ValueError
+
+    只有携带 usage 的最后一个分块允许 choices 为空列表。
+    """
+    if not isinstance(chunk, dict):
+        raise ValueError(f"流式响应分块不是JSON对象: {str(chunk)[:200]}")
+    if chunk.get("error"):
+        raise ValueError(f"流式响应返回错误: {chunk['error']}")
+    choices, usage = chunk.get("choices"), chunk.get("usage")
+    malformed = ValueError(f"流式响应分块结构不符合预期: {str(chunk)[:200]}")
+    if not isinstance(choices, list) or not isinstance(usage, (dict, type(None))) or not (choices or usage):
+        raise malformed
+    if not choices:
+        return None
+    if not isinstance(choices[0], dict):
+        raise malformed
+    delta = choices[0].get("delta")
+    if delta is None:
+        return None
+    if not isinstance(delta, dict) or not isinstance(delta.get("content"), (str, type(None))):
+        raise malformed
+    return delta.get("content")
+
+def stream_doubao_json(headers, payload, on_field=None, timeout=45):
+    """以 SSE 流式调用豆包API，边接收边解析返回的 JSON 对象并返回
+
+    on_field(键, 值) 在每个顶层字段接收完整时回调；返回内容不是合法 JSON 对象或分块结构
+    不符合预期时立即断开连接并抛出 ValueError。对象接收完整后继续读到 [DONE]，以便记录最后一个
+    分块中的 token 用量（include_usage），耗时统计仍按对象接收完整的时间计算。
+    """
+    started = time.monotonic()
+    first_field_seconds = None
+    completed_seconds = None
+    parser = IncrementalJsonObjectParser()
+    response = get_http_client().post(VOLC_API_BASE_URL, endpoint="volc", headers=headers,
+                                      json=dict(payload, stream=True, stream_options={"include_usage": True}),
+                                      timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            content = stream_chunk_content(chunk)
+            record_token_usage(chunk)
+            if not content or parser.done:
+                # 对象之后的内容（如代码块结束标记）不再解析
+                continue
+            for key, value in parser.feed(content):
+                if first_field_seconds is None:
+                    first_field_seconds = time.monotonic() - started
+                if on_field:
+                    on_field(key, value)
+            if parser.done:
+                completed_seconds = time.monotonic() - started
+        result = parser.finish()
+    except ValueError:
+        streaming_metrics.record(first_field_seconds, time.monotonic() - started, aborted=True)
+        raise
+    finally:
+        response.close()
+    streaming_metrics.record(first_field_seconds, completed_seconds)
+    perf_recorder.observe("llm_stream", completed_seconds)
+    return result
+
+def extract_info_with_doubao_api(text, use_cache=True, on_field=None):
+    """使用豆包API提取通知信息
+
+    启用 VOLC_STREAMING 时以流式方式调用，on_field(键, 值) 在每个字段接收完整时回调。
+    """
+    VOLC_API_KEY = config.get("VOLC_API_KEY")
+    VOLC_ENDPOINT_ID = config.get("VOLC_ENDPOINT_ID")
+    
+    if not VOLC_API_KEY or not VOLC_ENDPOINT_ID:
+        show_error("错误", "豆包API的 VOLC_API_KEY 或 VOLC_ENDPOINT_ID 未在配置中设置。")
+        title = text.split("\n")[0][:60].strip()
+        return {"title": title, "summary": text, "deadline": None}
+
+    # 相同通知已提取过时直接使用缓存结果，不再调用API
+    cache = get_extraction_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = ExtractionCache.make_key(text, VOLC_ENDPOINT_ID)
+        cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+
+    # 压缩输入；超出 VOLC_MAX_NOTICE_TOKENS 的长通知分段提取，避免单次请求超时
+    prompt_text = prepare_notice_for_prompt(text)
+    max_notice_tokens = int(config.get("VOLC_MAX_NOTICE_TOKENS", 3000))
+    if estimate_tokens(prompt_text) > max_notice_tokens:
+        extracted_data = extract_long_notice_with_doubao_api(prompt_text, max_notice_tokens)
+        if cache is not None and extracted_data.get("title"):
+            cache.put(cache_key, extracted_data)
+        if on_field:
+            for key, value in extracted_data.items():
+                on_field(key, value)
+        return extracted_data
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {VOLC_API_KEY}"
+    }
     
     payload = {
         "model": VOLC_ENDPOINT_ID,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
+        "messages": build_chat_messages(EXTRACTION_SYSTEM_PROMPT, f"通知文本如下：\n---开始---\n{prompt_text}\n---结束---"),
         "stream": False,
         "temperature": 0.3 
     }
     
     extracted_data = {"title": None, "summary": text, "deadline": None}
 
+    if config.get("VOLC_STREAMING", False):
+        try:
+            api_result = stream_doubao_json(headers, payload, on_field)
+            extracted_data = normalize_extraction_result(api_result, text)
+            if cache is not None:
+                cache.put(cache_key, extracted_data)
+        except ValueError as e:
+            print(f"错误：豆包API流式返回的内容无法解析为JSON，已提前断开: {e}")
+            extracted_data["title"] = text.split("\n")[0][:60].strip()
+        except requests.exceptions.RequestException as e:
+            print(f"错误：调用豆包API时发生网络或HTTP错误: {e}")
+        return extracted_data
+
     try:
-        response = requests.post(VOLC_API_BASE_URL, headers=headers, json=payload, timeout=45)
+        response = get_http_client().post(VOLC_API_BASE_URL, endpoint="volc", headers=headers, json=payload, timeout=45)
         response.raise_for_status()
         response_data = response.json()
+        record_token_usage(response_data)
         
         if response_data.get("choices") and len(response_data["choices"]) > 0:
             message_content = response_data["choices"][0].get("message", {}).get("content", "")
             try:
-                if message_content.startswith("```json"):
-                    message_content = message_content[7:]
-                if message_content.endswith("```"):
-                    message_content = message_content[:-3]
-                message_content = message_content.strip()
-
-                api_result = json.loads(message_content)
-                extracted_data["title"] = api_result.get("title")
-                extracted_data["summary"] = api_result.get("summary", text) 
-                deadline_from_api = api_result.get("deadline")
-                
-                if deadline_from_api and isinstance(deadline_from_api, str) and re.match(r"^\d{4}-\d{2}-\d{2}$", deadline_from_api):
-                    extracted_data["deadline"] = deadline_from_api
-                elif deadline_from_api is not None: 
-                    print(f"警告：API返回的截止日期 \'{deadline_from_api}\' 不符合YYYY-MM-DD格式或为非null的无效值。将设置为None。")
-                    extracted_data["deadline"] = None
-                else: 
-                    extracted_data["deadline"] = None
+                with perf_recorder.span("json_parse"):
+                    message_content = strip_code_fence(message_content)
+                    api_result = json.loads(message_content)
+                    extracted_data = normalize_extraction_result(api_result, text)
+
+                if cache is not None:
+                    cache.put(cache_key, extracted_data)
 
             except json.JSONDecodeError as je:
                 print(f"错误：解析豆包API返回的JSON时出错: {je}。API原始响应: {message_content}")
@@ -186,176 +1461,1813 @@ def extract_info_with_doubao_api(text):
     
     return extracted_data
 
+def extract_long_notice_with_doubao_api(text, max_tokens):
+    """超长通知分段并发提取（map），再合并为一个结果（reduce）
+
+    标题取第一个有标题的片段，截止日期取各片段中最晚的一个；
+    合并后的摘要仍超过 max_tokens 的一半时再请求一次摘要。
+    """
+    chunks = split_long_notice(text, max_tokens)
+    perf_recorder.count("long_notice_chunks", len(chunks))
+    workers = min(len(chunks), max(1, int(config.get("VOLC_MAX_WORKERS", 4))))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="volc-map") as executor:
+        partials = list(executor.map(lambda chunk: extract_info_with_doubao_api(chunk, use_cache=False), chunks))
+    title = next((partial["title"] for partial in partials if partial.get("title")), None)
+    deadlines = [partial["deadline"] for partial in partials if partial.get("deadline")]
+    summary = "\n".join(partial["summary"] for partial in partials if partial.get("summary"))
+    if estimate_tokens(summary) > max_tokens // 2:
+        summary = summarize_with_doubao_api(summary, title or "") or summary
+    return {"title": title, "summary": summary, "deadline": max(deadlines) if deadlines else None}
+
+def extract_info_batch_with_doubao_api(texts):
+    """把多条通知合并到一次豆包请求中提取，返回与 texts 等长的 {title, summary, deadline} 列表
+
+    已缓存的通知不进入请求；返回的 JSON 数组按 index 对应回各条通知，
+    数组无法解析或缺少某条结果时，对应的通知回退为单条提取。
+    """
+    VOLC_API_KEY = config.get("VOLC_API_KEY")
+    VOLC_ENDPOINT_ID = config.get("VOLC_ENDPOINT_ID")
+    if not VOLC_API_KEY or not VOLC_ENDPOINT_ID or len(texts) <= 1:
+        return [extract_info_with_doubao_api(text) for text in texts]
+
+    results = [None] * len(texts)
+    cache = get_extraction_cache()
+    cache_keys = {}
+    pending = []
+    for i, text in enumerate(texts):
+        if cache is not None:
+            cache_keys[i] = ExtractionCache.make_key(text, VOLC_ENDPOINT_ID)
+            results[i] = cache.get(cache_keys[i])
+        if results[i] is None:
+            pending.append(i)
+    if len(pending) == 1:
+        results[pending[0]] = extract_info_with_doubao_api(texts[pending[0]], use_cache=False)
+        if cache is not None and results[pending[0]].get("title"):
+            cache.put(cache_keys[pending[0]], results[pending[0]])
+        pending = []
+    if not pending:
+        return results
+
+    notices_text = "\n\n".join(
+        f"---通知 {index} 开始---\n{prepare_notice_for_prompt(texts[i])}\n---通知 {index} 结束---"
+        for index, i in enumerate(pending))
+    user_content = f"共 {len(pending)} 条通知，通知文本如下：\n{notices_text}"
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {VOLC_API_KEY}"
+    }
+    payload = {
+        "model": VOLC_ENDPOINT_ID,
+        "messages": build_chat_messages(BATCH_EXTRACTION_SYSTEM_PROMPT, user_content),
+        "stream": False,
+        "temperature": 0.3
+    }
+    timeout = min(120, 45 + 15 * (len(pending) - 1))
+    try:
+        response = get_http_client().post(VOLC_API_BASE_URL, endpoint="volc", headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        response_data = response.json()
+        record_token_usage(response_data)
+        message_content = response_data["choices"][0]["message"]["content"]
+        with perf_recorder.span("json_parse"):
+            api_results = json.loads(strip_code_fence(message_content))
+        if isinstance(api_results, dict):
+            api_results = api_results.get("results", [])
+        for position, api_result in enumerate(api_results):
+            if not isinstance(api_result, dict):
+                continue
+            index = api_result.get("index", position if len(api_results) == len(pending) else None)
+            if isinstance(index, int) and 0 <= index < len(pending) and results[pending[index]] is None:
+                i = pending[index]
+                results[i] = normalize_extraction_result(api_result, texts[i])
+                if cache is not None:
+                    cache.put(cache_keys[i], results[i])
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+        print(f"错误：批量调用豆包API失败，将改为逐条提取: {e}")
+
+    # 未能从批量结果中取得的通知逐条提取
+    for i in pending:
+        if results[i] is None:
+            results[i] = extract_info_with_doubao_api(texts[i], use_cache=False)
+            if cache is not None and results[i].get("title"):
+                cache.put(cache_keys[i], results[i])
+    return results
+
+def plan_extraction_batches(items):
+    """按 token 预算把 (序号, 通知文本) 分组，供批量提取使用
+
+    items 可以是生成器，每凑满一组即产出；超出单条上限的长通知单独成组。
+    """
+    budget = int(config.get("VOLC_BATCH_TOKEN_BUDGET", 2000))
+    max_notices = max(1, int(config.get("VOLC_BATCH_MAX_NOTICES", 8)))
+    group = []
+    group_tokens = 0
+    for i, text in items:
+        tokens = estimate_tokens(text)
+        if tokens > budget // 2:
+            yield [(i, text)]
+            continue
+        if group and (group_tokens + tokens > budget or len(group) >= max_notices):
+            yield group
+            group = []
+            group_tokens = 0
+        group.append((i, text))
+        group_tokens += tokens
+    if group:
+        yield group
+
+# 新通知起始行：中文序号加冒号（如"一："）、【标题】、"通知："或"重要通知："
+NOTIFICATION_START_PATTERN = lazy_pattern(r"(?:[一二三四五六七八九十百千万]+：|【|(?:重要)?通知：)")
+
 def is_new_notification_start(line_text):
     """判断是否是新通知的开始"""
-    stripped_line = line_text.strip()
-    if re.match(r"^[一二三四五六七八九十百千万]+：", stripped_line):
-        return True
-    if stripped_line.startswith("【"):
-        if not re.match(r"^[一二三四五六七八九十百千万]+：\s*【", stripped_line):
-            return True
-    if re.match(r"^(重要)?通知：", stripped_line):
-        return True
-    return False
+    return NOTIFICATION_START_PATTERN.match(line_text.lstrip()) is not None
 
-def split_notifications(text_block):
-    """将文本块分割成多个通知"""
-    lines = text_block.strip().split("\n")
-    if not lines:
-        return []
-    notifications = []
+def iter_split_notifications(lines):
+    """逐行分割通知的生成器
+
+    lines 可以是任意按行迭代的对象（行列表、文件对象等），行尾换行符可有可无。
+    每识别出一条完整通知立即产出，不需要等待全部输入读取完毕。
+    """
     current_notification_lines = []
     first_content_line_found = False
     for line_content in lines:
+        if line_content.endswith("\n"):
+            line_content = line_content[:-1]
         if not line_content.strip():
-            if not first_content_line_found:
-                continue
-            current_notification_lines.append(line_content)
+            if first_content_line_found:
+                current_notification_lines.append(line_content)
             continue
-        if not first_content_line_found:
-            first_content_line_found = True
-        if current_notification_lines and is_new_notification_start(line_content):
-            notifications.append("\n".join(current_notification_lines).strip())
+        if first_content_line_found and is_new_notification_start(line_content):
+            notification = "\n".join(current_notification_lines).strip()
+            if notification:
+                yield notification
             current_notification_lines = [line_content]
         else:
             current_notification_lines.append(line_content)
+        first_content_line_found = True
     if current_notification_lines:
-        notifications.append("\n".join(current_notification_lines).strip())
-    return [n for n in notifications if n.strip()]
+        notification = "\n".join(current_notification_lines).strip()
+        if notification:
+            yield notification
+
+def split_notifications(text_block):
+    """将文本块分割成多个通知"""
+    with perf_recorder.span("split"):
+        return list(iter_split_notifications(io.StringIO(text_block)))
+
+def iter_notifications_from_stream(stream, start_offset=0):
+    """从二进制流中逐行读取并分割通知，返回 (起始字节偏移, 结束字节偏移, 通知文本) 的迭代器
+
+    分割规则与 iter_split_notifications 相同，额外记录每条通知在输入中的字节范围，
+    不需要把整个文件读入内存。
+    """
+    offset = start_offset
+    block_lines = []
+    block_start = offset
+    block_has_content = False
+    for raw_line in stream:
+        line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
+        if offset == 0:
+            line = line.lstrip("\ufeff")
+        if line.strip():
+            if block_has_content and is_new_notification_start(line):
+                yield block_start, offset, "\n".join(block_lines).strip()
+                block_lines = []
+                block_start = offset
+            block_has_content = True
+        block_lines.append(line)
+        offset += len(raw_line)
+    if block_has_content:
+        yield block_start, offset, "\n".join(block_lines).strip()
+
+# 本地规则提取：日期表达式
+DATE_FULL_PATTERN = lazy_pattern(r"(\d{4})\s*[年\-/.]\s*(\d{1,2})\s*[月\-/.]\s*(\d{1,2})\s*[日号]?")
+DATE_MONTH_DAY_PATTERN = lazy_pattern(r"(?<![\d年])(\d{1,2})\s*月\s*(\d{1,2})\s*[日号]")
+DATE_DAY_RANGE_PATTERN = lazy_pattern(r"(\d{1,2})\s*月\s*(\d{1,2})\s*[日号]?\s*(?:至|到|—|–|-|~|～)\s*(\d{1,2})\s*[日号]")
+DATE_MONTH_ONLY_PATTERN = lazy_pattern(
+    r"(?<![\d年\-/.])(\d{1,2})\s*月(?:份|底|末)?\s*(?=前|之前|以前|截止|结束)|截止(?:日期|时间)?[为是：:]?\s*(\d{1,2})\s*月(?![\d份]*\s*\d)")
+DATE_END_OF_THIS_MONTH_PATTERN = lazy_pattern(r"本月(?:底|末)")
+DATE_RANGE_CONNECTOR_PATTERN = lazy_pattern(r"\s*(?:至|到|—|–|-|~|～)\s*")
+DEADLINE_KEYWORD_PATTERN = lazy_pattern(
+    r"截止|截至|之前|以前|(?<!提)前|最晚|不晚于|不超过|逾期|期限|报名|提交|上交|上报|缴纳|缴费|完成|选课|申请")
+DEADLINE_STRONG_KEYWORD_PATTERN = lazy_pattern(r"截止|截至|最晚|期限|逾期")
+EXPLICIT_YEAR_PATTERN = lazy_pattern(r"(?<![\d\-])(20\d{2})\s*年")
+RELATIVE_DATE_PATTERN = lazy_pattern(r"今天|明天|后天|本周|下周|下个?月|周[一二三四五六日天]|星期|另行通知|待定")
+CLAUSE_SPLIT_PATTERN = lazy_pattern(r"[。；;！!？?\n]")
+TITLE_PREFIX_PATTERN = lazy_pattern(r"^(?:[一二三四五六七八九十百千万]+[：:]\s*)?")
+TITLE_NOTICE_PREFIX_PATTERN = lazy_pattern(r"^(?:重要)?通知[：:]\s*")
+TITLE_TAG_PATTERN = lazy_pattern(r"^【([^】]{1,6})】(?=.)")
+TITLE_BRACKET_PATTERN = lazy_pattern(r"^【([^】]+)】")
+TITLE_CLAUSE_SPLIT_PATTERN = lazy_pattern(r"[，,。；;]")
+TITLE_LEADING_BRACKET_PATTERN = lazy_pattern(r"^\s*【([^】]+)】")
+TITLE_ABOUT_PATTERN = lazy_pattern(r"^关于.{2,58}的(?:通知|公告|通告|函)$")
+
+def safe_date(year, month, day):
+    """构造日期，不合法时返回 None"""
+    try:
+        return datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+def find_dates_in_clause(clause, default_year):
+    """找出一个分句中的全部日期（范围取两端），返回 (日期列表, 分句中最后出现的年份)
+
+    未写年份的日期按出现顺序沿用前一个年份；范围的结束日期早于开始日期时（如“12月28日至1月5日”）
+    视为跨年，年份加一。
+    """
+    # (起始位置, 结束位置, 年份或 None, 月, 日或 None)，日为 None 表示该月最后一天
+    found = []
+    for m in DATE_FULL_PATTERN.finditer(clause):
+        found.append((m.start(), m.end(), int(m.group(1)), int(m.group(2)), int(m.group(3))))
+    for m in DATE_MONTH_DAY_PATTERN.finditer(clause):
+        found.append((m.start(), m.end(), None, int(m.group(1)), int(m.group(2))))
+    for m in DATE_DAY_RANGE_PATTERN.finditer(clause):
+        found.append((m.start(3), m.end(), None, int(m.group(1)), int(m.group(3))))
+    for m in DATE_MONTH_ONLY_PATTERN.finditer(clause):
+        found.append((m.start(), m.end(), None, int(m.group(1) or m.group(2)), None))
+    dates = []
+    year = default_year
+    previous = None
+    for start, end, explicit_year, month, day in sorted(found, key=lambda item: item[:2]):
+        if explicit_year is not None:
+            year = explicit_year
+        if not 1 <= month <= 12:
+            continue
+        date = safe_date(year, month, day or calendar.monthrange(year, month)[1])
+        if (date is not None and explicit_year is None and previous is not None and date < previous[0]
+                and DATE_RANGE_CONNECTOR_PATTERN.fullmatch(clause[previous[1]:start])):
+            year += 1
+            date = safe_date(year, month, day or calendar.monthrange(year, month)[1])
+        if date is not None:
+            dates.append(date)
+            previous = (date, end)
+    return dates, year
+
+def extract_deadline_locally(text, today=None):
+    """按提示词中的规则在本地解析最晚截止日期，返回 (YYYY-MM-DD 或 None, 置信度)
+
+    规则：识别与截止相关分句中的日期；日期范围取结束日期；只有月份时取该月最后一天；
+    未写年份时沿用文中出现的年份，否则取当年；“本月底”取文中最早日期所在月份的最后一天；
+    多个截止日期取最晚的一个。含相对日期（包括文中没有其他日期可参照的“本月底”）、
+    截止关键词但无法解析日期，或截止分句之外还有其他日期时降低置信度。
+    """
+    today = today or datetime.date.today()
+    # 未写年份的日期沿用文中最近出现的年份，全文都没有年份时取当年
+    explicit_year = EXPLICIT_YEAR_PATTERN.search(text)
+    year = int(explicit_year.group(1)) if explicit_year else today.year
+    deadline_dates = []
+    other_dates = []
+    # 含“本月底”的分句是否为截止分句；通知发布的月份未知，解析完其他日期后再确定
+    end_of_month_clauses = []
+    has_keyword_without_date = False
+    for clause in CLAUSE_SPLIT_PATTERN.split(text):
+        if not clause.strip():
+            continue
+        dates, year = find_dates_in_clause(clause, year)
+        is_deadline_clause = DEADLINE_KEYWORD_PATTERN.search(clause) is not None
+        end_of_month = DATE_END_OF_THIS_MONTH_PATTERN.search(clause) is not None
+        if end_of_month:
+            end_of_month_clauses.append(is_deadline_clause)
+        if is_deadline_clause:
+            if dates:
+                deadline_dates.extend(dates)
+            elif DEADLINE_STRONG_KEYWORD_PATTERN.search(clause) and not end_of_month:
+                has_keyword_without_date = True
+        else:
+            other_dates.extend(dates)
+    has_relative = RELATIVE_DATE_PATTERN.search(text) is not None
+    if end_of_month_clauses:
+        anchor = min(deadline_dates + other_dates, default=None)
+        if anchor is None:
+            has_relative = True
+        else:
+            month_end = safe_date(anchor.year, anchor.month, calendar.monthrange(anchor.year, anchor.month)[1])
+            for is_deadline_clause in end_of_month_clauses:
+                (deadline_dates if is_deadline_clause else other_dates).append(month_end)
+    if deadline_dates:
+        confidence = 0.9
+        if other_dates:
+            confidence -= 0.15
+        if has_relative:
+            confidence -= 0.3
+        return max(deadline_dates).isoformat(), round(confidence, 2)
+    if has_keyword_without_date or has_relative:
+        return None, 0.3
+    if other_dates:
+        # 有日期但看不出是否为截止日期
+        return None, 0.5
+    return None, 0.9
+
+def extract_title_locally(text):
+    """在本地推断通知标题，返回 (标题, 置信度)"""
+    first_line = next((line.strip() for line in text.split("\n") if line.strip()), "")
+    line = TITLE_PREFIX_PATTERN.sub("", first_line)
+    had_notice_prefix = TITLE_NOTICE_PREFIX_PATTERN.match(line) is not None
+    line = TITLE_NOTICE_PREFIX_PATTERN.sub("", line)
+    # 去掉【教务】【转发】等分类标签
+    while TITLE_TAG_PATTERN.match(line) and not TITLE_BRACKET_PATTERN.fullmatch(line):
+        line = TITLE_TAG_PATTERN.sub("", line, count=1).strip()
+    bracket = TITLE_BRACKET_PATTERN.match(line)
+    if bracket and bracket.group(1).strip():
+        return bracket.group(1).strip(), 0.9
+    if TITLE_ABOUT_PATTERN.match(line):
+        return line, 0.85
+    if had_notice_prefix and line:
+        return TITLE_CLAUSE_SPLIT_PATTERN.split(line)[0][:60].strip(), 0.5
+    return line.split("。")[0][:60].strip(), 0.3
+
+def extract_info_locally(text, today=None):
+    """本地规则提取标题和截止日期，返回 {"title", "deadline", "confidence"}"""
+    title, title_confidence = extract_title_locally(text)
+    deadline, deadline_confidence = extract_deadline_locally(text, today)
+    return {"title": title, "deadline": deadline, "confidence": min(title_confidence, deadline_confidence)}
+
+def summarize_with_doubao_api(text, title):
+    """只请求豆包生成摘要（标题和截止日期已在本地提取），失败时返回 None"""
+    VOLC_API_KEY = config.get("VOLC_API_KEY")
+    VOLC_ENDPOINT_ID = config.get("VOLC_ENDPOINT_ID")
+    if not VOLC_API_KEY or not VOLC_ENDPOINT_ID:
+        return None
+    cache = get_extraction_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = ExtractionCache.make_key(text, VOLC_ENDPOINT_ID, task="summary")
+        cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result.get("summary")
+
+    user_content = f"通知标题：{title}\n通知文本如下：\n---开始---\n{prepare_notice_for_prompt(text)}\n---结束---"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {VOLC_API_KEY}"
+    }
+    payload = {
+        "model": VOLC_ENDPOINT_ID,
+        "messages": build_chat_messages(SUMMARY_SYSTEM_PROMPT, user_content),
+        "stream": False,
+        "temperature": 0.3
+    }
+    try:
+        response = get_http_client().post(VOLC_API_BASE_URL, endpoint="volc", headers=headers, json=payload, timeout=45)
+        response.raise_for_status()
+        response_data = response.json()
+        record_token_usage(response_data)
+        message_content = response_data["choices"][0]["message"]["content"]
+        summary = json.loads(strip_code_fence(message_content)).get("summary")
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        print(f"错误：调用豆包API生成摘要失败: {e}")
+        return None
+    if summary and cache is not None:
+        cache.put(cache_key, {"summary": summary})
+    return summary
+
+def extract_info_with_fast_path(text):
+    """本地规则置信度足够高时跳过豆包或只请求摘要，返回提取结果，不适用时返回 None
+
+    LOCAL_FASTPATH_MODE：off 不启用；summary 本地提取标题和截止日期，只请求摘要；
+    skip 完全不调用API，摘要使用原文。置信度阈值为 LOCAL_FASTPATH_THRESHOLD。
+    """
+    mode = config.get("LOCAL_FASTPATH_MODE", "off")
+    if mode not in ("summary", "skip"):
+        return None
+    local_info = extract_info_locally(text)
+    if local_info["confidence"] < float(config.get("LOCAL_FASTPATH_THRESHOLD", 0.85)):
+        return None
+    summary = text
+    if mode == "summary":
+        summary = summarize_with_doubao_api(text, local_info["title"])
+        if summary is None:
+            return None
+    return {"title": local_info["title"], "summary": summary, "deadline": local_info["deadline"]}
+
+def parse_single_notification(notification_text, on_field=None):
+    """解析单条通知，流式模式下 on_field(键, 值) 在每个字段提取完成时回调"""
+    ai_extracted_info = extract_info_with_fast_path(notification_text)
+    if ai_extracted_info is None:
+        ai_extracted_info = extract_info_with_doubao_api(notification_text, on_field=on_field)
+    return build_parsed_record(notification_text, ai_extracted_info)
+
+def parse_notifications_batch(notification_texts):
+    """一次请求解析多条通知（批量提取模式）"""
+    infos = [extract_info_with_fast_path(text) for text in notification_texts]
+    pending = [i for i, info in enumerate(infos) if info is None]
+    for i, info in zip(pending, extract_info_batch_with_doubao_api([notification_texts[i] for i in pending])):
+        infos[i] = info
+    return [build_parsed_record(text, info) for text, info in zip(notification_texts, infos)]
+
+def build_parsed_record(notification_text, ai_extracted_info):
+    """由提取结果生成写入飞书的记录，标题缺失时从原文中推断"""
+    title = ai_extracted_info.get("title")
+    if not title:
+        lines = notification_text.strip().split("\n")
+        if lines:
+            first_line_cleaned = lines[0].strip()
+            match_bracket_title = TITLE_LEADING_BRACKET_PATTERN.match(first_line_cleaned)
+            if match_bracket_title:
+                title = match_bracket_title.group(1).strip()
+            else:
+                title = first_line_cleaned.split("。")[0].split("\n")[0][:60].strip()
+        if not title:
+            title = "教学通知"
+        title = title.replace("通知：", "").replace("通知:", "").strip()
+    
+    summary = ai_extracted_info.get("summary", notification_text)
+    deadline_str = ai_extracted_info.get("deadline")
+
+    return {
+        "院校通知": title,
+        "院校通知详情 AI": summary,
+        "创建时间": get_current_date_iso(),
+        "截止日期": deadline_str
+    }
+
+def request_tenant_access_token(app_id, app_secret, client=None):
+    """向飞书请求新的 tenant_access_token，返回 (token, 有效秒数, 错误信息)"""
+    headers = {"Content-Type": "application/json"}
+    payload = {"app_id": app_id, "app_secret": app_secret}
+    try:
+        response = (client or get_http_client()).post(FEISHU_TOKEN_URL, endpoint="feishu_auth", headers=headers, data=json.dumps(payload), timeout=10)
+        response.raise_for_status()
+        token_data = response.json()
+        if "tenant_access_token" in token_data:
+            return token_data["tenant_access_token"], token_data.get("expire", 7200), None
+        else:
+            return None, 0, token_data.get("msg", "获取token失败，未找到tenant_access_token")
+    except requests.exceptions.RequestException as e:
+        return None, 0, f"获取token时发生网络错误: {e}"
+    except json.JSONDecodeError:
+        return None, 0, "获取token时解析响应失败，非JSON格式"
+
+# 多个应用的 token 管理器共用同一个缓存文件，读-改-写整个文件时需持有该锁
+token_cache_file_lock = threading.Lock()
+
+class TenantTokenManager:
+    """飞书 tenant_access_token 缓存（线程安全，过期前自动刷新）"""
+    def __init__(self, app_id, app_secret, cache_file=None, refresh_ahead=TOKEN_REFRESH_AHEAD_SECONDS, client=None):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.cache_file = cache_file
+        self.client = client
+        self.refresh_ahead = refresh_ahead
+        self._token = None
+        self._expire_at = 0.0
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    def _valid_token(self):
+        """返回未进入提前刷新窗口的 token，否则返回 None"""
+        if self._token and time.time() < self._expire_at - self.refresh_ahead:
+            return self._token
+        return None
+
+    def get_token(self):
+        """获取可用的 token，返回 (token, 错误信息)"""
+        token = self._valid_token()
+        if token:
+            return token, None
+        # 同一时间只允许一个线程刷新，其余线程等待后直接复用结果
+        with self._lock:
+            token = self._valid_token()
+            if token:
+                return token, None
+            token, expire, error_msg = request_tenant_access_token(self.app_id, self.app_secret, self.client)
+            if error_msg:
+                return None, error_msg
+            if not token:
+                return None, "获取飞书访问凭证失败，未收到Token但没有明确错误信息。"
+            self._token = token
+            self._expire_at = time.time() + int(expire)
+            self._save_cache()
+            return token, None
+
+    def invalidate(self, token):
+        """标记 token 失效（仅当它仍是当前缓存的 token 时）"""
+        with self._lock:
+            if self._token == token:
+                self._token = None
+                self._expire_at = 0.0
+                self._save_cache()
+
+    def _load_cache(self):
+        """从磁盘恢复未过期的 token"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with token_cache_file_lock, open(self.cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f).get(self.app_id) or {}
+            self._token = entry.get("tenant_access_token")
+            self._expire_at = float(entry.get("expire_at", 0))
+        except Exception as e:
+            print(f"警告：读取token缓存文件失败，将重新获取token: {e}")
+            self._token = None
+            self._expire_at = 0.0
+
+    def _save_cache(self):
+        """将 token 写入磁盘（调用方需持有锁）
+
+        其他应用的条目保持不变：整个读-改-写过程持有 token_cache_file_lock，
+        并先写入唯一的临时文件再替换，避免同时刷新的应用互相覆盖。
+        """
+        if not self.cache_file:
+            return
+        with token_cache_file_lock:
+            tmp_file = None
+            try:
+                cache = {}
+                if os.path.exists(self.cache_file):
+                    with open(self.cache_file, 'r', encoding='utf-8') as f:
+                        cache = json.load(f)
+                if self._token:
+                    cache[self.app_id] = {"tenant_access_token": self._token, "expire_at": self._expire_at}
+                else:
+                    cache.pop(self.app_id, None)
+                directory, name = os.path.split(os.path.abspath(self.cache_file))
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=name + ".",
+                                                 suffix=".tmp", delete=False) as f:
+                    tmp_file = f.name
+                    json.dump(cache, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.cache_file)
+                tmp_file = None
+            except Exception as e:
+                print(f"警告：保存token缓存文件失败: {e}")
+            finally:
+                if tmp_file is not None and os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+
+token_managers = {}
+token_managers_lock = threading.Lock()
+
+def get_token_manager(app_id, app_secret, client=None):
+    """获取（或创建）token 管理器，client 为获取 token 使用的 HTTP 客户端
+
+    按 (app_id, app_secret, client) 区分：使用同一应用的多个写入目标各自通过自己的客户端和限流器获取 token，
+    修改 app_secret 后改用新的管理器。
+    """
+    key = (app_id, app_secret, client)
+    with token_managers_lock:
+        manager = token_managers.get(key)
+        if manager is None:
+            cache_file = TOKEN_CACHE_FILE if config.get("FEISHU_TOKEN_CACHE_PERSIST", True) else None
+            manager = TenantTokenManager(app_id, app_secret, cache_file=cache_file, client=client)
+            token_managers[key] = manager
+        return manager
+
+def get_tenant_access_token(app_id, app_secret):
+    """获取飞书 tenant_access_token（优先使用缓存）"""
+    return get_token_manager(app_id, app_secret).get_token()
+
+NO_VALID_FIELDS_MESSAGE = "没有可写入的有效字段数据（可能是所有日期字段都无法转换或为空，或者所有字段都被忽略）。"
+
+def build_bitable_fields(record_data):
+    """按 FIELD_MAPPING 将解析结果转换为飞书多维表格的 fields"""
+    fields_payload = {}
+    for key, value in record_data.items():
+        if key in FIELD_MAPPING:
+            if (key == "截止日期" or key == "创建时间") and value and value != "未提取到截止日期" and value is not None:
+                try:
+                    dt_obj = datetime.datetime.strptime(value, "%Y-%m-%d")
+                    fields_payload[FIELD_MAPPING[key]] = int(dt_obj.timestamp() * 1000)
+                except ValueError:
+                    print(f"警告：日期字段 \'{key}\' 的值 \'{value}\' 无法转换为时间戳，将跳过此字段。")
+                    continue 
+            else:
+                if key == "截止日期" and (value == "未提取到截止日期" or value is None):
+                    print(f"提示：字段 \'{key}\' 的值为 \'{value}\'，将不发送此字段给飞书。")
+                    continue
+                fields_payload[FIELD_MAPPING[key]] = value
+        else:
+            print(f"警告：数据中的键 \'{key}\' 在FIELD_MAPPING中未定义，将忽略此字段。")
+    return fields_payload
+
+def feishu_http_error(action, response):
+    """解析飞书接口的 HTTP 错误响应，返回 (错误信息, 飞书错误码)，响应体不是 JSON 时错误码为 None"""
+    try:
+        error_content = response.json()
+    except ValueError:
+        return f"{action}时发生HTTP错误: {response.status_code} - {response.text}", None
+    code = error_content.get("code") if isinstance(error_content, dict) else None
+    return f"{action}时发生HTTP错误: {response.status_code} - {error_content}", code
+
+def add_record_to_bitable(token, bitable_app_token, table_id, record_data, client_token=None, client=None):
+    """向飞书多维表格添加记录，返回 (是否成功, 信息, record_id, 飞书错误码)
+
+    失败时 record_id 为 None；未收到飞书响应（网络错误等）时错误码为 None。
+    """
+    url = f"{FEISHU_BITABLE_BASE_URL}/{bitable_app_token}/tables/{table_id}/records"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    
+    fields_payload = build_bitable_fields(record_data)
+    if not fields_payload:
+        return False, NO_VALID_FIELDS_MESSAGE, None, None
+
+    payload = {"fields": fields_payload}
+    # client_token 保证重试时飞书不会重复创建记录
+    params = {"client_token": client_token or str(uuid.uuid4())}
+    
+    try:
+        response = (client or get_http_client()).post(url, endpoint="feishu_bitable", headers=headers, params=params,
+                                                      data=json.dumps(payload), timeout=10)
+        response.raise_for_status()
+        response_data = response.json()
+        if response_data.get("code") == 0:
+            record_id = response_data.get("data", {}).get("record", {}).get("record_id")
+            return True, response_data.get("msg", "记录添加成功"), record_id, 0
+        else:
+            error_detail = response_data.get("msg", "未知错误")
+            if "data" in response_data and "record" in response_data["data"] and "id" in response_data["data"]["record"]:
+                 error_detail += f" (记录ID: {response_data['data']['record']['id']})"
+            elif "error" in response_data and "details" in response_data["error"]:
+                error_detail += f" 详细: {response_data['error']['details']}"
+            if response_data.get("code") == 1254064: 
+                error_detail += " 这通常意味着发送的日期/时间格式不被飞书表格的日期列接受。脚本已尝试转换为毫秒级时间戳，请确保飞书表格中的日期列类型配置正确。"
+            return False, f"添加记录失败 (code: {response_data.get('code')}): {error_detail}", None, response_data.get("code")
+
+    except requests.exceptions.HTTPError as e:
+        error_msg, code = feishu_http_error("添加记录", e.response)
+        return False, error_msg, None, code
+    except requests.exceptions.RequestException as e:
+        return False, f"添加记录时发生网络错误: {e}", None, None
+    except json.JSONDecodeError:
+        return False, "添加记录时解析响应失败，非JSON格式", None, None
+
+def update_record_in_bitable(token, bitable_app_token, table_id, record_id, fields_payload, client=None):
+    """更新飞书多维表格中的已有记录，返回 (是否成功, 信息, 飞书错误码)"""
+    url = f"{FEISHU_BITABLE_BASE_URL}/{bitable_app_token}/tables/{table_id}/records/{record_id}"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    try:
+        response = (client or get_http_client()).put(url, endpoint="feishu_bitable", headers=headers,
+                                                     data=json.dumps({"fields": fields_payload}), timeout=10)
+        response.raise_for_status()
+        response_data = response.json()
+        if response_data.get("code") == 0:
+            return True, response_data.get("msg", "记录更新成功"), 0
+        return (False, f"更新记录失败 (code: {response_data.get('code')}): {response_data.get('msg', '未知错误')}",
+                response_data.get("code"))
+    except requests.exceptions.HTTPError as e:
+        error_msg, code = feishu_http_error("更新记录", e.response)
+        return False, error_msg, code
+    except requests.exceptions.RequestException as e:
+        return False, f"更新记录时发生网络错误: {e}", None
+    except json.JSONDecodeError:
+        return False, "更新记录时解析响应失败，非JSON格式", None
+
+def batch_add_records_to_bitable(token, bitable_app_token, table_id, fields_list, client_token=None, client=None):
+    """通过 batch_create 批量添加记录，返回 (是否成功, 信息, record_id列表, 飞书错误码)"""
+    url = f"{FEISHU_BITABLE_BASE_URL}/{bitable_app_token}/tables/{table_id}/records/batch_create"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    payload = {"records": [{"fields": fields} for fields in fields_list]}
+    params = {"client_token": client_token or str(uuid.uuid4())}
+
+    try:
+        response = (client or get_http_client()).post(url, endpoint="feishu_bitable", headers=headers, params=params,
+                                                      data=json.dumps(payload), timeout=30)
+        response.raise_for_status()
+        response_data = response.json()
+        if response_data.get("code") == 0:
+            records = response_data.get("data", {}).get("records", [])
+            record_ids = [record.get("record_id") for record in records]
+            return True, response_data.get("msg", "批量添加记录成功"), record_ids, 0
+        error_detail = response_data.get("msg", "未知错误")
+        if "error" in response_data and "details" in response_data["error"]:
+            error_detail += f" 详细: {response_data['error']['details']}"
+        return False, f"批量添加记录失败 (code: {response_data.get('code')}): {error_detail}", [], response_data.get("code")
+
+    except requests.exceptions.HTTPError as e:
+        error_msg, code = feishu_http_error("批量添加记录", e.response)
+        return False, error_msg, [], code
+    except requests.exceptions.RequestException as e:
+        return False, f"批量添加记录时发生网络错误: {e}", [], None
+    except json.JSONDecodeError:
+        return False, "批量添加记录时解析响应失败，非JSON格式", [], None
+
+def batch_update_records_in_bitable(token, bitable_app_token, table_id, updates, client=None):
+    """通过 batch_update 批量更新已有记录，updates 为 (record_id, fields) 列表，返回 (是否成功, 信息, record_id列表, 飞书错误码)"""
+    url = f"{FEISHU_BITABLE_BASE_URL}/{bitable_app_token}/tables/{table_id}/records/batch_update"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    payload = {"records": [{"record_id": record_id, "fields": fields} for record_id, fields in updates]}
+
+    try:
+        response = (client or get_http_client()).post(url, endpoint="feishu_bitable", headers=headers,
+                                                      data=json.dumps(payload), timeout=30)
+        response.raise_for_status()
+        response_data = response.json()
+        if response_data.get("code") == 0:
+            records = response_data.get("data", {}).get("records", [])
+            return True, response_data.get("msg", "批量更新记录成功"), [record.get("record_id") for record in records], 0
+        return (False, f"批量更新记录失败 (code: {response_data.get('code')}): {response_data.get('msg', '未知错误')}", [],
+                response_data.get("code"))
+    except requests.exceptions.HTTPError as e:
+        error_msg, code = feishu_http_error("批量更新记录", e.response)
+        return False, error_msg, [], code
+    except requests.exceptions.RequestException as e:
+        return False, f"批量更新记录时发生网络错误: {e}", [], None
+    except json.JSONDecodeError:
+        return False, "批量更新记录时解析响应失败，非JSON格式", [], None
+
+def search_bitable_records(token, bitable_app_token, table_id, page_token=None, modified_after=None, page_size=500, client=None):
+    """分页查询多维表格记录，返回 (是否成功, 信息, 记录列表, 下一页 page_token, 飞书错误码)
+
+    配置了 FEISHU_MODIFIED_TIME_FIELD（表格中的“修改时间”字段名）且给出 modified_after（毫秒）时，
+    只返回此后修改过的记录；记录中的 last_modified_time 由 automatic_fields 返回。
+    """
+    url = f"{FEISHU_BITABLE_BASE_URL}/{bitable_app_token}/tables/{table_id}/records/search"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    params = {"page_size": page_size}
+    if page_token:
+        params["page_token"] = page_token
+    payload = {"automatic_fields": True}
+    modified_field = config.get("FEISHU_MODIFIED_TIME_FIELD")
+    if modified_field and modified_after:
+        payload["filter"] = {"conjunction": "and", "conditions": [
+            {"field_name": modified_field, "operator": "isGreater", "value": ["ExactDate", str(int(modified_after))]}]}
+        payload["sort"] = [{"field_name": modified_field, "desc": False}]
+
+    try:
+        response = (client or get_http_client()).post(url, endpoint="feishu_bitable", headers=headers, params=params,
+                                                      data=json.dumps(payload), timeout=30)
+        response.raise_for_status()
+        response_data = response.json()
+        if response_data.get("code") != 0:
+            return (False, f"查询记录失败 (code: {response_data.get('code')}): {response_data.get('msg', '未知错误')}", [],
+                    None, response_data.get("code"))
+        data = response_data.get("data") or {}
+        next_page_token = data.get("page_token") if data.get("has_more") else None
+        return True, "查询记录成功", data.get("items") or [], next_page_token, 0
+    except requests.exceptions.HTTPError as e:
+        error_msg, code = feishu_http_error("查询记录", e.response)
+        return False, error_msg, [], None, code
+    except requests.exceptions.RequestException as e:
+        return False, f"查询记录时发生网络错误: {e}", [], None, None
+    except json.JSONDecodeError:
+        return False, "查询记录时解析响应失败，非JSON格式", [], None, None
+
+# 顶层配置（FEISHU_APP_ID 等）对应的默认写入目标名称
+DEFAULT_TENANT_NAME = "default"
+FEISHU_TARGET_KEYS = ("FEISHU_APP_ID", "FEISHU_APP_SECRET", "FEISHU_BITABLE_APP_TOKEN", "FEISHU_TABLE_ID")
+
+class FeishuTenant:
+    """一个飞书写入目标（应用 + 多维表格）及其路由规则
+
+    FEISHU_TENANTS 中的每个目标使用独立的 HTTP 会话（连接池）、限流器、token 管理器和写入线程池，
+    一个目标被限流时不会拖慢其他目标的写入；默认目标沿用共享的 HTTP 客户端。
+    """
+    def __init__(self, name, settings, shared_client=False):
+        self.name = name
+        self.app_id, self.app_secret, self.bitable_app_token, self.table_id = (
+            settings.get(key) for key in FEISHU_TARGET_KEYS)
+        self.title_prefixes = [prefix for prefix in settings.get("title_prefixes") or [] if prefix]
+        self.keywords = [keyword for keyword in settings.get("keywords") or [] if keyword]
+        self.rate_limit = float(settings.get("FEISHU_RATE_LIMIT", config.get("FEISHU_RATE_LIMIT", 10)))
+        self.max_workers = int(settings.get("FEISHU_MAX_WORKERS", config.get("FEISHU_MAX_WORKERS", 2)))
+        self.shared_client = shared_client
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def error(self):
+        """配置不完整时返回错误信息，否则返回 None"""
+        if all([self.app_id, self.app_secret, self.bitable_app_token, self.table_id]):
+            return None
+        message = "飞书配置信息不完整 (App ID, App Secret, Bitable App Token, or Table ID missing)."
+        return message if self.name == DEFAULT_TENANT_NAME else f"飞书目标 {self.name}：{message}"
+
+    @property
+    def client(self):
+        """该目标使用的 HTTP 客户端"""
+        if self.shared_client:
+            return get_http_client()
+        with self._lock:
+            if self._client is None:
+                self._client = HttpClient(
+                    rate_limits={"feishu_auth": self.rate_limit, "feishu_bitable": self.rate_limit},
+                    max_retries=int(config.get("HTTP_MAX_RETRIES", 3)),
+                    backoff_base=float(config.get("HTTP_BACKOFF_BASE", 0.5)))
+            return self._client
+
+    @property
+    def token_manager(self):
+        return get_token_manager(self.app_id, self.app_secret, self.client)
+
+    @property
+    def table_key(self):
+        return bitable_table_key(self.bitable_app_token, self.table_id)
+
+feishu_tenants = None
+feishu_tenants_lock = threading.Lock()
+
+def get_feishu_tenants():
+    """按配置顺序返回所有飞书写入目标：FEISHU_TENANTS 中的目标在前，顶层配置的默认目标在后"""
+    global feishu_tenants
+    with feishu_tenants_lock:
+        if feishu_tenants is None:
+            tenants = []
+            for i, settings in enumerate(config.get("FEISHU_TENANTS") or []):
+                name = str(settings.get("name") or f"tenant{i + 1}")
+                if name == DEFAULT_TENANT_NAME or any(tenant.name == name for tenant in tenants):
+                    print(f"警告：飞书目标名称 {name} 重复，已忽略该目标")
+                    continue
+                tenants.append(FeishuTenant(name, settings))
+            # 没有配置 FEISHU_TENANTS 时顶层配置即唯一目标（即使不完整，也由它给出错误信息）
+            if not tenants or any(config.get(key) for key in FEISHU_TARGET_KEYS):
+                tenants.append(FeishuTenant(DEFAULT_TENANT_NAME, config, shared_client=True))
+            feishu_tenants = tenants
+        return feishu_tenants
+
+def get_feishu_tenant(name=None):
+    """按名称获取写入目标；name 为空或找不到时返回默认目标（未配置顶层目标时为第一个目标）"""
+    tenants = get_feishu_tenants()
+    for tenant in tenants:
+        if tenant.name == (name or DEFAULT_TENANT_NAME):
+            return tenant
+    if name and name != DEFAULT_TENANT_NAME:
+        print(f"警告：找不到飞书目标 {name}，改为写入默认目标")
+    return next((tenant for tenant in tenants if tenant.name == DEFAULT_TENANT_NAME), tenants[0])
+
+def notice_title_heads(text):
+    """通知首行去掉序号后的文本，以及依次去掉开头每个【】标签后的文本（用于匹配标题前缀）"""
+    first_line = next((line.strip() for line in text.split("\n") if line.strip()), "")
+    head = TITLE_PREFIX_PATTERN.sub("", first_line, count=1)
+    heads = [head]
+    while True:
+        match = TITLE_BRACKET_PATTERN.match(head)
+        if not match or match.end() >= len(head):
+            return heads
+        head = head[match.end():].lstrip()
+        heads.append(head)
+
+def route_notice(text):
+    """为通知选择写入目标：先按标题前缀（如“【教务】”，允许前面有“【转发】”等标签），
+    再按关键词，按配置顺序取第一个匹配的目标，都不匹配时写入默认目标"""
+    tenants = get_feishu_tenants()
+    if len(tenants) == 1:
+        return tenants[0]
+    heads = notice_title_heads(text)
+    for tenant in tenants:
+        if any(head.startswith(prefix) for head in heads for prefix in tenant.title_prefixes):
+            return tenant
+    for tenant in tenants:
+        if any(keyword in text for keyword in tenant.keywords):
+            return tenant
+    return get_feishu_tenant()
+
+def get_feishu_target(name=None):
+    """读取飞书写入目标，返回 (写入目标, 错误信息)"""
+    tenant = get_feishu_tenant(name)
+    error_msg = tenant.error
+    return (None, error_msg) if error_msg else (tenant, None)
+
+def call_with_feishu_token(token_manager, request_func):
+    """携带 token 调用飞书接口，token 失效时刷新后重试一次
+
+    request_func 接收 token，返回以 (是否成功, 信息) 开头、以飞书错误码结尾的元组（HTTP 错误时错误码取自
+    响应体）；获取 token 失败时返回 (False, 信息, None, None)。
+    """
+    token, error_msg = token_manager.get_token()
+    if error_msg:
+        return (False, f"获取飞书访问凭证失败: {error_msg}", None, None)
+    result = request_func(token)
+    if not result[0] and result[-1] in FEISHU_TOKEN_INVALID_CODES:
+        # 缓存的 token 已被服务端判定失效，刷新后重试一次
+        token_manager.invalidate(token)
+        token, error_msg = token_manager.get_token()
+        if error_msg:
+            return (False, f"获取飞书访问凭证失败: {error_msg}", None, None)
+        result = request_func(token)
+    return result
+
+def write_to_feishu(record_data, tenant_name=None):
+    """写入记录到飞书（tenant_name 为空时写入默认目标）"""
+    tenant, error_msg = get_feishu_target(tenant_name)
+    if error_msg:
+        return False, error_msg
+
+    result = call_with_feishu_token(
+        tenant.token_manager,
+        lambda token: add_record_to_bitable(token, tenant.bitable_app_token, tenant.table_id, record_data,
+                                            client=tenant.client))
+    return result[0], result[1]
+
+# 飞书 batch_create 单次最多写入的记录数
+FEISHU_BATCH_CREATE_MAX = 500
+
+def bitable_table_key(bitable_app_token, table_id):
+    """镜像中区分不同表格的键"""
+    return f"{bitable_app_token}/{table_id}"
+
+def sync_bitable_mirror(full=False, tenant_name=None):
+    """把飞书多维表格同步到本地镜像，返回 (是否成功, 信息)
+
+    增量同步从上次同步记录的最大修改时间开始分页查询（回看 1 分钟，重复写入镜像无副作用）；
+    full=True 时查询全表，并删除镜像中表格已不存在的记录。
+    """
+    tenant, error_msg = get_feishu_target(tenant_name)
+    if error_msg:
+        return False, error_msg
+    store = get_history_store()
+    table_key = tenant.table_key
+    watermark_key = f"bitable_sync_watermark:{table_key}"
+    watermark = None if full else int(store.get_meta(watermark_key, 0) or 0)
+    modified_after = watermark - 60000 if watermark else None
+    newest = watermark or 0
+    seen = []
+    fetched = 0
+    page_token = None
+    while True:
+        result = call_with_feishu_token(
+            tenant.token_manager,
+            lambda token: search_bitable_records(token, tenant.bitable_app_token, tenant.table_id, page_token,
+                                                 modified_after, client=tenant.client))
+        if not result[0]:
+            return False, result[1]
+        items, page_token = result[2], result[3]
+        rows = []
+        for item in items:
+            modified_at = int(item.get("last_modified_time") or item.get("created_time") or 0)
+            seen.append(item["record_id"])
+            if modified_after and modified_at and modified_at <= modified_after:
+                # 未配置修改时间字段时服务端无法过滤，未修改的记录不再写入镜像
+                continue
+            newest = max(newest, modified_at)
+            fields = {name: normalize_bitable_value(value) for name, value in (item.get("fields") or {}).items()}
+            rows.append((item["record_id"], fields, modified_at))
+        store.mirror_upsert(table_key, rows)
+        fetched += len(rows)
+        if not page_token:
+            break
+    removed = store.mirror_remove_missing(table_key, seen) if full else 0
+    store.set_meta(watermark_key, str(newest))
+    if full:
+        store.set_meta(f"bitable_full_sync:{table_key}", datetime.datetime.now().isoformat(timespec="seconds"))
+    message = f"同步完成：更新 {fetched} 条镜像记录" + (f"，移除已删除的 {removed} 条" if removed else "")
+    return True, message
+
+def sync_all_bitable_mirrors(full=False):
+    """同步所有写入目标的本地镜像，返回 (是否全部成功, 信息)"""
+    tenants = get_feishu_tenants()
+    succeeded = True
+    messages = []
+    for tenant in tenants:
+        success, message = sync_bitable_mirror(full=full, tenant_name=tenant.name)
+        succeeded = succeeded and success
+        messages.append(f"{tenant.name}：{message}" if len(tenants) > 1 else message)
+    return succeeded, "；".join(messages)
+
+def resolve_upsert_target(record_id, tenant_name=None):
+    """确认要更新的飞书记录仍然存在：镜像做过全量同步且其中已没有该记录时返回 None（改为新增）"""
+    if not record_id or not config.get("BITABLE_MIRROR_ENABLED", True):
+        return record_id
+    tenant, error_msg = get_feishu_target(tenant_name)
+    if error_msg:
+        return record_id
+    store = get_history_store()
+    table_key = tenant.table_key
+    if store.get_meta(f"bitable_full_sync:{table_key}") and store.mirror_get(table_key, record_id) is None:
+        return None
+    return record_id
+
+def make_client_token(keys):
+    """由幂等键生成稳定的 client_token（UUIDv4 格式），相同的键重放时得到相同的 token"""
+    digest = hashlib.sha256("\n".join(keys).encode("utf-8")).digest()
+    return str(uuid.UUID(bytes=digest[:16], version=4))
+
+def batch_create_rejected(message, code):
+    """batch_create 是否被飞书明确拒绝（返回错误码或 4xx，确定没有创建任何记录），可逐条重写定位失败记录
+
+    token 失效或无法获取 token 时逐条重写同样会失败；网络错误、5xx 和无法解析的响应无法确定
+    服务端是否已经创建。这些情况都保留批次，之后用同一个 client_token 重发。
+    """
+    if code in FEISHU_TOKEN_INVALID_CODES or message.startswith("获取飞书访问凭证失败"):
+        return False
+    return message.startswith("批量添加记录失败") or "HTTP错误: 4" in message
+
+class BitableBatchWriter:
+    """批量写入飞书多维表格：攒够一批或到达刷新间隔后通过 batch_create 写入
+
+    tenant_name 指定写入目标（为空时写入默认目标），写入并发数默认取该目标的 FEISHU_MAX_WORKERS。
+    """
+    def __init__(self, batch_size=None, flush_interval=None, max_workers=None, tenant_name=None):
+        self.tenant_name = tenant_name
+        if batch_size is None:
+            batch_size = config.get("FEISHU_BATCH_SIZE", 100)
+        if flush_interval is None:
+            flush_interval = config.get("FEISHU_FLUSH_INTERVAL", 2.0)
+        if max_workers is None:
+            max_workers = get_feishu_tenant(tenant_name).max_workers
+        self.batch_size = max(1, min(int(batch_size), FEISHU_BATCH_CREATE_MAX))
+        self.flush_interval = float(flush_interval)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+        # 飞书写入并发数单独限制，与豆包提取互不影响
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="feishu")
+
+    def add(self, record_data, callback, record_id=None, idempotency_key=None):
+        """加入一条待写入记录，写入完成后调用 callback(是否成功, 信息, record_id)
+
+        指定 record_id 时更新该飞书记录，否则新增记录；idempotency_key 用于生成
+        client_token，重放同一批记录时飞书不会重复创建。
+        """
+        fields = build_bitable_fields(record_data)
+        if not fields:
+            callback(False, NO_VALID_FIELDS_MESSAGE, record_id)
+            return
+        with self._lock:
+            self._pending.append((record_data, fields, callback, record_id, idempotency_key or str(uuid.uuid4())))
+            batch_full = len(self._pending) >= self.batch_size
+            if not batch_full and self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch_full:
+            self.flush()
+
+    def add_group(self, entries, client_token):
+        """按原批次重发一组新增记录：entries 为 [(record_data, callback, 幂等键)]，顺序与 client_token 均保持不变"""
+        chunk = []
+        for record_data, callback, idempotency_key in entries:
+            fields = build_bitable_fields(record_data)
+            if not fields:
+                callback(False, NO_VALID_FIELDS_MESSAGE, None)
+                continue
+            chunk.append((record_data, fields, callback, None, idempotency_key))
+        if chunk:
+            self._submit(chunk, client_token)
+
+    def flush(self):
+        """将所有待写入记录提交给写入线程"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for start in range(0, len(pending), self.batch_size):
+                self._submit(pending[start:start + self.batch_size])
+
+    def close(self):
+        """写入剩余记录并等待所有写入完成"""
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+    def _submit(self, chunk, client_token=None):
+        """把一批记录交给写入线程；写入中途发生异常时，尚未回调的记录按失败回调，不会一直等不到结果"""
+        called = set()
+
+        def once(i, callback):
+            def wrapper(success, message, record_id):
+                called.add(i)
+                callback(success, message, record_id)
+            return wrapper
+
+        guarded = [(record_data, fields, once(i, callback), record_id, key)
+                   for i, (record_data, fields, callback, record_id, key) in enumerate(chunk)]
+
+        def run():
+            try:
+                self._write_chunk(guarded, client_token)
+            except Exception as e:
+                print(f"错误：写入飞书时发生未知错误: {e}")
+                for i, (_, _, callback, record_id, _) in enumerate(chunk):
+                    if i not in called:
+                        callback(False, f"写入飞书时发生未知错误: {e}", record_id)
+
+        self._executor.submit(perf_recorder.profiled, run)
+
+    def _write_chunk(self, chunk, client_token=None):
+        """写入一批记录，并把结果逐条回调给对应的通知
+
+        新增记录发送前把本批的 client_token 和成员顺序记入写入队列，重放时按原批次和原
+        token 重发，即使上次在飞书已创建记录后中断也不会重复创建。
+        """
+        tenant, error_msg = get_feishu_target(self.tenant_name)
+        if error_msg:
+            for _, _, callback, record_id, _ in chunk:
+                callback(False, error_msg, record_id)
+            return
+
+        store = get_history_store() if config.get("BITABLE_MIRROR_ENABLED", True) else None
+        table_key = tenant.table_key
+        # 更新已有记录：内容与镜像一致时不调用接口，其余通过 batch_update 一次更新
+        creates = []
+        updates = []
+        for item in chunk:
+            _, fields, callback, record_id, _ = item
+            if record_id is None:
+                creates.append(item)
+                continue
+            mirrored = store.mirror_get(table_key, record_id) if store is not None else None
+            if mirrored is not None and mirrored["fingerprint"] == bitable_fields_fingerprint(fields):
+                callback(True, "飞书记录内容未变化，跳过写入", record_id)
+                continue
+            updates.append(item)
+        if updates:
+            self._write_updates(tenant, updates, store, table_key)
+        if not creates:
+            return
+
+        keys = [key for _, _, _, _, key in creates]
+        outbox_store = get_outbox()
+        if client_token is None:
+            client_token = make_client_token(keys)
+            if outbox_store is not None:
+                outbox_store.assign_batch(client_token, keys)
+        result = call_with_feishu_token(
+            tenant.token_manager,
+            lambda token: batch_add_records_to_bitable(
+                token, tenant.bitable_app_token, tenant.table_id, [fields for _, fields, _, _, _ in creates],
+                client_token, client=tenant.client))
+        if result[0]:
+            record_ids = result[2]
+            if outbox_store is not None:
+                outbox_store.mark_written_keys(
+                    {key: record_ids[i] if i < len(record_ids) else None for i, key in enumerate(keys)})
+            for i, (_, _, callback, _, _) in enumerate(creates):
+                callback(True, "记录添加成功", record_ids[i] if i < len(record_ids) else None)
+            if store is not None:
+                now_ms = int(time.time() * 1000)
+                store.mirror_upsert(table_key, [(record_id, fields, now_ms)
+                                                for record_id, (_, fields, _, _, _) in zip(record_ids, creates)
+                                                if record_id])
+            return
+
+        if len(creates) == 1 or not batch_create_rejected(result[1], result[-1]):
+            # 无法确定是否已创建时保留批次信息，重放时用同一个 client_token 重发整批
+            for _, _, callback, _, _ in creates:
+                callback(False, result[1], None)
+            return
+        # batch_create 被明确拒绝（整批原子失败），逐条重写以确定具体是哪条记录出错
+        print(f"警告：批量写入失败，改为逐条写入以定位失败记录: {result[1]}")
+        for record_data, _, callback, _, key in creates:
+            if outbox_store is not None:
+                outbox_store.assign_batch(make_client_token([key]), [key])
+            success, message, record_id, _ = call_with_feishu_token(
+                tenant.token_manager,
+                lambda token: add_record_to_bitable(token, tenant.bitable_app_token, tenant.table_id, record_data,
+                                                    make_client_token([key]), client=tenant.client))
+            callback(success, message, record_id)
+
+    def _write_updates(self, tenant, updates, store, table_key):
+        """通过 batch_update 更新一批已有记录，整批失败时逐条更新以定位失败记录"""
+        result = call_with_feishu_token(
+            tenant.token_manager,
+            lambda token: batch_update_records_in_bitable(
+                token, tenant.bitable_app_token, tenant.table_id,
+                [(record_id, fields) for _, fields, _, record_id, _ in updates], client=tenant.client))
+        succeeded = []
+        if result[0]:
+            for _, fields, callback, record_id, _ in updates:
+                callback(True, "记录更新成功", record_id)
+                succeeded.append((record_id, fields))
+        elif len(updates) == 1:
+            updates[0][2](False, result[1], updates[0][3])
+        else:
+            print(f"警告：批量更新失败，改为逐条更新以定位失败记录: {result[1]}")
+            for _, fields, callback, record_id, _ in updates:
+                single = call_with_feishu_token(
+                    tenant.token_manager,
+                    lambda token: update_record_in_bitable(token, tenant.bitable_app_token, tenant.table_id,
+                                                           record_id, fields, client=tenant.client))
+                callback(single[0], "记录更新成功" if single[0] else single[1], record_id)
+                if single[0]:
+                    succeeded.append((record_id, fields))
+        if store is not None and succeeded:
+            now_ms = int(time.time() * 1000)
+            store.mirror_upsert(table_key, [(record_id, fields, now_ms) for record_id, fields in succeeded])
+
+class TenantWriterGroup:
+    """按写入目标分别持有 BitableBatchWriter，各目标的写入线程池互不影响"""
+    def __init__(self):
+        self._writers = {}
+        self._lock = threading.Lock()
+
+    def _writer(self, tenant_name):
+        with self._lock:
+            writer = self._writers.get(tenant_name)
+            if writer is None:
+                writer = self._writers[tenant_name] = BitableBatchWriter(tenant_name=tenant_name)
+            return writer
+
+    def add(self, tenant_name, record_data, callback, record_id=None, idempotency_key=None):
+        self._writer(tenant_name).add(record_data, callback, record_id=record_id, idempotency_key=idempotency_key)
+
+    def add_group(self, tenant_name, entries, client_token):
+        self._writer(tenant_name).add_group(entries, client_token)
+
+    def close(self):
+        """写入所有目标的剩余记录并等待完成"""
+        with self._lock:
+            writers = list(self._writers.values())
+        for writer in writers:
+            writer.flush()
+        for writer in writers:
+            writer.close()
+
+class FeishuOutbox:
+    """待写入飞书记录的持久化队列（SQLite）
+
+    解析结果先写入队列再发送；写入成功后标记为 written 并记下 record_id，保存历史记录后才删除，
+    异常退出时由 finish_written_outbox 补记历史记录。失败的条目保留，可在不重新调用豆包的情况下
+    重放。程序异常退出时未完成的条目在下次启动时继续写入（至少一次）。
+    """
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, idempotency_key TEXT UNIQUE NOT NULL, "
+            "record TEXT NOT NULL, meta TEXT, target_record_id TEXT, history_id INTEGER, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+        # 最近一次写入尝试所在批次的 client_token 与成员（幂等键列表），重放时按原批次重发
+        existing_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        for column in ("batch_token", "batch_members", "written_record_id"):
+            if column not in existing_columns:
+                self._conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_item(row):
+        return {
+            "id": row["id"],
+            "idempotency_key": row["idempotency_key"],
+            "record": json.loads(row["record"]),
+            "meta": json.loads(row["meta"]) if row["meta"] else {},
+            "target_record_id": row["target_record_id"],
+            "history_id": row["history_id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "last_error": row["last_error"],
+            "batch_token": row["batch_token"],
+            "batch_members": json.loads(row["batch_members"]) if row["batch_members"] else None,
+            "written_record_id": row["written_record_id"]
+        }
+
+    def enqueue(self, record_data, meta=None, target_record_id=None):
+        """加入一条待写入记录，返回 (条目 id, 幂等键)"""
+        key = str(uuid.uuid4())
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (idempotency_key, record, meta, target_record_id, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'sending', ?, ?)",
+                (key, json.dumps(record_data, ensure_ascii=False), json.dumps(meta or {}, ensure_ascii=False),
+                 target_record_id, now, now))
+        return cursor.lastrowid, key
+
+    def claim(self, statuses=("pending",)):
+        """取出指定状态的条目并标记为发送中"""
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT * FROM outbox WHERE status IN ({placeholders}) ORDER BY id", list(statuses)).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(time.time(), row["id"]) for row in rows])
+        return [self._to_item(row) for row in rows]
+
+    def mark_done(self, item_id):
+        """写入成功，删除条目"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (item_id,))
+
+    def assign_batch(self, client_token, keys):
+        """发送前记录一批新增记录的 client_token 与成员顺序（不在队列中的幂等键忽略）"""
+        members = json.dumps(list(keys))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET batch_token = ?, batch_members = ? WHERE idempotency_key = ?",
+                [(client_token, members, key) for key in keys])
+
+    def mark_done_many(self, item_ids):
+        """历史记录保存后在一个事务中删除多个条目"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(item_id,) for item_id in item_ids])
+
+    def mark_written(self, item_id, record_id):
+        """写入飞书成功，记下 record_id，等历史记录保存后再删除"""
+        self._mark_written("id", {item_id: record_id})
+
+    def mark_written_keys(self, record_ids):
+        """整批写入成功后在一个事务中标记所有成员（{幂等键: record_id}），避免中途退出后只剩部分成员"""
+        self._mark_written("idempotency_key", record_ids)
+
+    def _mark_written(self, column, record_ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"UPDATE outbox SET status = 'written', written_record_id = ?, updated_at = ? WHERE {column} = ?",
+                [(record_id, time.time(), key) for key, record_id in record_ids.items()])
+
+    def mark_failed(self, item_id, error, history_id=None):
+        """写入失败，保留条目等待重试"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', last_error = ?, "
+                "history_id = COALESCE(?, history_id), updated_at = ? WHERE id = ?",
+                (error, history_id, time.time(), item_id))
+
+    def link_history(self, item_id, history_id):
+        """记录条目对应的历史记录 id，重放成功后据此更新状态"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE outbox SET history_id = ? WHERE id = ?", (history_id, item_id))
+
+    def written_items(self):
+        """已写入飞书、尚未删除的条目"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM outbox WHERE status = 'written' ORDER BY id").fetchall()
+        return [self._to_item(row) for row in rows]
+
+    def reset_inflight(self):
+        """将上次运行中断时仍在发送的条目恢复为待发送，返回条数"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'sending'").rowcount
+
+    def count(self, status):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (status,)).fetchone()[0]
+
+outbox = None
+outbox_lock = threading.Lock()
+
+def get_outbox():
+    """获取共享的飞书写入队列，打开失败时返回 None"""
+    global outbox
+    with outbox_lock:
+        if outbox is None:
+            try:
+                outbox = FeishuOutbox(OUTBOX_DB_FILE)
+            except sqlite3.Error as e:
+                print(f"警告：打开飞书写入队列失败，失败的记录将无法自动重放: {e}")
+                return None
+        return outbox
+
+class DuplicateChecker:
+    """在调用任何API之前逐条检查重复通知
+
+    本批次内的重复应跳过；与历史记录完全相同的通知按 DEDUP_EXACT_MODE 处理
+    （skip 跳过，update 重新提取后更新原飞书记录），近似重复按 DEDUP_NEAR_MODE
+    处理（默认 off 不检测；flag 照常写入并提示，skip 跳过，update 重新提取后更新原飞书记录）。
+    只改动了截止日期或个别字词的通知通常是另一条通知，因此近似重复需要显式开启。
+    """
+    def __init__(self):
+        self.enabled = config.get("DEDUP_ENABLED", True)
+        near_mode = config.get("DEDUP_NEAR_MODE", "off")
+        self.max_distance = 0 if near_mode == "off" else min(
+            int(config.get("DEDUP_SIMHASH_DISTANCE", DEFAULT_SIMHASH_DISTANCE)), SIMHASH_BANDS - 1)
+        self.store = get_history_store() if self.enabled else None
+        self.seen = {}
+
+    def check(self, i, text, fingerprint=None, simhash=None):
+        """检查第 i 条通知，返回 None（不重复）或
+        {"kind": "batch"/"exact"/"near", "record": 重复的历史记录, "distance": 汉明距离}"""
+        if not self.enabled:
+            return None
+        fingerprint = fingerprint or notice_fingerprint(text)
+        if fingerprint in self.seen:
+            return {"kind": "batch", "record": {"院校通知": f"本批次第 {self.seen[fingerprint] + 1} 条"}, "distance": 0}
+        self.seen[fingerprint] = i
+        if simhash is None:
+            simhash = notice_simhash(text)
+        record, distance = self.store.find_duplicate(fingerprint, simhash, self.max_distance)
+        if record is None:
+            return None
+        return {"kind": "exact" if distance == 0 else "near", "record": record, "distance": distance}
+
+def check_duplicates(notifications):
+    """检查一批通知，返回与 notifications 等长的列表（每项含义见 DuplicateChecker.check）"""
+    checker = DuplicateChecker()
+    return [checker.check(i, text) for i, text in enumerate(notifications)]
+
+def finish_written_outbox():
+    """把上次运行中已写入飞书、但退出前未保存历史记录的队列条目补记到历史记录并移出队列，返回条数
+
+    这些条目不再发送；历史记录中已有同一 record_id 的记录时不重复保存。
+    """
+    store = get_outbox()
+    if store is None:
+        return 0
+    items = store.written_items()
+    if not items:
+        return 0
+    history = get_history_store()
+    records = []
+    for item in items:
+        record_id = item["written_record_id"]
+        if item["history_id"] is not None:
+            history.update_write_result(item["history_id"], "成功", record_id)
+        elif not record_id or not history.has_record_id(record_id):
+            records.append(dict(item["record"], 状态="成功", record_id=record_id, **item["meta"]))
+    if records and not save_many_to_history(records):
+        return 0
+    store.mark_done_many([item["id"] for item in items])
+    print(f"提示：已补记上次运行中已写入飞书的 {len(items)} 条记录")
+    return len(items)
 
-def parse_single_notification(notification_text):
-    """解析单条通知"""
-    ai_extracted_info = extract_info_with_doubao_api(notification_text)
-    
-    title = ai_extracted_info.get("title")
-    if not title:
-        lines = notification_text.strip().split("\n")
-        if lines:
-            first_line_cleaned = lines[0].strip()
-            match_bracket_title = re.match(r"^\s*【([^】]+)】", first_line_cleaned)
-            if match_bracket_title:
-                title = match_bracket_title.group(1).strip()
-            else:
-                title = first_line_cleaned.split("。")[0].split("\n")[0][:60].strip()
-        if not title:
-            title = "教学通知"
-        title = title.replace("通知：", "").replace("通知:", "").strip()
-    
-    summary = ai_extracted_info.get("summary", notification_text)
-    deadline_str = ai_extracted_info.get("deadline")
+def save_batch_results(results):
+    """将 process_notification_batch 的结果保存到历史记录，之后再删除已写入的队列条目，并关联写入失败的队列条目"""
+    finished_records = []
+    for result in results:
+        parsed_data = result["parsed"]
+        if parsed_data is None:
+            continue
+        parsed_data["状态"] = "成功" if result["success"] else f"失败: {result['message']}"
+        parsed_data["record_id"] = result["record_id"]
+        parsed_data["fingerprint"] = result["fingerprint"]
+        parsed_data["simhash"] = result["simhash"]
+        if result.get("tenant") not in (None, DEFAULT_TENANT_NAME):
+            parsed_data["feishu_tenant"] = result["tenant"]
+        finished_records.append((result, parsed_data))
+    history_ids = save_many_to_history([parsed_data for _, parsed_data in finished_records])
+    store = get_outbox()
+    if store is not None:
+        for (result, _), history_id in zip(finished_records, history_ids):
+            if not result["success"] and result.get("outbox_id") is not None:
+                store.link_history(result["outbox_id"], history_id)
+        if history_ids:
+            # 历史记录保存后才删除已写入的条目；之前退出时由 finish_written_outbox 补记
+            store.mark_done_many([result["outbox_id"] for result, _ in finished_records
+                                  if result["success"] and result.get("outbox_id") is not None])
 
-    return {
-        "院校通知": title,
-        "院校通知详情 AI": summary,
-        "创建时间": get_current_date_iso(),
-        "截止日期": deadline_str
-    }
+def batch_result_status(result):
+    """process_notification_batch 单条结果的状态：written、failed 或 duplicate"""
+    if result["skipped"] == "duplicate":
+        return "duplicate"
+    return "written" if result["success"] else "failed"
 
-def get_tenant_access_token(app_id, app_secret):
-    """获取飞书 tenant_access_token"""
-    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal/"
-    headers = {"Content-Type": "application/json"}
-    payload = {"app_id": app_id, "app_secret": app_secret}
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=10)
-        response.raise_for_status()
-        token_data = response.json()
-        if "tenant_access_token" in token_data:
-            return token_data["tenant_access_token"], None
-        else:
-            return None, token_data.get("msg", "获取token失败，未找到tenant_access_token")
-    except requests.exceptions.RequestException as e:
-        return None, f"获取token时发生网络错误: {e}"
-    except json.JSONDecodeError:
-        return None, "获取token时解析响应失败，非JSON格式"
+class JobControl:
+    """后台任务的暂停/取消控制"""
+    def __init__(self):
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._cancel_event = threading.Event()
 
-def add_record_to_bitable(token, bitable_app_token, table_id, record_data):
-    """向飞书多维表格添加记录"""
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{bitable_app_token}/tables/{table_id}/records"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    
-    fields_payload = {}
-    for key, value in record_data.items():
-        if key in FIELD_MAPPING:
-            if (key == "截止日期" or key == "创建时间") and value and value != "未提取到截止日期" and value is not None:
-                try:
-                    dt_obj = datetime.datetime.strptime(value, "%Y-%m-%d")
-                    fields_payload[FIELD_MAPPING[key]] = int(dt_obj.timestamp() * 1000)
-                except ValueError:
-                    print(f"警告：日期字段 \'{key}\' 的值 \'{value}\' 无法转换为时间戳，将跳过此字段。")
-                    continue 
-            else:
-                if key == "截止日期" and (value == "未提取到截止日期" or value is None):
-                    print(f"提示：字段 \'{key}\' 的值为 \'{value}\'，将不发送此字段给飞书。")
+    def pause(self):
+        self._resume_event.clear()
+
+    def resume(self):
+        self._resume_event.set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        self._resume_event.set()
+
+    @property
+    def is_paused(self):
+        return not self._resume_event.is_set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def wait_to_proceed(self):
+        """暂停时阻塞，返回是否允许发起新的API调用"""
+        self._resume_event.wait()
+        return not self._cancel_event.is_set()
+
+def process_notification_batch(notifications, on_parsed=None, on_written=None, control=None, on_field=None):
+    """并发提取并写入一批通知（列表或生成器），返回按输入顺序排列的结果列表
+
+    豆包提取在 VOLC_MAX_WORKERS 个线程中并发执行，提取完成的记录立即交给
+    批量写入器（并发数 FEISHU_MAX_WORKERS），不必等待其他通知提取完毕。
+    on_parsed(序号, 解析结果) 在调用线程中按输入顺序回调；
+    on_written(序号, 是否成功, 信息, record_id) 在写入线程中回调；
+    on_field(序号, 键, 值) 在流式提取（VOLC_STREAMING）时于提取线程中回调，不保证顺序。
+    control 为 JobControl 时，暂停/取消只拦截尚未开始的提取，已提取的记录照常写入。
+    被跳过的通知结果中 parsed 为 None，skipped 为 "duplicate" 或 "cancelled"。
+    每条通知按 route_notice 选择飞书写入目标（结果中的 tenant），更新已有记录时写入原记录所在的目标。
+    """
+    # 上次运行中已写入飞书但未保存历史记录的通知先补记，去重才能找到它们
+    finish_written_outbox()
+    results = []
+    texts = []
+    finished = []
+    update_targets = {}
+    checker = DuplicateChecker()
+
+    def prepared_items():
+        """逐条登记结果并去重，产出需要提取的 (序号, 通知文本)"""
+        for i, text in enumerate(notifications):
+            texts.append(text)
+            result = {"parsed": None, "success": False, "message": "未获得写入结果", "record_id": None,
+                      "skipped": None, "fingerprint": notice_fingerprint(text), "simhash": notice_simhash(text),
+                      "tenant": route_notice(text).name}
+            results.append(result)
+            finished.append(False)
+            # 去重：重复的通知不调用豆包，也不写入飞书
+            match = checker.check(i, text, result["fingerprint"], result["simhash"])
+            if match is not None:
+                mode = {"exact": config.get("DEDUP_EXACT_MODE", "skip"),
+                        "near": config.get("DEDUP_NEAR_MODE", "off")}.get(match["kind"], "skip")
+                if mode == "flag":
+                    # 只提示，照常提取并写入
+                    result["duplicate"] = match
+                    print(f"提示：第 {i + 1} 条通知与已写入的通知相似（{match['record'].get('院校通知')}，"
+                          f"汉明距离 {match['distance']}），仍将写入")
+                elif mode == "update" and match["record"].get("record_id"):
+                    # 重新提取后更新原飞书记录（upsert）：原记录已被删除时改为新增，内容未变化时不写入
+                    result["tenant"] = match["record"].get("feishu_tenant") or DEFAULT_TENANT_NAME
+                    update_targets[i] = resolve_upsert_target(match["record"]["record_id"], result["tenant"])
+                else:
+                    result.update(skipped="duplicate", duplicate=match,
+                                  message=f"与已写入的通知重复（{match['record'].get('院校通知')}），已跳过")
+                    finished[i] = True
                     continue
-                fields_payload[FIELD_MAPPING[key]] = value
-        else:
-            print(f"警告：数据中的键 \'{key}\' 在FIELD_MAPPING中未定义，将忽略此字段。")
+            yield i, text
 
-    if not fields_payload:
-        return False, "没有可写入的有效字段数据（可能是所有日期字段都无法转换或为空，或者所有字段都被忽略）。"
+    def extract(group):
+        if control is not None and not control.wait_to_proceed():
+            for i, _ in group:
+                results[i].update(skipped="cancelled", message="已取消")
+            return [None] * len(group)
+        if len(group) == 1:
+            i, text = group[0]
+            field_callback = None
+            if on_field:
+                field_callback = lambda key, value: on_field(i, key, value)
+            return [parse_single_notification(text, on_field=field_callback)]
+        return parse_notifications_batch([text for _, text in group])
 
-    payload = {"fields": fields_payload}
-    
+    def handle_written(i, success, message, record_id):
+        results[i].update(success=success, message=message, record_id=record_id)
+        perf_recorder.count("records_written" if success else "records_failed")
+        outbox_id = results[i].get("outbox_id")
+        if outbox_id is not None:
+            if success:
+                store.mark_written(outbox_id, record_id)
+            else:
+                store.mark_failed(outbox_id, message)
+        if on_written:
+            on_written(i, success, message, record_id)
+
+    store = get_outbox()
+    writers = TenantWriterGroup()
+    volc_workers = max(1, int(config.get("VOLC_MAX_WORKERS", 4)))
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=10)
-        response.raise_for_status()
-        response_data = response.json()
-        if response_data.get("code") == 0:
-            return True, response_data.get("msg", "记录添加成功")
+        with ThreadPoolExecutor(max_workers=volc_workers, thread_name_prefix="volc") as executor:
+            # notifications 可以是生成器：边分割边去重、提交提取；
+            # 批量提取模式下按 token 预算把多条短通知合并为一次请求
+            if config.get("VOLC_MICRO_BATCH", False):
+                groups = plan_extraction_batches(prepared_items())
+            else:
+                groups = ([item] for item in prepared_items())
+            futures = {executor.submit(perf_recorder.profiled, extract, group): [i for i, _ in group]
+                       for group in groups}
+            next_index = 0
+            for future in as_completed(futures):
+                indexes = futures[future]
+                try:
+                    parsed_list = future.result()
+                except Exception as e:
+                    print(f"错误：解析第 {', '.join(str(i + 1) for i in indexes)} 条通知时发生未知错误: {e}")
+                    parsed_list = [{
+                        "院校通知": texts[i].split("\n")[0][:60].strip() or "教学通知",
+                        "院校通知详情 AI": texts[i],
+                        "创建时间": get_current_date_iso(),
+                        "截止日期": None
+                    } for i in indexes]
+                for i, parsed_data in zip(indexes, parsed_list):
+                    finished[i] = True
+                    results[i]["parsed"] = parsed_data
+                    if parsed_data is None:
+                        continue
+                    perf_recorder.count("notices_extracted")
+                    # 先写入持久化队列，保证已付费的提取结果不会因写入失败或程序退出而丢失
+                    idempotency_key = None
+                    if store is not None:
+                        meta = {"fingerprint": results[i]["fingerprint"], "simhash": results[i]["simhash"]}
+                        if results[i]["tenant"] != DEFAULT_TENANT_NAME:
+                            meta["feishu_tenant"] = results[i]["tenant"]
+                        results[i]["outbox_id"], idempotency_key = store.enqueue(
+                            parsed_data, meta, update_targets.get(i))
+                    writers.add(results[i]["tenant"], parsed_data,
+                                lambda success, message, record_id, i=i: handle_written(i, success, message, record_id),
+                                record_id=update_targets.get(i), idempotency_key=idempotency_key)
+                # 按输入顺序输出已完成的解析结果
+                while next_index < len(results) and finished[next_index]:
+                    if on_parsed and results[next_index]["parsed"] is not None:
+                        on_parsed(next_index, results[next_index]["parsed"])
+                    next_index += 1
+            while next_index < len(results):
+                if on_parsed and results[next_index]["parsed"] is not None:
+                    on_parsed(next_index, results[next_index]["parsed"])
+                next_index += 1
+    finally:
+        writers.close()
+    return results
+
+class NotificationJob:
+    """在后台线程中处理一批通知，通过线程安全队列推送进度事件
+
+    事件格式：("extracted", 序号, 解析结果)、("written", 序号, 信息)、
+    ("failed", 序号, 信息)、("duplicate", 序号, 信息)、("cancelled", 序号)、
+    ("title", 序号, 标题)（仅流式提取）、("done", 结果列表)、("error", 信息)。
+    """
+    def __init__(self, notifications):
+        self.notifications = notifications
+        self.control = JobControl()
+        self.events = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def _on_written(self, i, success, message, record_id):
+        if success:
+            self.events.put(("written", i, message))
         else:
-            error_detail = response_data.get("msg", "未知错误")
-            if "data" in response_data and "record" in response_data["data"] and "id" in response_data["data"]["record"]:
-                 error_detail += f" (记录ID: {response_data['data']['record']['id']})"
-            elif "error" in response_data and "details" in response_data["error"]:
-                error_detail += f" 详细: {response_data['error']['details']}"
-            if response_data.get("code") == 1254064: 
-                error_detail += " 这通常意味着发送的日期/时间格式不被飞书表格的日期列接受。脚本已尝试转换为毫秒级时间戳，请确保飞书表格中的日期列类型配置正确。"
-            return False, f"添加记录失败 (code: {response_data.get('code')}): {error_detail}"
+            self.events.put(("failed", i, message))
 
-    except requests.exceptions.HTTPError as e:
+    def _on_field(self, i, key, value):
+        # 流式提取时标题先于其他字段到达，提前推送给界面
+        if key == "title" and value:
+            self.events.put(("title", i, value))
+
+    def _run(self):
         try:
-            error_content = e.response.json()
-            return False, f"添加记录时发生HTTP错误: {e.response.status_code} - {error_content}"
-        except json.JSONDecodeError:
-            return False, f"添加记录时发生HTTP错误: {e.response.status_code} - {e.response.text}"
-    except requests.exceptions.RequestException as e:
-        return False, f"添加记录时发生网络错误: {e}"
-    except json.JSONDecodeError:
-        return False, "添加记录时解析响应失败，非JSON格式"
+            if config.get("BITABLE_SYNC_ON_SUBMIT", False):
+                success, message = sync_all_bitable_mirrors()
+                if not success:
+                    print(f"警告：同步飞书多维表格镜像失败: {message}")
+            results = perf_recorder.profiled(
+                process_notification_batch,
+                self.notifications,
+                on_parsed=lambda i, parsed_data: self.events.put(("extracted", i, parsed_data)),
+                on_written=self._on_written,
+                control=self.control,
+                on_field=self._on_field)
+            for i, result in enumerate(results):
+                if result["skipped"] == "duplicate":
+                    self.events.put(("duplicate", i, result["message"]))
+                elif result["skipped"] == "cancelled":
+                    self.events.put(("cancelled", i))
+            save_batch_results(results)
+            perf_recorder.finish_run()
+            self.events.put(("done", results))
+        except Exception as e:
+            perf_recorder.finish_run()
+            self.events.put(("error", f"处理通知时发生未知错误: {e}"))
 
-def write_to_feishu(record_data):
-    """写入记录到飞书"""
-    global config
-    
-    app_id = config.get("FEISHU_APP_ID")
-    app_secret = config.get("FEISHU_APP_SECRET")
-    bitable_app_token = config.get("FEISHU_BITABLE_APP_TOKEN")
-    table_id = config.get("FEISHU_TABLE_ID")
+class OutboxReplayJob:
+    """在后台线程中重放飞书写入队列中的记录（不调用豆包），事件格式与 NotificationJob 相同"""
+    def __init__(self, statuses=("pending",)):
+        self.statuses = statuses
+        self.control = JobControl()
+        self.events = queue.Queue()
+        self.total = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
 
-    if not all([app_id, app_secret, bitable_app_token, table_id]):
-        return False, "飞书配置信息不完整 (App ID, App Secret, Bitable App Token, or Table ID missing)."
+    def start(self):
+        self._thread.start()
 
-    token, error_msg = get_tenant_access_token(app_id, app_secret)
-    if error_msg:
-        return False, f"获取飞书访问凭证失败: {error_msg}"
-    if not token:
-        return False, "获取飞书访问凭证失败，未收到Token但没有明确错误信息。"
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def _on_written(self, i, item, success, message, record_id):
+        """写入完成后更新队列和历史记录"""
+        store = get_outbox()
+        status = "成功" if success else f"失败: {message}"
+        history_id = item["history_id"]
+        if history_id is not None:
+            get_history_store().update_write_result(history_id, status, record_id)
+        else:
+            # 上次运行中断前尚未保存历史记录
+            record = dict(item["record"], 状态=status, record_id=record_id, **item["meta"])
+            history_id = save_to_history(record)
+        if success:
+            store.mark_done(item["id"])
+            self.events.put(("written", i, message))
+        else:
+            store.mark_failed(item["id"], message, history_id)
+            self.events.put(("failed", i, message))
+
+    @staticmethod
+    def stored_batches(items):
+        """返回 {client_token: [条目序号, ...]}：上次发送时的批次成员全部在本次重放中的新增记录，按原成员顺序排列"""
+        positions = {item["idempotency_key"]: i for i, item in enumerate(items)}
+        batches = {}
+        for item in items:
+            client_token, members = item["batch_token"], item["batch_members"]
+            if not client_token or client_token in batches or not members:
+                continue
+            indexes = [positions.get(key) for key in members]
+            if all(j is not None and items[j]["batch_token"] == client_token and not items[j]["target_record_id"]
+                   for j in indexes):
+                batches[client_token] = indexes
+        return batches
 
-    success, message = add_record_to_bitable(token, bitable_app_token, table_id, record_data)
-    return success, message
+    def _run(self):
+        try:
+            finish_written_outbox()
+            store = get_outbox()
+            items = store.claim(self.statuses) if store is not None else []
+            self.total = len(items)
+            writers = TenantWriterGroup()
+            batches = self.stored_batches(items)
+            batch_of = {j: client_token for client_token, members in batches.items() for j in members}
+            queued = set()
+            try:
+                for i, item in enumerate(items):
+                    if i in queued:
+                        continue
+                    if not self.control.wait_to_proceed():
+                        # 未发送的条目放回队列
+                        for j in range(i, len(items)):
+                            if j not in queued:
+                                store.mark_failed(items[j]["id"], "已取消重放")
+                                self.events.put(("cancelled", j))
+                        break
+                    tenant_name = item["meta"].get("feishu_tenant") or DEFAULT_TENANT_NAME
+                    client_token = batch_of.get(i)
+                    members = batches[client_token] if client_token else [i]
+                    for j in members:
+                        queued.add(j)
+                        self.events.put(("extracted", j, items[j]["record"]))
+                    if client_token:
+                        # 上次已发送过的批次：按原成员顺序和原 client_token 重发，飞书不会重复创建
+                        writers.add_group(tenant_name, [
+                            (items[j]["record"],
+                             lambda success, message, record_id, j=j: self._on_written(
+                                 j, items[j], success, message, record_id),
+                             items[j]["idempotency_key"]) for j in members], client_token)
+                        continue
+                    writers.add(tenant_name, item["record"],
+                                lambda success, message, record_id, i=i, item=item:
+                                    self._on_written(i, item, success, message, record_id),
+                                record_id=item["target_record_id"], idempotency_key=item["idempotency_key"])
+            finally:
+                writers.close()
+            perf_recorder.finish_run()
+            self.events.put(("done", items))
+        except Exception as e:
+            perf_recorder.finish_run()
+            self.events.put(("error", f"重放飞书写入队列时发生未知错误: {e}"))
 
 class HistoryWindow(tk.Toplevel):
-    """历史记录窗口"""
+    """历史记录窗口（分页加载，查询条件在数据库中执行）"""
+    PAGE_SIZE = 200
+    
     def __init__(self, parent):
         super().__init__(parent)
         self.title("历史记录")
         self.geometry("800x600")
         self.minsize(600, 400)
         
+        self.store = get_history_store()
+        self.page = 0
+        self.total = 0
+        self.filters = {}
+        self.order_by_deadline = False
+        
+        # 创建查询条件栏
+        filter_frame = tk.Frame(self)
+        filter_frame.pack(fill="x", padx=5, pady=5)
+        tk.Label(filter_frame, text="关键词").pack(side="left")
+        self.keyword_entry = tk.Entry(filter_frame, width=20)
+        self.keyword_entry.pack(side="left", padx=5)
+        tk.Label(filter_frame, text="截止日期 从").pack(side="left")
+        self.deadline_from_entry = tk.Entry(filter_frame, width=12)
+        self.deadline_from_entry.pack(side="left", padx=5)
+        tk.Label(filter_frame, text="至").pack(side="left")
+        self.deadline_to_entry = tk.Entry(filter_frame, width=12)
+        self.deadline_to_entry.pack(side="left", padx=5)
+        tk.Button(filter_frame, text="查询", command=self.search, width=8).pack(side="left", padx=5)
+        tk.Button(filter_frame, text="重置", command=self.reset_search, width=8).pack(side="left")
+        tk.Button(filter_frame, text="即将截止", command=self.show_upcoming, width=8).pack(side="left", padx=5)
+        self.keyword_entry.bind("<Return>", lambda event: self.search())
+        
+        # 创建分页栏
+        page_frame = tk.Frame(self)
+        page_frame.pack(side="bottom", fill="x", padx=5, pady=5)
+        self.prev_button = tk.Button(page_frame, text="上一页", command=self.prev_page, width=8)
+        self.prev_button.pack(side="left")
+        self.next_button = tk.Button(page_frame, text="下一页", command=self.next_page, width=8)
+        self.next_button.pack(side="left", padx=5)
+        self.page_label = tk.Label(page_frame, text="", anchor="w")
+        self.page_label.pack(side="left", padx=5)
+        
         # 创建表格
         columns = ("处理时间", "院校通知", "院校通知详情 AI", "截止日期", "状态")
         self.tree = ttk.Treeview(self, columns=columns, show="headings")
@@ -384,31 +3296,92 @@ class HistoryWindow(tk.Toplevel):
         # 双击查看详情
         self.tree.bind("<Double-1>", self.show_details)
     
+    def search(self, order_by_deadline=False):
+        """按查询条件重新加载第一页"""
+        filters = {
+            "keyword": self.keyword_entry.get().strip() or None,
+            "deadline_from": self.deadline_from_entry.get().strip() or None,
+            "deadline_to": self.deadline_to_entry.get().strip() or None
+        }
+        for key in ("deadline_from", "deadline_to"):
+            if filters[key] and not ISO_DATE_PATTERN.match(filters[key]):
+                messagebox.showwarning("警告", "截止日期请使用 YYYY-MM-DD 格式", parent=self)
+                return
+        self.filters = filters
+        self.order_by_deadline = order_by_deadline
+        self.page = 0
+        self.load_history()
+    
+    def reset_search(self):
+        """清空查询条件"""
+        for entry in (self.keyword_entry, self.deadline_from_entry, self.deadline_to_entry):
+            entry.delete(0, tk.END)
+        self.filters = {}
+        self.order_by_deadline = False
+        self.page = 0
+        self.load_history()
+    
+    def show_upcoming(self):
+        """查看今天到 REMINDER_QUERY_DAYS 天内截止的通知（按截止日期先后排序）"""
+        today = datetime.date.today()
+        deadline_to = today + datetime.timedelta(days=int(config.get("REMINDER_QUERY_DAYS", 7)))
+        for entry, value in ((self.deadline_from_entry, today), (self.deadline_to_entry, deadline_to)):
+            entry.delete(0, tk.END)
+            entry.insert(0, value.isoformat())
+        self.search(order_by_deadline=True)
+    
+    def prev_page(self):
+        if self.page > 0:
+            self.page -= 1
+            self.load_history()
+    
+    def next_page(self):
+        if (self.page + 1) * self.PAGE_SIZE < self.total:
+            self.page += 1
+            self.load_history()
+    
     def load_history(self):
-        """加载历史记录到表格"""
+        """加载当前页的历史记录到表格"""
         # 清空表格
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.tree.delete(*self.tree.get_children())
         
-        # 加载历史记录
-        history = load_history()
-        
-        # 添加到表格
-        for item in reversed(history):  # 最新的记录显示在前面
-            status = item.get("状态", "未知")
-            self.tree.insert("", "end", values=(
-                item.get("处理时间", ""),
-                item.get("院校通知", ""),
-                item.get("院校通知详情 AI", "")[:100] + "..." if len(item.get("院校通知详情 AI", "")) > 100 else item.get("院校通知详情 AI", ""),
-                item.get("截止日期", ""),
+        # 只读取当前页
+        try:
+            self.total = self.store.count_matching(**self.filters)
+            records = self.store.query(offset=self.page * self.PAGE_SIZE, limit=self.PAGE_SIZE,
+                                       order_by_deadline=self.order_by_deadline, **self.filters)
+        except Exception as e:
+            messagebox.showerror("错误", f"读取历史记录时发生错误: {e}", parent=self)
+            self.total = 0
+            records = []
+        
+        # 添加到表格（最新的记录显示在前面），以记录 id 作为行标识
+        for item in records:
+            status = item.get("状态") or "未知"
+            summary = item.get("院校通知详情 AI") or ""
+            self.tree.insert("", "end", iid=str(item["id"]), values=(
+                item.get("处理时间") or "",
+                item.get("院校通知") or "",
+                summary[:100] + "..." if len(summary) > 100 else summary,
+                item.get("截止日期") or "",
                 status
             ))
+        
+        # 更新分页信息
+        page_count = max(1, (self.total + self.PAGE_SIZE - 1) // self.PAGE_SIZE)
+        self.page_label.config(text=f"第 {self.page + 1}/{page_count} 页，共 {self.total} 条")
+        self.prev_button.config(state="normal" if self.page > 0 else "disabled")
+        self.next_button.config(state="normal" if self.page + 1 < page_count else "disabled")
     
     def show_details(self, event):
-        """显示详细信息"""
+        """显示详细信息（按 id 读取完整记录）"""
         # 获取选中的项
-        item_id = self.tree.selection()[0]
-        item = self.tree.item(item_id)
+        selection = self.tree.selection()
+        if not selection:
+            return
+        record = self.store.get(int(selection[0]))
+        if record is None:
+            return
         
         # 创建详情窗口
         detail_window = tk.Toplevel(self)
@@ -420,16 +3393,524 @@ class HistoryWindow(tk.Toplevel):
         text.pack(fill="both", expand=True)
         
         # 显示详细信息
-        values = item["values"]
-        text.insert(tk.END, f"处理时间: {values[0]}\n\n")
-        text.insert(tk.END, f"院校通知: {values[1]}\n\n")
-        text.insert(tk.END, f"院校通知详情 AI: {values[2]}\n\n")
-        text.insert(tk.END, f"截止日期: {values[3]}\n\n")
-        text.insert(tk.END, f"状态: {values[4]}\n")
+        text.insert(tk.END, f"处理时间: {record.get('处理时间')}\n\n")
+        text.insert(tk.END, f"院校通知: {record.get('院校通知')}\n\n")
+        text.insert(tk.END, f"院校通知详情 AI: {record.get('院校通知详情 AI')}\n\n")
+        text.insert(tk.END, f"创建时间: {record.get('创建时间')}\n\n")
+        text.insert(tk.END, f"截止日期: {record.get('截止日期')}\n\n")
+        text.insert(tk.END, f"状态: {record.get('状态')}\n")
         
         # 设置只读
         text.configure(state="disabled")
 
+class IngestionDaemon:
+    """长时间运行的导入模式：监视投递文件夹中导出的聊天记录（及可选的剪贴板），按微批次提取并写入飞书
+
+    文件大小和修改时间在 debounce_seconds 秒内不再变化后才读取新增内容，多个文件和剪贴板的
+    新通知合并成不超过 batch_size 条的批次。每个文件从已处理的字节偏移处流式读取，每批写入并
+    保存历史记录后把偏移持久化到历史数据库，重启后从上次的位置继续；文件被截断或替换
+    （开头内容变化）时从头读取。常驻内存只有每个文件的少量状态和当前批次。
+    """
+    CLIPBOARD_SOURCE = "clipboard"
+    HEAD_HASH_BYTES = 4096
+
+    def __init__(self, folder=None, pattern="*.txt", batch_size=20, poll_seconds=2.0, debounce_seconds=3.0,
+                 clipboard=False, clipboard_max_chars=100000, on_batch=None):
+        self.folder = Path(folder).resolve() if folder else None
+        self.pattern = pattern
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = max(0.1, poll_seconds)
+        self.debounce_seconds = max(0.0, debounce_seconds)
+        self.clipboard = clipboard
+        self.clipboard_max_chars = clipboard_max_chars
+        self.on_batch = on_batch
+        # 路径 -> {"size", "mtime", "changed_at", "offset"}，offset 为 None 表示尚未与数据库核对
+        self.files = {}
+        self._clipboard_root = None
+        self._clipboard_seen = None
+        self._clipboard_hash = None
+        self._stop_event = threading.Event()
+        self.counts = {"batches": 0, "written": 0, "failed": 0, "duplicate": 0}
+
+    def stop(self):
+        self._stop_event.set()
+
+    @staticmethod
+    def _head_hash(path, length):
+        """文件开头 length 字节（最多 HEAD_HASH_BYTES）的哈希，用于识别文件是否被替换"""
+        with open(path, "rb") as f:
+            head = f.read(min(length, IngestionDaemon.HEAD_HASH_BYTES))
+        return hashlib.sha1(head).hexdigest()
+
+    def _stored_offset(self, path, size):
+        """读取已持久化的偏移，文件比偏移短或开头内容变化时从头开始"""
+        row = get_history_store().get_ingest_offset(str(path))
+        if row is None:
+            return 0
+        offset, head_hash = row
+        if size < offset or self._head_hash(path, offset) != head_hash:
+            print(f"提示：{path.name} 已被截断或替换，将从头读取")
+            return 0
+        return offset
+
+    def scan(self):
+        """检查文件夹，返回内容已稳定且有未处理内容的文件路径列表（按修改时间排序）"""
+        if self.folder is None:
+            return []
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        try:
+            paths = [path for path in self.folder.glob(self.pattern) if path.is_file()]
+        except OSError as e:
+            print(f"警告：读取监视文件夹失败: {e}")
+            return []
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            seen.add(path)
+            state = self.files.get(path)
+            if state is None or (state["size"], state["mtime"]) != (stat.st_size, stat.st_mtime_ns):
+                self.files[path] = state = {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+                                            "changed_at": now, "offset": None}
+            if now - state["changed_at"] < self.debounce_seconds:
+                continue
+            if state["offset"] is None:
+                state["offset"] = self._stored_offset(path, state["size"])
+            if state["offset"] < state["size"]:
+                ready.append(path)
+        # 已删除或移走的文件不再保留状态
+        for path in set(self.files) - seen:
+            del self.files[path]
+        ready.sort(key=lambda path: (self.files[path]["mtime"], str(path)))
+        return ready
+
+    def _read_clipboard(self):
+        """读取剪贴板文本，无法访问时关闭剪贴板监视"""
+        if self._clipboard_root is None:
+            try:
+                self._clipboard_root = tk.Tk()
+                self._clipboard_root.withdraw()
+            except tk.TclError as e:
+                print(f"警告：无法访问剪贴板，已关闭剪贴板监视: {e}")
+                self.clipboard = False
+                return ""
+        try:
+            self._clipboard_root.update()
+            return self._clipboard_root.clipboard_get()
+        except tk.TclError:
+            return ""
+
+    def poll_clipboard(self):
+        """剪贴板内容稳定 debounce_seconds 秒且未处理过时，返回 (内容哈希, 通知列表)，否则返回 None
+
+        只接受首行符合通知开头格式的段落，避免把随手复制的其他文本写入飞书。
+        """
+        if not self.clipboard:
+            return None
+        text = self._read_clipboard()
+        if not text.strip():
+            return None
+        if len(text) > self.clipboard_max_chars:
+            text = text[:self.clipboard_max_chars]
+        content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        if self._clipboard_seen is None or self._clipboard_seen[0] != content_hash:
+            self._clipboard_seen = (content_hash, now)
+            return None
+        if now - self._clipboard_seen[1] < self.debounce_seconds:
+            return None
+        if self._clipboard_hash is None:
+            row = get_history_store().get_ingest_offset(self.CLIPBOARD_SOURCE)
+            self._clipboard_hash = row[1] if row else ""
+        if content_hash == self._clipboard_hash:
+            return None
+        notices = [notice for notice in split_notifications(text)
+                   if is_new_notification_start(notice.split("\n", 1)[0])]
+        if not notices:
+            # 不是通知的内容也记为已处理，不再反复检查
+            self._clipboard_hash = content_hash
+            return None
+        return content_hash, notices
+
+    @staticmethod
+    def _read_lines(f, limit):
+        """逐行读取到检查时的文件大小为止，之后追加的内容等稳定后再处理"""
+        while f.tell() < limit:
+            line = f.readline()
+            if not line:
+                return
+            yield line
+
+    def collect_batch(self):
+        """收集一批待处理的通知，返回 (条目列表, 待保存的偏移)
+
+        条目为 (来源, 起始偏移, 结束偏移, 通知文本)，剪贴板条目的偏移为 None；
+        待保存的偏移为 {来源: 结束偏移或剪贴板内容哈希}。
+        """
+        items = []
+        commits = {}
+        for path in self.scan():
+            if len(items) >= self.batch_size:
+                break
+            offset = self.files[path]["offset"]
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    lines = self._read_lines(f, self.files[path]["size"])
+                    for start, end, text in iter_notifications_from_stream(lines, offset):
+                        if text:
+                            items.append((str(path), start, end, text))
+                        commits[str(path)] = end
+                        if len(items) >= self.batch_size:
+                            break
+                    else:
+                        # 读到文件末尾：末尾只有空白时也前移偏移，避免反复读取
+                        commits[str(path)] = f.tell()
+            except OSError as e:
+                print(f"警告：读取 {path.name} 失败: {e}")
+        if len(items) < self.batch_size:
+            clipboard = self.poll_clipboard()
+            if clipboard is not None:
+                content_hash, notices = clipboard
+                items.extend((self.CLIPBOARD_SOURCE, None, None, text) for text in notices)
+                commits[self.CLIPBOARD_SOURCE] = content_hash
+        return items, commits
+
+    def commit(self, commits):
+        """保存本批已处理的偏移"""
+        rows = []
+        for source, value in commits.items():
+            if source == self.CLIPBOARD_SOURCE:
+                self._clipboard_hash = value
+                rows.append((source, 0, value))
+                continue
+            path = Path(source)
+            if path in self.files:
+                self.files[path]["offset"] = value
+            try:
+                rows.append((source, value, self._head_hash(path, value)))
+            except OSError as e:
+                print(f"警告：记录 {path.name} 的处理进度失败: {e}")
+        if rows:
+            get_history_store().set_ingest_offsets(rows)
+
+    def run_once(self):
+        """处理一批新内容，返回处理的通知条数"""
+        items, commits = self.collect_batch()
+        results = []
+        if items:
+            perf_recorder.start_run()
+            results = process_notification_batch([text for _, _, _, text in items])
+            save_batch_results(results)
+            perf_recorder.finish_run()
+            self.counts["batches"] += 1
+            for result in results:
+                result["status"] = batch_result_status(result)
+                self.counts[result["status"]] += 1
+        if commits:
+            self.commit(commits)
+        if items and self.on_batch is not None:
+            self.on_batch(items, results)
+        return len(items)
+
+    def run(self):
+        """持续监视，直到调用 stop()；有积压时连续处理，否则每 poll_seconds 秒检查一次"""
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    processed = self.run_once()
+                except Exception as e:
+                    # 偏移尚未保存，下次检查时会重新处理这一批
+                    print(f"警告：监视导入处理失败，将在 {self.poll_seconds:g} 秒后重试: {e}")
+                    processed = 0
+                if not processed:
+                    self._stop_event.wait(self.poll_seconds)
+        finally:
+            if self._clipboard_root is not None:
+                self._clipboard_root.destroy()
+                self._clipboard_root = None
+
+class DeadlineReminderScheduler:
+    """截止日期提醒：在截止前 days_before 天的 remind_time 通过飞书自定义机器人 Webhook 发送提醒
+
+    待发送的提醒放在按发送时间排序的最小堆中，只覆盖截止日期在今天到 max(days_before) 天之后的记录：
+    启动时和每天跨日时按截止日期索引对新进入窗口的日期做范围查询，新保存的记录由
+    save_many_to_history 直接加入堆中，不会重新扫描历史记录。已发送的提醒记录在历史数据库中，
+    重启后不会重复发送；错过发送时间的记录（程序未运行）启动后补发一次（当天稍后还会提醒时除外）。发送失败的提醒在
+    retry_seconds 秒后重试。同一条通知转发多次时按内容指纹合并，只提醒一次。
+    """
+    MAX_WAIT_SECONDS = 300
+    MAX_LINES_PER_MESSAGE = 30
+
+    def __init__(self, webhook_url, secret=None, days_before=(3, 1, 0), remind_time="09:00", retry_seconds=300):
+        self.webhook_url = webhook_url
+        self.secret = secret
+        self.days_before = sorted({max(0, int(days)) for days in days_before}) or [0]
+        hour, _, minute = str(remind_time).partition(":")
+        self.remind_time = datetime.time(int(hour), int(minute or 0))
+        self.retry_seconds = max(1.0, retry_seconds)
+        # 堆元素为 (发送时间戳, 序号, 提醒键, 提前天数, 记录)
+        self._heap = []
+        self._queued = set()
+        self._seq = itertools.count()
+        self._window_end = None
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.counts = {"sent": 0, "failed": 0}
+
+    @staticmethod
+    def notice_key(record):
+        """同一条通知的标识：优先使用内容指纹，多次转发保存的记录共用一个提醒"""
+        return record.get("fingerprint") or f"id:{record.get('id')}"
+
+    @classmethod
+    def reminder_key(cls, record, days_before):
+        return f"{cls.notice_key(record)}:{record.get('截止日期')}:{days_before}"
+
+    def fire_time(self, deadline, days_before):
+        """截止前 days_before 天的提醒时间（本地时间戳）"""
+        day = deadline - datetime.timedelta(days=days_before)
+        return datetime.datetime.combine(day, self.remind_time).timestamp()
+
+    def _entries_for(self, record, now, today):
+        """一条记录需要加入堆中的提醒：未到时间的全部加入，已错过的只保留最近的一次（补发）"""
+        deadline_str = record.get("截止日期")
+        if not deadline_str or not ISO_DATE_PATTERN.match(deadline_str):
+            return []
+        try:
+            deadline = datetime.date.fromisoformat(deadline_str)
+        except ValueError:
+            return []
+        if deadline < today:
+            return []
+        entries = []
+        missed = None
+        for days_before in self.days_before:
+            fire_at = self.fire_time(deadline, days_before)
+            if fire_at > now:
+                entries.append((fire_at, days_before))
+            elif missed is None:
+                missed = (now, days_before)
+        # 当天稍后还会提醒时不再补发
+        if missed is not None and not any(datetime.date.fromtimestamp(fire_at) == today for fire_at, _ in entries):
+            entries.append(missed)
+        return [(fire_at, self.reminder_key(record, days_before), days_before) for fire_at, days_before in entries]
+
+    def _push(self, records, now=None):
+        """把记录的提醒加入堆中（跳过已排队和已发送的），返回加入的条数"""
+        now = time.time() if now is None else now
+        today = datetime.date.fromtimestamp(now)
+        candidates = []
+        for record in records:
+            for fire_at, key, days_before in self._entries_for(record, now, today):
+                candidates.append((fire_at, key, days_before, record))
+        if not candidates:
+            return 0
+        with self._lock:
+            candidates = [item for item in candidates if item[1] not in self._queued]
+        fired = get_history_store().fired_reminders(item[1] for item in candidates)
+        pushed = 0
+        with self._lock:
+            for fire_at, key, days_before, record in candidates:
+                if key in fired or key in self._queued:
+                    continue
+                self._queued.add(key)
+                heapq.heappush(self._heap, (fire_at, next(self._seq), key, days_before, record))
+                pushed += 1
+        if pushed:
+            self._wake_event.set()
+        return pushed
+
+    def advance_window(self, now=None):
+        """把截止日期窗口推进到 max(days_before) 天之后，只查询新进入窗口的日期"""
+        now = time.time() if now is None else now
+        today = datetime.date.fromtimestamp(now)
+        window_end = today + datetime.timedelta(days=self.days_before[-1])
+        with self._lock:
+            previous_end = self._window_end
+            if previous_end is not None and previous_end >= window_end:
+                return 0
+            self._window_end = window_end
+        start = today if previous_end is None or previous_end < today else previous_end + datetime.timedelta(days=1)
+        records = get_history_store().due_between(start.isoformat(), window_end.isoformat())
+        return self._push(records, now)
+
+    def add_records(self, records, ids):
+        """新保存的历史记录：截止日期在当前窗口内的加入提醒队列"""
+        with self._lock:
+            window_end = self._window_end
+        if window_end is None:
+            return 0
+        window_end = window_end.isoformat()
+        in_window = [dict(record, id=history_id) for record, history_id in zip(records, ids)
+                     if record.get("截止日期") and record["截止日期"] <= window_end]
+        return self._push(in_window) if in_window else 0
+
+    def pop_due(self, now=None):
+        """取出发送时间已到的提醒；截止日期已过的直接丢弃"""
+        now = time.time() if now is None else now
+        today = datetime.date.fromtimestamp(now).isoformat()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                self._queued.discard(entry[2])
+                if entry[4]["截止日期"] >= today:
+                    due.append(entry)
+        return due
+
+    def next_fire_time(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def pending(self):
+        with self._lock:
+            return len(self._heap)
+
+    @staticmethod
+    def format_line(record, today):
+        deadline = datetime.date.fromisoformat(record["截止日期"])
+        days_left = (deadline - today).days
+        when = "今天截止" if days_left == 0 else f"还有 {days_left} 天截止"
+        return f"· {record.get('院校通知') or '未命名通知'}（{record['截止日期']}，{when}）"
+
+    def build_messages(self, entries, now=None):
+        """把到期的提醒整理成 [(消息文本, 提醒列表)]；同一条通知多个提醒同时到期时只列一次"""
+        today = datetime.date.fromtimestamp(time.time() if now is None else now)
+        groups = {}
+        for entry in sorted(entries, key=lambda entry: (entry[4]["截止日期"], entry[1])):
+            groups.setdefault(self.notice_key(entry[4]), []).append(entry)
+        groups = list(groups.values())
+        messages = []
+        for start in range(0, len(groups), self.MAX_LINES_PER_MESSAGE):
+            chunk = groups[start:start + self.MAX_LINES_PER_MESSAGE]
+            text = "【截止日期提醒】\n" + "\n".join(self.format_line(group[0][4], today) for group in chunk)
+            messages.append((text, [entry for group in chunk for entry in group]))
+        return messages
+
+    def send_text(self, text):
+        """通过机器人 Webhook 发送文本消息，返回 (success, message)"""
+        payload = {"msg_type": "text", "content": {"text": text}}
+        if self.secret:
+            # 飞书自定义机器人签名校验：以 "时间戳\n密钥" 为 key 对空串做 HMAC-SHA256
+            timestamp = str(int(time.time()))
+            string_to_sign = f"{timestamp}\n{self.secret}".encode("utf-8")
+            payload["timestamp"] = timestamp
+            payload["sign"] = base64.b64encode(hmac.new(string_to_sign, digestmod=hashlib.sha256).digest()).decode()
+        try:
+            response = get_http_client().post(self.webhook_url, endpoint="feishu_bot", json=payload, timeout=15)
+            data = response.json()
+        except Exception as e:
+            return False, f"发送截止日期提醒失败: {e}"
+        code = data.get("code", data.get("StatusCode"))
+        if response.status_code == 200 and code == 0:
+            return True, "提醒已发送"
+        return False, f"发送截止日期提醒失败: {data.get('msg') or data.get('StatusMessage') or response.status_code}"
+
+    def run_once(self, now=None):
+        """推进窗口并发送所有已到时间的提醒，返回发送成功的提醒条数"""
+        now = time.time() if now is None else now
+        self.advance_window(now)
+        due = self.pop_due(now)
+        if not due:
+            return 0
+        sent = 0
+        for text, entries in self.build_messages(due, now):
+            success, message = self.send_text(text)
+            if success:
+                get_history_store().mark_reminders_fired([(entry[2], entry[4].get("id")) for entry in entries])
+                self.counts["sent"] += len(entries)
+                sent += len(entries)
+                continue
+            print(f"警告：{message}，将在 {self.retry_seconds:g} 秒后重试")
+            self.counts["failed"] += len(entries)
+            with self._lock:
+                for _, _, key, days_before, record in entries:
+                    self._queued.add(key)
+                    heapq.heappush(self._heap, (now + self.retry_seconds, next(self._seq), key, days_before, record))
+        return sent
+
+    def seconds_until_next(self, now=None):
+        """距下一次需要检查的秒数：下一条提醒、次日零点（推进窗口）和 MAX_WAIT_SECONDS 中最早的"""
+        now = time.time() if now is None else now
+        tomorrow = datetime.date.fromtimestamp(now) + datetime.timedelta(days=1)
+        waits = [datetime.datetime.combine(tomorrow, datetime.time()).timestamp() - now, self.MAX_WAIT_SECONDS]
+        next_fire = self.next_fire_time()
+        if next_fire is not None:
+            waits.append(next_fire - now)
+        return max(0.0, min(waits))
+
+    def run(self):
+        """持续运行，直到调用 stop()；加入新提醒时立即重新计算等待时间"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"警告：截止日期提醒处理失败: {e}")
+            self._wake_event.wait(self.seconds_until_next())
+            self._wake_event.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name="deadline-reminder")
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+deadline_scheduler = None
+deadline_scheduler_lock = threading.Lock()
+
+def start_deadline_reminders():
+    """按配置启动截止日期提醒（未配置 REMINDER_WEBHOOK_URL 时返回 None）"""
+    global deadline_scheduler
+    with deadline_scheduler_lock:
+        if deadline_scheduler is None and config.get("REMINDER_WEBHOOK_URL"):
+            deadline_scheduler = DeadlineReminderScheduler(
+                config["REMINDER_WEBHOOK_URL"], secret=config.get("REMINDER_WEBHOOK_SECRET") or None,
+                days_before=config.get("REMINDER_DAYS_BEFORE", [3, 1, 0]),
+                remind_time=config.get("REMINDER_TIME", "09:00"),
+                retry_seconds=float(config.get("REMINDER_RETRY_SECONDS", 300))).start()
+        return deadline_scheduler
+
+def stop_deadline_reminders():
+    global deadline_scheduler
+    with deadline_scheduler_lock:
+        if deadline_scheduler is not None:
+            deadline_scheduler.stop()
+            deadline_scheduler = None
+
+def upcoming_deadlines(days):
+    """截止日期在今天到 days 天之后的通知（按截止日期排序，同一条通知多次转发时只保留最新的记录）"""
+    today = datetime.date.today()
+    records = get_history_store().due_between(today.isoformat(), (today + datetime.timedelta(days=days)).isoformat())
+    latest = {}
+    for record in records:
+        key = DeadlineReminderScheduler.notice_key(record)
+        if key not in latest or record["id"] > latest[key]["id"]:
+            latest[key] = record
+    return sorted(latest.values(), key=lambda record: (record["截止日期"], record["id"]))
+
+# 设置该环境变量（文件路径）时，窗口首次显示时把当前时间戳写入该文件后退出，供启动耗时测试使用
+STARTUP_PROBE_ENV = "FEISHU_HELPER_STARTUP_PROBE"
+
+def close_splash_screen():
+    """关闭 PyInstaller 启动画面（仅带启动画面的打包版本中存在 pyi_splash）"""
+    try:
+        import pyi_splash
+    except ImportError:
+        return
+    pyi_splash.close()
+
 class App(tk.Tk):
     """主应用窗口"""
     def __init__(self):
@@ -438,9 +3919,8 @@ class App(tk.Tk):
         self.geometry("800x600")
         self.minsize(600, 400)
         
-        # 加载配置
-        global config
-        config = load_config()
+        # 配置在窗口显示之后再加载（见 finish_startup），缩短启动时看到窗口的时间
+        self.startup_done = False
         
         # 创建主框架
         self.main_frame = tk.Frame(self)
@@ -466,6 +3946,18 @@ class App(tk.Tk):
         self.submit_button = tk.Button(button_frame, text="提交", command=self.process_notifications, width=10)
         self.submit_button.pack(side="left", padx=5)
         
+        # 创建暂停/继续按钮
+        self.pause_button = tk.Button(button_frame, text="暂停", command=self.toggle_pause, width=10, state="disabled")
+        self.pause_button.pack(side="left", padx=5)
+        
+        # 创建取消按钮
+        self.cancel_button = tk.Button(button_frame, text="取消", command=self.cancel_job, width=10, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+        
+        # 创建重试失败按钮
+        self.retry_button = tk.Button(button_frame, text="重试失败", command=self.retry_failed, width=10)
+        self.retry_button.pack(side="left", padx=5)
+        
         # 创建清空按钮
         self.clear_button = tk.Button(button_frame, text="清空", command=self.clear_text, width=10)
         self.clear_button.pack(side="left", padx=5)
@@ -474,6 +3966,10 @@ class App(tk.Tk):
         self.history_button = tk.Button(button_frame, text="历史记录", command=self.show_history, width=10)
         self.history_button.pack(side="left", padx=5)
         
+        # 创建导出性能报告按钮
+        self.perf_button = tk.Button(button_frame, text="导出性能报告", command=self.export_perf_report, width=12)
+        self.perf_button.pack(side="left", padx=5)
+        
         # 创建状态框架
         status_frame = tk.Frame(self.main_frame)
         status_frame.pack(fill="x", pady=10)
@@ -482,24 +3978,87 @@ class App(tk.Tk):
         self.status_label = tk.Label(status_frame, text="就绪", anchor="w")
         self.status_label.pack(fill="x")
         
+        # 创建提取缓存统计标签
+        self.cache_label = tk.Label(status_frame, text="", anchor="w", fg="gray")
+        self.cache_label.pack(fill="x")
+        
         # 创建结果文本框
         self.result_text = scrolledtext.ScrolledText(self.main_frame, wrap=tk.WORD, height=8)
         self.result_text.pack(fill="both", expand=True, pady=10)
         
-        # 设置初始状态
+        # 当前后台任务
+        self.job = None
+        
+        # 设置初始状态（加载配置前不能提交）
+        self.submit_button.config(state="disabled")
+        self.retry_button.config(state="disabled")
+        self.status_label.config(text="正在加载配置...")
+        self.bind("<Map>", self.on_first_map)
+    
+    def on_first_map(self, event):
+        """窗口首次显示时关闭启动画面，空闲时再完成其余的启动工作"""
+        if event.widget is not self or self.startup_done:
+            return
+        self.startup_done = True
+        probe_file = os.environ.get(STARTUP_PROBE_ENV)
+        if probe_file:
+            with open(probe_file, "w", encoding="utf-8") as f:
+                f.write(repr(time.time()))
+        close_splash_screen()
+        self.after_idle(self.finish_startup)
+    
+    def finish_startup(self):
+        """加载配置，在后台编译正则表达式，并继续写入上次运行中断时未完成的记录"""
+        global config
+        config = load_config()
+        self.submit_button.config(state="normal")
+        self.retry_button.config(state="normal")
         self.update_status("就绪，请粘贴微信通知内容")
+        if os.environ.get(STARTUP_PROBE_ENV):
+            # 启动耗时测试只需要记录窗口显示的时间
+            self.after(0, self.destroy)
+            return
+        threading.Thread(target=precompile_patterns, daemon=True).start()
+        self.after(500, self.resume_outbox)
+        self.after(1000, start_deadline_reminders)
     
     def update_status(self, message):
         """更新状态标签"""
         self.status_label.config(text=message)
         self.update_idletasks()
     
+    def update_cache_stats(self):
+        """更新提取缓存命中统计与流式提取耗时"""
+        parts = []
+        cache = extraction_cache
+        if cache is not None:
+            hits, misses = cache.stats()
+            parts.append(f"提取缓存：命中 {hits} 次，未命中 {misses} 次（节省 {hits} 次豆包API调用）")
+        stream_stats = streaming_metrics.stats()
+        if stream_stats["first_field_avg"] is not None:
+            parts.append(f"流式首字段平均 {stream_stats['first_field_avg']:.2f}s，完整平均 {stream_stats['total_avg']:.2f}s")
+        if parts:
+            self.cache_label.config(text="；".join(parts))
+    
     def clear_text(self):
         """清空文本框"""
         self.text_input.delete(1.0, tk.END)
         self.result_text.delete(1.0, tk.END)
         self.update_status("已清空，请粘贴新的通知内容")
     
+    def export_perf_report(self):
+        """导出上一次运行的性能报告（JSON 或 Prometheus 文本格式）"""
+        path = filedialog.asksaveasfilename(
+            title="导出性能报告", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus 文本格式", "*.prom"), ("所有文件", "*.*")])
+        if not path:
+            return
+        try:
+            perf_recorder.export(path)
+            self.update_status(f"性能报告已导出到 {path}")
+        except OSError as e:
+            messagebox.showerror("错误", f"导出性能报告失败: {e}")
+    
     def show_history(self):
         """显示历史记录"""
         history_window = HistoryWindow(self)
@@ -508,69 +4067,410 @@ class App(tk.Tk):
         self.wait_window(history_window)  # 等待窗口关闭
     
     def process_notifications(self):
-        """处理通知"""
+        """处理通知（在后台线程中执行，界面通过事件队列更新）"""
+        if self.job is not None:
+            return
+        
         # 获取文本内容
         text = self.text_input.get(1.0, tk.END).strip()
         if not text:
             messagebox.showwarning("警告", "请先粘贴通知内容！")
             return
         
+        if not config.get("VOLC_API_KEY") or not config.get("VOLC_ENDPOINT_ID"):
+            messagebox.showerror("错误", "豆包API的 VOLC_API_KEY 或 VOLC_ENDPOINT_ID 未在配置中设置。")
+        
         # 清空结果文本框
         self.result_text.delete(1.0, tk.END)
         
         # 更新状态
         self.update_status("正在处理通知...")
         
-        # 分割通知
+        # 分割通知（性能统计从分割开始计算）
+        perf_recorder.start_run(config.get("PERF_PROFILE_FILE") or None)
         notifications = split_notifications(text)
         if not notifications:
             self.update_status("未能识别出任何通知，请检查输入内容")
             self.result_text.insert(tk.END, "未能识别出任何通知，请检查输入内容\n")
             return
         
-        # 处理每条通知
-        success_count = 0
-        fail_count = 0
-        
-        for i, notification_text in enumerate(notifications):
-            self.update_status(f"正在处理第 {i+1}/{len(notifications)} 条通知...")
-            
-            # 解析通知
-            parsed_data = parse_single_notification(notification_text)
-            
-            # 显示解析结果
-            self.result_text.insert(tk.END, f"--- 通知 {i+1}/{len(notifications)} ---\n")
+        # 启动后台任务
+        self.job_total = len(notifications)
+        self.job_counts = {"extracted": 0, "written": 0, "failed": 0, "duplicate": 0, "cancelled": 0}
+        self.job = NotificationJob(notifications)
+        self.job.start()
+        self.set_running(True)
+        self.update_status(f"正在处理 {self.job_total} 条通知...")
+        self.after(100, self.poll_job_events)
+    
+    def start_replay(self, statuses, message):
+        """启动飞书写入队列的重放任务"""
+        self.result_text.delete(1.0, tk.END)
+        perf_recorder.start_run(config.get("PERF_PROFILE_FILE") or None)
+        self.job = OutboxReplayJob(statuses)
+        self.job_total = 0
+        self.job_counts = {"extracted": 0, "written": 0, "failed": 0, "duplicate": 0, "cancelled": 0}
+        self.job.start()
+        self.set_running(True)
+        self.update_status(message)
+        self.after(100, self.poll_job_events)
+    
+    def resume_outbox(self):
+        """启动时继续写入上次未完成的记录"""
+        store = get_outbox()
+        if self.job is not None or store is None or not config.get("OUTBOX_AUTO_RESUME", True):
+            return
+        count = store.reset_inflight() + store.count("pending")
+        if count:
+            self.start_replay(("pending",), f"正在继续写入上次未完成的 {count} 条记录...")
+    
+    def retry_failed(self):
+        """重新写入失败的记录（不重新调用豆包API）"""
+        if self.job is not None:
+            return
+        store = get_outbox()
+        if store is None or store.count("failed") + store.count("pending") == 0:
+            messagebox.showinfo("提示", "没有需要重试的记录。")
+            return
+        self.start_replay(("pending", "failed"), "正在重新写入失败的记录...")
+    
+    def set_running(self, running):
+        """切换运行中/空闲状态下的按钮可用性"""
+        self.submit_button.config(state="disabled" if running else "normal")
+        self.retry_button.config(state="disabled" if running else "normal")
+        self.pause_button.config(state="normal" if running else "disabled", text="暂停")
+        self.cancel_button.config(state="normal" if running else "disabled")
+    
+    def toggle_pause(self):
+        """暂停或继续发起新的API调用"""
+        if self.job is None:
+            return
+        if self.job.control.is_paused:
+            self.job.control.resume()
+            self.pause_button.config(text="暂停")
+            self.update_progress_status()
+        else:
+            self.job.control.pause()
+            self.pause_button.config(text="继续")
+            self.update_status("已暂停：正在进行的调用完成后不再发起新的调用")
+    
+    def cancel_job(self):
+        """取消尚未开始的通知，已完成的结果照常写入和保存"""
+        if self.job is None:
+            return
+        self.job.control.cancel()
+        self.pause_button.config(state="disabled", text="暂停")
+        self.cancel_button.config(state="disabled")
+        self.update_status("正在取消：等待进行中的调用完成...")
+    
+    def update_progress_status(self):
+        """根据计数更新进度状态"""
+        counts = self.job_counts
+        self.update_status(f"已解析 {counts['extracted']}/{self.job_total} 条，"
+                           f"写入成功 {counts['written']} 条，失败 {counts['failed']} 条")
+        self.update_cache_stats()
+    
+    def poll_job_events(self):
+        """处理后台任务推送的进度事件"""
+        if self.job is None:
+            return
+        try:
+            while True:
+                event = self.job.events.get_nowait()
+                self.handle_job_event(event)
+                if self.job is None:
+                    return
+        except queue.Empty:
+            pass
+        self.after(100, self.poll_job_events)
+    
+    def handle_job_event(self, event):
+        """在主线程中处理单个进度事件"""
+        kind = event[0]
+        if kind == "title":
+            self.update_status(f"通知 {event[1]+1} 标题已识别：{event[2]}（其余字段生成中）")
+            return
+        if kind == "extracted":
+            _, i, parsed_data = event
+            self.job_total = max(self.job_total, getattr(self.job, "total", 0))
+            self.job_counts["extracted"] += 1
+            self.result_text.insert(tk.END, f"--- 通知 {i+1}/{self.job_total} ---\n")
             self.result_text.insert(tk.END, f"  院校通知: {parsed_data.get('院校通知')}\n")
             self.result_text.insert(tk.END, f"  院校通知详情 AI: {parsed_data.get('院校通知详情 AI')}\n")
             self.result_text.insert(tk.END, f"  创建时间: {parsed_data.get('创建时间')}\n")
-            self.result_text.insert(tk.END, f"  截止日期: {parsed_data.get('截止日期')}\n")
-            
-            # 写入飞书
-            success, message = write_to_feishu(parsed_data)
-            
-            # 添加状态信息
-            parsed_data["状态"] = "成功" if success else f"失败: {message}"
-            
-            # 保存到历史记录
-            save_to_history(parsed_data)
-            
-            # 显示写入结果
-            if success:
-                self.result_text.insert(tk.END, f"  写入结果: 成功\n\n")
-                success_count += 1
-            else:
-                self.result_text.insert(tk.END, f"  写入结果: 失败 - {message}\n\n")
-                fail_count += 1
-            
-            # 滚动到底部
-            self.result_text.see(tk.END)
-        
-        # 更新最终状态
-        if fail_count == 0:
-            self.update_status(f"处理完成！成功写入 {success_count} 条通知")
+            self.result_text.insert(tk.END, f"  截止日期: {parsed_data.get('截止日期')}\n\n")
+        elif kind == "written":
+            self.job_counts["written"] += 1
+            self.result_text.insert(tk.END, f"  通知 {event[1]+1} 写入结果: 成功\n")
+        elif kind == "failed":
+            self.job_counts["failed"] += 1
+            self.result_text.insert(tk.END, f"  通知 {event[1]+1} 写入结果: 失败 - {event[2]}\n")
+        elif kind == "duplicate":
+            self.job_counts["duplicate"] += 1
+            self.result_text.insert(tk.END, f"  通知 {event[1]+1}: {event[2]}\n")
+        elif kind == "cancelled":
+            self.job_counts["cancelled"] += 1
+        elif kind in ("done", "error"):
+            self.finish_job(event[1] if kind == "error" else None)
+            return
+        self.result_text.see(tk.END)
+        if not self.job.control.is_paused and not self.job.control.is_cancelled:
+            self.update_progress_status()
+    
+    def finish_job(self, error_message=None):
+        """后台任务结束后更新最终状态"""
+        self.job = None
+        self.set_running(False)
+        self.update_cache_stats()
+        counts = self.job_counts
+        if error_message:
+            self.result_text.insert(tk.END, f"{error_message}\n")
+            self.update_status(error_message)
+        elif counts["cancelled"]:
+            self.update_status(f"已取消！成功 {counts['written']} 条，失败 {counts['failed']} 条，"
+                               f"未处理 {counts['cancelled']} 条")
+        elif counts["failed"] == 0:
+            self.update_status(f"处理完成！成功写入 {counts['written']} 条通知" +
+                               (f"，跳过重复 {counts['duplicate']} 条" if counts["duplicate"] else ""))
         else:
-            self.update_status(f"处理完成！成功 {success_count} 条，失败 {fail_count} 条")
+            self.update_status(f"处理完成！成功 {counts['written']} 条，失败 {counts['failed']} 条" +
+                               (f"，跳过重复 {counts['duplicate']} 条" if counts["duplicate"] else ""))
+        if config.get("PERF_REPORT_ENABLED", True):
+            self.result_text.insert(tk.END, "\n" + perf_recorder.format_report())
+        self.result_text.see(tk.END)
+
+def open_cli_output(path):
+    """打开 JSONL 结果输出文件（追加写入），未指定时返回标准输出；无法打开时输出错误信息并返回 None"""
+    if not path:
+        return sys.stdout
+    try:
+        return open(path, "a", encoding="utf-8")
+    except OSError as e:
+        print(f"错误：无法写入输出文件: {e}", file=sys.stderr)
+        return None
+
+def run_cli(argv):
+    """命令行批处理模式：流式读取导出的聊天记录，逐条输出 JSONL 结果"""
+    global config, HEADLESS
+    parser = argparse.ArgumentParser(
+        prog="wechat_feishu_gui.py",
+        description="微信通知飞书助手（命令行批处理模式），结果以 JSONL 格式输出")
+    parser.add_argument("input", nargs="?", default="-", help="导出的聊天记录文件，省略或为 - 时从标准输入读取")
+    parser.add_argument("-o", "--output", help="JSONL 结果输出文件（追加写入），默认输出到标准输出")
+    parser.add_argument("--dry-run", action="store_true", help="只分割和提取，不写入飞书，也不保存历史记录")
+    parser.add_argument("--resume-from-offset", type=int, default=0, metavar="BYTES",
+                        help="从输入的指定字节偏移处继续处理（取上次输出中的 next_offset）")
+    parser.add_argument("--batch-size", type=int, default=20, help="每批处理的通知条数（默认 20）")
+    parser.add_argument("--volc-workers", type=int, help="豆包API并发数，覆盖配置中的 VOLC_MAX_WORKERS")
+    parser.add_argument("--feishu-workers", type=int, help="飞书写入并发数，覆盖配置中的 FEISHU_MAX_WORKERS")
+    parser.add_argument("--sync", action="store_true", help="处理前先增量同步飞书多维表格到本地镜像")
+    parser.add_argument("--full-sync", action="store_true", help="处理前全量同步飞书多维表格（同时清理已删除的记录）")
+    parser.add_argument("--perf-report", metavar="FILE",
+                        help="运行结束后导出性能报告（.prom/.txt 为 Prometheus 文本格式，其余为 JSON）")
+    parser.add_argument("--profile", metavar="FILE", help="启用 cProfile，并把合并后的剖析结果写入该文件")
+    parser.add_argument("--watch", nargs="?", const="", metavar="DIR",
+                        help="持续监视投递文件夹中新增的聊天记录（省略 DIR 时使用配置中的 WATCH_FOLDER），按 Ctrl+C 退出")
+    parser.add_argument("--watch-clipboard", action="store_true", help="监视模式下同时监视剪贴板中复制的通知")
+    parser.add_argument("--due", type=int, metavar="DAYS",
+                        help="输出今天到 DAYS 天内截止的通知（按截止日期排序，只读取本地历史记录）")
+    parser.add_argument("--remind", action="store_true",
+                        help="持续运行截止日期提醒，按配置通过飞书机器人发送（监视模式下配置了 Webhook 时自动启用）")
+    args = parser.parse_args(argv)
+
+    HEADLESS = True
+    config = load_config()
+    if args.volc_workers:
+        config["VOLC_MAX_WORKERS"] = args.volc_workers
+    if args.feishu_workers:
+        config["FEISHU_MAX_WORKERS"] = args.feishu_workers
+
+    if args.due is not None:
+        return run_due(args)
+
+    if (args.sync or args.full_sync) and not args.dry_run:
+        success, message = sync_all_bitable_mirrors(full=args.full_sync)
+        print(message if success else f"警告：同步飞书多维表格镜像失败: {message}", file=sys.stderr)
+
+    if args.watch is not None or args.watch_clipboard:
+        if args.dry_run:
+            print("错误：监视模式不支持 --dry-run", file=sys.stderr)
+            return 2
+        return run_watch(args)
+
+    if args.remind:
+        return run_remind()
+
+    if args.input == "-":
+        stream = sys.stdin.buffer
+        # 标准输入无法定位，只能读取并丢弃偏移之前的内容
+        remaining = args.resume_from_offset
+        while remaining > 0:
+            chunk = stream.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+    else:
+        stream = None
+        try:
+            stream = open(args.input, "rb")
+            stream.seek(args.resume_from_offset)
+        except OSError as e:
+            if stream is not None:
+                stream.close()
+            print(f"错误：无法读取输入文件: {e}", file=sys.stderr)
+            return 2
+    output = open_cli_output(args.output)
+    if output is None:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        return 2
+
+    counts = {"written": 0, "failed": 0, "duplicate": 0, "dry_run": 0}
+    index = 0
+    perf_recorder.start_run(args.profile or config.get("PERF_PROFILE_FILE") or None)
+
+    def emit(batch, results):
+        nonlocal index
+        for (offset, next_offset, _), result in zip(batch, results):
+            line = {"index": index, "offset": offset, "next_offset": next_offset,
+                    "status": result["status"], "message": result.get("message"),
+                    "record_id": result.get("record_id"), "record": result.get("parsed")}
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+            counts[result["status"]] += 1
+            index += 1
+        output.flush()
+
+    def run_batch(batch):
+        texts = [text for _, _, text in batch]
+        if args.dry_run:
+            volc_workers = max(1, int(config.get("VOLC_MAX_WORKERS", 4)))
+            with ThreadPoolExecutor(max_workers=volc_workers, thread_name_prefix="volc") as executor:
+                parsed_list = list(executor.map(
+                    lambda text: perf_recorder.profiled(parse_single_notification, text), texts))
+            emit(batch, [{"status": "dry_run", "parsed": parsed} for parsed in parsed_list])
+            return
+        results = perf_recorder.profiled(process_notification_batch, texts)
+        save_batch_results(results)
+        for result in results:
+            result["status"] = batch_result_status(result)
+        emit(batch, results)
+
+    try:
+        batch = []
+        for item in perf_recorder.timed_iter(iter_notifications_from_stream(stream, args.resume_from_offset), "split"):
+            batch.append(item)
+            if len(batch) >= max(1, args.batch_size):
+                run_batch(batch)
+                batch = []
+        if batch:
+            run_batch(batch)
+    except KeyboardInterrupt:
+        print("已中断，可使用上次输出的 next_offset 继续处理。", file=sys.stderr)
+        return 130
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        if output is not sys.stdout:
+            output.close()
+
+    perf_recorder.finish_run()
+    print(f"处理完成：共 {index} 条，写入成功 {counts['written']} 条，失败 {counts['failed']} 条，"
+          f"跳过重复 {counts['duplicate']} 条，试运行 {counts['dry_run']} 条", file=sys.stderr)
+    print(perf_recorder.format_report(), end="", file=sys.stderr)
+    if args.perf_report:
+        perf_recorder.export(args.perf_report)
+    return 1 if counts["failed"] else 0
+
+def run_watch(args):
+    """监视模式：持续处理投递文件夹（及剪贴板）中的新通知，逐条输出 JSONL 结果"""
+    folder = args.watch or config.get("WATCH_FOLDER") or None
+    if folder is None and not args.watch_clipboard:
+        print("错误：请指定监视文件夹（--watch DIR 或配置 WATCH_FOLDER）", file=sys.stderr)
+        return 2
+    if folder is not None and not os.path.isdir(folder):
+        print(f"错误：监视文件夹不存在: {folder}", file=sys.stderr)
+        return 2
+    output = open_cli_output(args.output)
+    if output is None:
+        return 2
+
+    def emit(items, results):
+        for (source, offset, next_offset, _), result in zip(items, results):
+            line = {"source": source, "offset": offset, "next_offset": next_offset,
+                    "status": result["status"], "message": result.get("message"),
+                    "record_id": result.get("record_id"), "record": result.get("parsed")}
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+        output.flush()
+        counts = {status: sum(1 for result in results if result["status"] == status)
+                  for status in ("written", "failed", "duplicate")}
+        print(f"{datetime.datetime.now():%H:%M:%S} 处理 {len(items)} 条：写入成功 {counts['written']} 条，"
+              f"失败 {counts['failed']} 条，跳过重复 {counts['duplicate']} 条", file=sys.stderr)
+        if args.perf_report:
+            perf_recorder.export(args.perf_report)
+
+    daemon = IngestionDaemon(
+        folder, pattern=config.get("WATCH_PATTERN", "*.txt"), batch_size=args.batch_size,
+        poll_seconds=float(config.get("WATCH_POLL_SECONDS", 2)),
+        debounce_seconds=float(config.get("WATCH_DEBOUNCE_SECONDS", 3)),
+        clipboard=args.watch_clipboard or bool(config.get("WATCH_CLIPBOARD", False)),
+        clipboard_max_chars=int(config.get("WATCH_CLIPBOARD_MAX_CHARS", 100000)), on_batch=emit)
+    print(f"正在监视{'文件夹 ' + str(daemon.folder) if daemon.folder else ''}"
+          f"{'和' if daemon.folder and daemon.clipboard else ''}{'剪贴板' if daemon.clipboard else ''}，"
+          f"按 Ctrl+C 退出", file=sys.stderr)
+    if start_deadline_reminders() is not None:
+        print("已启用截止日期提醒", file=sys.stderr)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    counts = daemon.counts
+    print(f"已停止监视：共 {counts['batches']} 批，写入成功 {counts['written']} 条，失败 {counts['failed']} 条，"
+          f"跳过重复 {counts['duplicate']} 条", file=sys.stderr)
+    return 0
+
+def run_due(args):
+    """输出即将截止的通知，每条一行 JSONL"""
+    output = open_cli_output(args.output)
+    if output is None:
+        return 2
+    today = datetime.date.today()
+    try:
+        records = upcoming_deadlines(max(0, args.due))
+        for record in records:
+            line = {"id": record["id"], "title": record.get("院校通知"), "deadline": record["截止日期"],
+                    "days_left": (datetime.date.fromisoformat(record["截止日期"]) - today).days,
+                    "status": record.get("状态"), "record_id": record.get("record_id")}
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{max(0, args.due)} 天内截止的通知共 {len(records)} 条", file=sys.stderr)
+    return 0
+
+def run_remind():
+    """前台运行截止日期提醒，按 Ctrl+C 退出"""
+    if not config.get("REMINDER_WEBHOOK_URL"):
+        print("错误：请在配置中设置 REMINDER_WEBHOOK_URL（飞书自定义机器人 Webhook 地址）", file=sys.stderr)
+        return 2
+    scheduler = start_deadline_reminders()
+    print(f"截止日期提醒已启动：截止前 {'、'.join(map(str, scheduler.days_before))} 天的 "
+          f"{scheduler.remind_time:%H:%M} 发送，按 Ctrl+C 退出", file=sys.stderr)
+    try:
+        while scheduler.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_deadline_reminders()
+    print(f"已停止截止日期提醒：发送 {scheduler.counts['sent']} 条，发送失败 {scheduler.counts['failed']} 条",
+          file=sys.stderr)
+    return 0
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     app = App()
     app.mainloop()
@@ -1,5 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
+# 打包方式由环境变量 FEISHU_HELPER_BUILD 选择：
+#   onefile（默认）：单个 exe，每次启动都要先解压到临时目录
+#   onedir：exe 与依赖放在同一目录，启动时无需解压，启动更快；
+#           spec 同目录下存在 splash.png 时还会显示启动画面，主窗口出现后自动关闭
+#   console：带控制台窗口的单个 exe（微信通知飞书助手-命令行.exe），用于命令行批处理、监视导入等模式；
+#           其余两种是窗口程序，没有标准输出/标准错误，带参数运行时无法输出 JSONL 结果和错误信息
+import os
 
+BUILD_PROFILE = os.environ.get('FEISHU_HELPER_BUILD', 'onefile')
+SPLASH_IMAGE = 'splash.png'
+CONSOLE = BUILD_PROFILE == 'console'
 
 a = Analysis(
     ['wechat_feishu_gui.py'],
@@ -16,23 +26,58 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='微信通知飞书助手',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if BUILD_PROFILE == 'onedir':
+    splash_exe, splash_collect = [], []
+    if os.path.exists(SPLASH_IMAGE):
+        splash = Splash(SPLASH_IMAGE, binaries=a.binaries, datas=a.datas, text_pos=None)
+        splash_exe, splash_collect = [splash], [splash.binaries]
+
+    exe = EXE(
+        pyz,
+        a.scripts,
+        *splash_exe,
+        [],
+        exclude_binaries=True,
+        name='微信通知飞书助手',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        *splash_collect,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='微信通知飞书助手',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='微信通知飞书助手-命令行' if CONSOLE else '微信通知飞书助手',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=CONSOLE,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )